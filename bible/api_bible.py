@@ -1,8 +1,15 @@
+import hashlib
 import requests
 from typing import Optional, Dict, Any, List, Union
 from dataclasses import dataclass
 from decouple import config
 import json
+from django.conf import settings
+from core.caching import TieredCache
+from core.http_client import get_session
+
+# Scripture rarely changes: GET responses are cached and served stale while refreshing
+api_cache = TieredCache('bible_api')
 
 @dataclass
 class BibleAPIConfig:
@@ -10,26 +17,41 @@ class BibleAPIConfig:
     api_version: str = "v1"
     
 class BibleAPI:
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, cached: bool = True):
         self.config = BibleAPIConfig()
         self.api_key = api_key
+        # Bulk readers (DataSyncService) pass cached=False so every response
+        # is fetched once and never fills the shared cache
+        self.cached = cached
         self.headers = {
             'api-key': api_key,
             'Content-Type': 'application/json'
         }
-        self.session = requests.Session()
-        self.session.headers.update(self.headers)
+        self.session = get_session('api_bible')
     
     def _build_url(self, endpoint: str) -> str:
         """Build complete API URL from endpoint"""
         return f"{self.config.base_url}/{self.config.api_version}/{endpoint}"
     
     def _make_request(self, method: str, endpoint: str, **kwargs) -> Dict[str, Any]:
-        """Generic request method"""
+        """Generic request method, GET responses are cached unless cached=False"""
+        if method != 'GET' or not self.cached:
+            return self._send(method, endpoint, **kwargs)
+
+        params = json.dumps(kwargs.get('params') or {}, sort_keys=True)
+        key = hashlib.sha1(f"{endpoint}?{params}".encode()).hexdigest()
+        return api_cache.get_or_set(
+            key,
+            lambda: self._send(method, endpoint, **kwargs),
+            settings.BIBLE_API_CACHE_SECONDS,
+            stale_ttl=settings.BIBLE_API_STALE_SECONDS,
+        )
+
+    def _send(self, method: str, endpoint: str, **kwargs) -> Dict[str, Any]:
         url = self._build_url(endpoint)
         
         try:
-            response = self.session.request(method, url, **kwargs)
+            response = self.session.request(method, url, headers=self.headers, **kwargs)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
@@ -140,7 +140,7 @@ def is_intro_chapter(chapter_data):
 
 class DataSyncService:
     def __init__(self):
-        self.bible_api = BibleAPI(config('bible_api_key'))
+        self.bible_api = BibleAPI(config('bible_api_key'), cached=False)
     
     def sync_bible_versions(self):
         """Sync Bible versions from API to local database"""
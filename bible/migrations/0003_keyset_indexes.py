@@ -0,0 +1,20 @@
+# Generated by Django 5.2.6 on 2026-10-18 22:17
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bible', '0002_sermon'),
+        ('core', '0002_webhookendpoint'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bookmark',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='bible_bookm_user_id_d21482_idx'),
+        ),
+    ]
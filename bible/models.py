@@ -1,4 +1,5 @@
 from django.db import models
+from core.caching import TieredCache
 from core.models import BaseModel, Category, Tag
 from django.contrib.auth import get_user_model
 
@@ -19,6 +20,19 @@ class BibleVersion(BaseModel):
     def __str__(self):
         return f"{self.name} ({self.abbreviation})"
 
+    @classmethod
+    def default_id(cls):
+        """Id of the version used when none is requested, cached until a version changes"""
+        return version_cache.get_or_set(
+            'default_id',
+            lambda: cls.objects.filter(is_active=True).values_list('id', flat=True).first(),
+            3600,
+        )
+
+
+# Cleared by core.signals whenever a BibleVersion is saved or deleted
+version_cache = TieredCache('bible_versions')
+
 class Book(BaseModel):
     """Books of the Bible"""
     book_id = models.CharField(max_length=10, unique=True)  # API Book ID
@@ -109,6 +123,9 @@ class Bookmark(BaseModel):
     class Meta:
         ordering = ['-created_at']
         unique_together = ['user', 'verse']
+        indexes = [
+            models.Index(fields=['user', 'created_at', 'id']),
+        ]
     
     def __str__(self):
         return f"{self.user.email} - {self.verse.reference}"
@@ -1,3 +1,56 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from users.authentication import tokens_for_user
+from users.models import User
+
+from .api_bible import BibleAPI
+
+
+class BibleAPICacheTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_get_requests_are_cached(self):
+        api = BibleAPI('key')
+        with mock.patch.object(api, '_send', return_value={'data': []}) as send:
+            api.get_books('bible-1')
+            api.get_books('bible-1')
+        self.assertEqual(send.call_count, 1)
+
+    def test_uncached_client_always_sends(self):
+        api = BibleAPI('key', cached=False)
+        with mock.patch.object(api, '_send', return_value={'data': []}) as send:
+            api.get_books('bible-1')
+            api.get_books('bible-1')
+        self.assertEqual(send.call_count, 2)
+
+
+@override_settings(GENERATION_QUOTAS={'free': {'sermon': {'rate': '10/min', 'daily': 1}}})
+class SermonQuotaTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        user = User.objects.create_user(email='ann@example.com', username='ann', password='password-1')
+        self.headers = {'HTTP_AUTHORIZATION': f'Bearer {tokens_for_user(user).access_token}'}
+
+    def generate(self, bible_verse='John 3:16'):
+        return self.client.post('/api/v1/bible/sermons/', {'bible_verse': bible_verse},
+                                content_type='application/json', **self.headers)
+
+    def test_invalid_verse_is_rejected_before_generation(self):
+        with mock.patch('bible.views.agenerate_sermon') as generate:
+            self.assertEqual(self.generate('').status_code, 400)
+        generate.assert_not_called()
+
+        with mock.patch('bible.views.agenerate_sermon', return_value='Title: "Love"\nGod so loved'):
+            self.assertEqual(self.generate().status_code, 201)
+
+    def test_failed_generation_gives_the_quota_back(self):
+        with mock.patch('bible.views.agenerate_sermon', side_effect=RuntimeError('upstream down')):
+            self.assertEqual(self.generate().status_code, 502)
+
+        with mock.patch('bible.views.agenerate_sermon', return_value='Title: "Love"\nGod so loved'):
+            self.assertEqual(self.generate().status_code, 201)
+            self.assertEqual(self.generate().status_code, 429)
@@ -1,8 +1,14 @@
+import logging
+
+from asgiref.sync import sync_to_async
 from rest_framework import generics, permissions, status
 from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from django.db.models import Q
+from adrf.views import APIView as AsyncAPIView
+from django.db.models import IntegerField, Q
+from django.db.models.functions import Cast
 from .models import BibleVersion, Book, Chapter, Verse, ReadingPlan, ReadingPlanDay, Bookmark, Sermon
 from .serializers import (
     BibleVersionSerializer, BookSerializer, ChapterSerializer, VerseSerializer, SermonSerializer,
@@ -10,7 +16,12 @@ from .serializers import (
 )
 from .api_bible import BibleAPI
 from decouple import config
-from core.generation_utility import generate_sermon
+from core.generation_utility import agenerate_sermon
+from core.http_client import with_async_clients
+from core.pagination import KeysetPagination
+from users.throttling import SermonGenerationThrottle, reconcile_quota
+
+logger = logging.getLogger(__name__)
 
 bible_api = BibleAPI(config('bible_api_key', default=''))
 
@@ -87,6 +98,8 @@ class ChapterListView(generics.ListAPIView):
 class VerseListView(generics.ListAPIView):
     serializer_class = VerseDetailSerializer
     permission_classes = [permissions.AllowAny]
+    pagination_class = KeysetPagination
+    keyset_ordering = ('verse_order', 'id')
     
     def get_queryset(self):
         chapter_id = self.kwargs.get('chapter_id')
@@ -97,10 +110,12 @@ class VerseListView(generics.ListAPIView):
             queryset = queryset.filter(version_id=version_id)
         else:
             # Default to first available version
-            first_version = BibleVersion.objects.filter(is_active=True).first()
-            if first_version:
-                queryset = queryset.filter(version=first_version)
+            default_version_id = BibleVersion.default_id()
+            if default_version_id:
+                queryset = queryset.filter(version_id=default_version_id)
         
+        # Verse numbers are stored as text, order them numerically
+        queryset = queryset.annotate(verse_order=Cast('verse_number', IntegerField()))
         return queryset.select_related('chapter__book', 'version')
 
 @api_view(['GET'])
@@ -204,6 +219,8 @@ class ReadingPlanDayView(generics.RetrieveAPIView):
 class BookmarkListCreateView(generics.ListCreateAPIView):
     serializer_class = BookmarkSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-created_at', '-id')
     
     def get_queryset(self):
         return Bookmark.objects.filter(user=self.request.user).select_related('verse__chapter__book', 'verse__version')
@@ -217,11 +234,16 @@ class BookmarkDetailView(generics.RetrieveUpdateDestroyAPIView):
     
     
 
-class SermonListCreateView(APIView):
+class SermonListCreateView(AsyncAPIView):
     permission_classes = [permissions.AllowAny]  # Adjust as needed (e.g., IsAuthenticated)
+    # Limits POST (generation) only; listing is not throttled
+    throttle_classes = [SermonGenerationThrottle]
 
-    def get(self, request):
+    async def get(self, request):
         """Return a list of all sermons"""
+        return await sync_to_async(self.list_sermons)(request)
+
+    def list_sermons(self, request):
         user = request.user
         # Use query_params for GET requests
         sermon_id = request.query_params.get('sermon_id')
@@ -233,13 +255,28 @@ class SermonListCreateView(APIView):
         serializer = SermonSerializer(sermons, many=True)
         return Response(serializer.data)
 
-    def post(self, request):
+    @with_async_clients
+    async def post(self, request):
         """Save a new AI-generated sermon"""
-        data = request.data
+        data = request.data.copy()
         bible_verse = data.get('bible_verse', '')
-        generated_content = generate_sermon(bible_verse)
+        try:
+            # Reject bad input before paying for a generation
+            SermonSerializer().fields['bible_text'].run_validation(bible_verse)
+        except ValidationError as e:
+            await sync_to_async(reconcile_quota)(request, 'sermon')
+            return Response({'bible_verse': e.detail}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            generated_content = await agenerate_sermon(bible_verse)
+        except Exception as e:
+            logger.error(f"[SERMON] Sermon generation failed: {e}")
+            # Nothing was generated; give the request its daily quota back
+            await sync_to_async(reconcile_quota)(request, 'sermon')
+            return Response({'error': 'Failed to generate sermon'}, status=status.HTTP_502_BAD_GATEWAY)
         
         # Extract title line
+        title = None
         for line in generated_content.splitlines():
             if line.strip().startswith("Title:"):
                 title = line.split("Title:", 1)[1].strip().strip('"')
@@ -249,8 +286,16 @@ class SermonListCreateView(APIView):
         else:
             data['title'] = "AI Generated Sermon"
         data.update({'content': generated_content, 'generated_by_ai': True, 'bible_text': bible_verse})
+        return await sync_to_async(self.save_sermon)(request, data)
+
+    def save_sermon(self, request, data):
         serializer = SermonSerializer(data=data)
-        if serializer.is_valid():
+        if not serializer.is_valid():
+            reconcile_quota(request, 'sermon')
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        try:
             serializer.save(author=request.user if request.user.is_authenticated else None)
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+        except Exception:
+            reconcile_quota(request, 'sermon')
+            raise
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
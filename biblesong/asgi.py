@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'biblesong.settings')
+# One long-lived event loop: keep async HTTP clients (and their connections) open
+os.environ.setdefault('ASYNC_HTTP_SHARED_CLIENTS', 'True')
 
 application = get_asgi_application()
@@ -16,6 +16,8 @@ from decouple import config
 from datetime import timedelta
 
 environment = config('ENV', default='production')
+# Only upper-case names are visible through django.conf.settings
+ENVIRONMENT = environment
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -52,6 +54,7 @@ INSTALLED_APPS = [
     # Third-party apps
     'rest_framework',
     'rest_framework_simplejwt',
+    'rest_framework_simplejwt.token_blacklist',
     'corsheaders',
     'allauth',
     'allauth.account',
@@ -73,6 +76,7 @@ SITE_ID = 2
 
 
 MIDDLEWARE = [
+    'core.middleware.PerformanceMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -83,7 +87,7 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'allauth.account.middleware.AccountMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'core.middleware.StaticFilesMiddleware',
 ]
 
 ROOT_URLCONF = 'biblesong.urls'
@@ -137,6 +141,38 @@ else:
 # -Ms#ZEhT^SC}
 # mysql WNY3h-JbGh)+
 
+# Shared cache, the back tier of core.caching and the store for counters and
+# locks used across workers. 'redis' (default outside development), 'file'
+# (single host; incr is not atomic, so quotas may overshoot) or 'locmem'
+# (per process, development only)
+CACHE_BACKEND = config('CACHE_BACKEND', default='locmem' if environment == 'development' else 'redis')
+if CACHE_BACKEND == 'redis':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': config('CACHE_REDIS_URL', default=config('REDIS_URL', default='redis://localhost:6379/0')),
+            'KEY_PREFIX': 'gospelux',
+        }
+    }
+elif CACHE_BACKEND == 'file':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': config('CACHE_DIR', default=str(BASE_DIR / 'cache')),
+            'OPTIONS': {'MAX_ENTRIES': 100000},
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+# Per-process front tier of core.caching: entries per namespace and seconds a
+# local copy is trusted before the shared cache is read again
+CACHE_LOCAL_SIZE = config('CACHE_LOCAL_SIZE', default=1024, cast=int)
+CACHE_LOCAL_SECONDS = config('CACHE_LOCAL_SECONDS', default=5, cast=int)
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -202,7 +238,7 @@ AUTH_USER_MODEL = 'users.User'
 # REST Framework Configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -223,6 +259,69 @@ SIMPLE_JWT = {
     'UPDATE_LAST_LOGIN': True,
 }
 
+# Refresh-token blacklist checks go through a Bloom filter (users.tokens) that
+# each worker reloads from the cache at most this often, plus a shared log of
+# tokens blacklisted since it was built; expired tokens are removed (and the
+# filter rebuilt, emptying the log) by the prune_tokens command
+TOKEN_BLACKLIST_FILTER_CHECK_SECONDS = config('TOKEN_BLACKLIST_FILTER_CHECK_SECONDS', default=30, cast=int)
+
+# Authenticated users are cached (users.authentication) in the shared cache and,
+# briefly, in each worker; saves, password changes and logout invalidate them
+AUTH_USER_CACHE_SECONDS = config('AUTH_USER_CACHE_SECONDS', default=300, cast=int)
+AUTH_USER_LOCAL_CACHE_SECONDS = config('AUTH_USER_LOCAL_CACHE_SECONDS', default=10, cast=int)
+
+# Request timing (core.middleware.PerformanceMiddleware): this share of requests,
+# plus every request slower than PERF_SLOW_REQUEST_MS, gets a Server-Timing
+# header and a [PERF] log line
+PERF_SAMPLE_RATE = config('PERF_SAMPLE_RATE', default=1.0 if DEBUG else 0.01, cast=float)
+PERF_SLOW_REQUEST_MS = config('PERF_SLOW_REQUEST_MS', default=1000, cast=int)
+
+# /metrics (core.metrics): each worker publishes its counters to the shared
+# cache every METRICS_PUBLISH_SECONDS and /metrics sums the workers seen within
+# METRICS_WORKER_TTL. Needs the redis cache to cover more than one process.
+# Scrapers send METRICS_TOKEN as a bearer token; without one, /metrics is only
+# served in development
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+METRICS_PUBLISH_SECONDS = config('METRICS_PUBLISH_SECONDS', default=10, cast=int)
+METRICS_WORKER_TTL = config('METRICS_WORKER_TTL', default=86400, cast=int)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'perf': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
+
+# Generation limits per plan (users.throttling), applied before any upstream
+# call: 'rate' is a sliding window, 'daily' a cap per UTC day. A plan missing
+# here falls back to 'free'; 'anonymous' covers requests without a user
+GENERATION_QUOTAS = {
+    'anonymous': {
+        'sermon': {'rate': '2/min', 'daily': 3},
+    },
+    'free': {
+        'song': {'rate': '2/min', 'daily': 5},
+        'video': {'rate': '1/min', 'daily': 2},
+        'sermon': {'rate': '3/min', 'daily': 10},
+    },
+    'premium': {
+        'song': {'rate': '5/min', 'daily': 50},
+        'video': {'rate': '3/min', 'daily': 20},
+        'sermon': {'rate': '10/min', 'daily': 100},
+    },
+    'lifetime': {
+        'song': {'rate': '5/min', 'daily': 50},
+        'video': {'rate': '3/min', 'daily': 20},
+        'sermon': {'rate': '10/min', 'daily': 100},
+    },
+}
+# Seconds a user's plan name stays cached (cleared when the UserPlan changes)
+USER_PLAN_CACHE_SECONDS = config('USER_PLAN_CACHE_SECONDS', default=300, cast=int)
+
 # DRF Spectacular Configuration
 SPECTACULAR_SETTINGS = {
     'TITLE': 'Gospelux API',
@@ -233,7 +332,10 @@ SPECTACULAR_SETTINGS = {
 }
 
 # Email Configuration
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+# Use django.core.mail.backends.console.EmailBackend or .filebased.EmailBackend
+# (writes to EMAIL_FILE_PATH) for local development
+EMAIL_BACKEND = config('EMAIL_BACKEND', default='django.core.mail.backends.smtp.EmailBackend')
+EMAIL_FILE_PATH = config('EMAIL_FILE_PATH', default=str(BASE_DIR / 'sent_emails'))
 EMAIL_HOST = config('EMAIL_HOST', default='smtp.gmail.com')
 EMAIL_PORT = config('EMAIL_PORT', default=587, cast=int)
 EMAIL_USE_TLS = config('EMAIL_USE_TLS', default=True, cast=bool)
@@ -241,6 +343,14 @@ EMAIL_HOST_USER = config('EMAIL_HOST_USER', default='')
 EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='')
 DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default='noreply@example.com')
 
+# Outgoing mail is queued as OutboundEmail rows (core.mail) and sent in batches
+# over one connection. Dispatch: 'thread' (background thread in the web worker),
+# 'celery' (deliver_queued_email task) or 'cron' (send_queued_email command only).
+# Retries are only picked up by send_queued_email, so schedule it in every mode
+EMAIL_QUEUE_DISPATCH = config('EMAIL_QUEUE_DISPATCH', default='thread')
+EMAIL_QUEUE_BATCH_SIZE = config('EMAIL_QUEUE_BATCH_SIZE', default=50, cast=int)
+EMAIL_MAX_ATTEMPTS = config('EMAIL_MAX_ATTEMPTS', default=5, cast=int)
+
 # Celery Configuration
 CELERY_BROKER_URL = config('REDIS_URL', default='redis://localhost:6379/0')
 CELERY_RESULT_BACKEND = config('REDIS_URL', default='redis://localhost:6379/0')
@@ -273,8 +383,23 @@ CSRF_TRUSTED_ORIGINS = [
     "https://gospelux.com",
 ]
 
-# OTP Configuration
-OTP_EXPIRY_MINUTES = 30
+# OTP Configuration (users.otp). Backend 'cache' keeps codes in the cache with
+# native expiry; 'db' stores OTP rows, removed by the purge_otps command
+OTP_BACKEND = config('OTP_BACKEND', default='cache')
+OTP_EXPIRY_MINUTES = config('OTP_EXPIRY_MINUTES', default=10, cast=int)
+OTP_MAX_ATTEMPTS = config('OTP_MAX_ATTEMPTS', default=5, cast=int)
+
+# Seconds each worker caches the AccessModel site_access rule (maintenance mode)
+SITE_ACCESS_CACHE_SECONDS = config('SITE_ACCESS_CACHE_SECONDS', default=5, cast=int)
+
+# Seconds a user's favorite song ids stay cached (updated on toggle)
+FAVORITES_CACHE_SECONDS = config('FAVORITES_CACHE_SECONDS', default=300, cast=int)
+
+# App downloads (core.downloads): slug lookups are cached, and download counts
+# are buffered per worker and written every N downloads or N seconds
+DOWNLOAD_LOOKUP_CACHE_SECONDS = config('DOWNLOAD_LOOKUP_CACHE_SECONDS', default=3600, cast=int)
+DOWNLOAD_COUNT_FLUSH_SIZE = config('DOWNLOAD_COUNT_FLUSH_SIZE', default=50, cast=int)
+DOWNLOAD_COUNT_FLUSH_SECONDS = config('DOWNLOAD_COUNT_FLUSH_SECONDS', default=60, cast=int)
 
 # Django Allauth Configuration
 ACCOUNT_SIGNUP_FIELDS = ['email*', 'password1*']
@@ -364,10 +489,48 @@ JAZZMIN_UI_TWEAKS = {
 
 BIBLE_API_KEY = config('bible_api_key', default='')
 
+HEYGEN_WEBHOOK_URL = config('HEYGEN_WEBHOOK_URL', default='https://gospelux.com/api/v1/songs/generated-videos-callback/')
+
 AUTHENTICATION_BACKENDS = (
     'django.contrib.auth.backends.ModelBackend',
     'allauth.account.auth_backends.AuthenticationBackend',
 )
 LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = '/'
-LOGOUT_REDIRECT_URL = '/'
\ No newline at end of file
+LOGOUT_REDIRECT_URL = '/'
+# API.Bible GET responses (bible.api_bible) are cached this long, then served
+# stale for up to BIBLE_API_STALE_SECONDS more while being refreshed
+BIBLE_API_CACHE_SECONDS = config('BIBLE_API_CACHE_SECONDS', default=6 * 3600, cast=int)
+BIBLE_API_STALE_SECONDS = config('BIBLE_API_STALE_SECONDS', default=7 * 86400, cast=int)
+
+# Outbound HTTP (core.http_client) per-provider overrides, e.g.
+# {'huggingface': {'timeout': (5, 180), 'max_concurrency': 4}}; 'base_url'
+# sends a provider's requests to another host (the benchmark's stand-ins)
+OUTBOUND_HTTP = {}
+# Keep async HTTP clients open across requests; only for an ASGI server with one
+# long-lived event loop, so asgi.py turns it on. Under WSGI each async view
+# closes its own clients
+ASYNC_HTTP_SHARED_CLIENTS = config('ASYNC_HTTP_SHARED_CLIENTS', default=False, cast=bool)
+
+# Media streaming (core.media): hand file bodies to the front-end server.
+# backend: '' (stream from Django), 'nginx' (X-Accel-Redirect to prefix, an
+# internal location aliased to MEDIA_ROOT), 'apache' or 'lighttpd' (X-Sendfile)
+MEDIA_OFFLOAD = {
+    'backend': config('MEDIA_OFFLOAD_BACKEND', default=''),
+    'prefix': config('MEDIA_OFFLOAD_PREFIX', default='/protected-media/'),
+}
+
+# Post-ingest audio pipeline for generated songs (songs.media_pipeline), run by
+# the process_song_media command, which cron should start every few minutes.
+# Needs ffmpeg on PATH (or set 'ffmpeg').
+MEDIA_PIPELINE = {
+    'bitrates': (64, 128, 192),
+    'workers': config('MEDIA_PIPELINE_WORKERS', default=2, cast=int),
+}
+
+# Profile pictures and playlist covers get square WebP/JPEG variants (core.images)
+# at these sizes, built after upload in a background thread ('thread') or only
+# by the process_images command ('cron')
+IMAGE_VARIANT_SIZES = {'small': 128, 'medium': 512}
+IMAGE_PIPELINE_DISPATCH = config('IMAGE_PIPELINE_DISPATCH', default='thread')
+IMAGE_PIPELINE_WORKERS = config('IMAGE_PIPELINE_WORKERS', default=2, cast=int)
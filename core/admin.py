@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Category, Tag, UserFeedBack, ApplicationAPK, AccessModel
+from .models import Category, Tag, UserFeedBack, ApplicationAPK, AccessModel, WebhookEndpoint, OutboundEmail
 from bible.models import Book, Chapter, Verse, BibleVersion, ReadingPlan, ReadingPlanDay, Bookmark 
 
 @admin.register(Category)
@@ -25,11 +25,25 @@ class UserFeedBackAdmin(admin.ModelAdmin):
     
 @admin.register(ApplicationAPK)
 class ApplicationAdminAPK(admin.ModelAdmin):
-    list_display = ('name', 'version', 'type', 'created_at')
+    list_display = ('name', 'version', 'type', 'download_count', 'created_at')
     search_fields = ('name', 'version', 'type')
     prepopulated_fields = {'slug': ('name',)}
     ordering = ('version',)
 
+@admin.register(WebhookEndpoint)
+class WebhookEndpointAdmin(admin.ModelAdmin):
+    list_display = ('provider', 'url', 'endpoint_id', 'created_at')
+    search_fields = ('url', 'endpoint_id')
+    list_filter = ('provider',)
+
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ('to', 'subject', 'status', 'attempts', 'next_attempt_at', 'sent_at', 'created_at')
+    list_filter = ('status', 'created_at')
+    search_fields = ('to', 'subject')
+    readonly_fields = ('attempts', 'last_error', 'sent_at')
+    ordering = ('-created_at',)
+
 
 
 
@@ -54,3 +68,5 @@ admin_site.register(ReadingPlan)
 admin_site.register(ReadingPlanDay)
 admin_site.register(Bookmark)
 admin_site.register(AccessModel)
+admin_site.register(WebhookEndpoint, WebhookEndpointAdmin)
+admin_site.register(OutboundEmail, OutboundEmailAdmin)
\ No newline at end of file
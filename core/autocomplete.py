@@ -0,0 +1,128 @@
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_left
+
+from django.core.cache import cache
+
+VERSION_CACHE_KEY = 'autocomplete:version'
+# How often a worker checks the shared version for catalog changes
+VERSION_CHECK_SECONDS = 5
+
+_WORD_START_RE = re.compile(r'(?:^|(?<=\s))\w', re.UNICODE)
+
+
+def normalize(text):
+    """
+    Lowercase, strip accents and collapse whitespace.
+    """
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(char for char in text if not unicodedata.combining(char)).lower()
+    return ' '.join(text.split())
+
+
+class PrefixIndex:
+    """
+    Sorted array of (key, entry) pairs searched with bisect.
+
+    Every word start of a label is indexed, so "grace" finds "Amazing Grace".
+    """
+
+    def __init__(self, entries):
+        pairs = []
+        for entry, texts in entries:
+            for text in texts:
+                text = normalize(text)
+                for match in _WORD_START_RE.finditer(text):
+                    pairs.append((text[match.start():], entry))
+        pairs.sort(key=lambda pair: pair[0])
+        self._keys = [key for key, _ in pairs]
+        self._entries = [entry for _, entry in pairs]
+
+    def __len__(self):
+        return len(self._keys)
+
+    def search(self, prefix, limit=10, types=None):
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+
+        results = []
+        seen = set()
+        position = bisect_left(self._keys, prefix)
+        while position < len(self._keys) and self._keys[position].startswith(prefix):
+            entry = self._entries[position]
+            position += 1
+            identity = (entry['type'], entry['id'])
+            if identity in seen or (types and entry['type'] not in types):
+                continue
+            seen.add(identity)
+            results.append(entry)
+            if len(results) >= limit:
+                break
+        return results
+
+
+def build_index():
+    """
+    Load song titles, artists and Bible book names into a PrefixIndex.
+    """
+    from bible.models import BibleVersion, Book
+    from songs.models import Song
+
+    entries = []
+    artists = {}
+    for song_id, title, artist in Song.objects.filter(is_active=True).values_list('id', 'title', 'artist'):
+        entries.append(({'type': 'song', 'id': str(song_id), 'label': title, 'detail': artist}, [title]))
+        if artist:
+            artists.setdefault(normalize(artist), artist)
+
+    for key, artist in artists.items():
+        entries.append(({'type': 'artist', 'id': key, 'label': artist, 'detail': None}, [artist]))
+
+    languages = dict(BibleVersion.objects.values_list('bible_id', 'language'))
+    for book_id, name, abbreviation, bible_id in Book.objects.values_list('id', 'name', 'abbreviation', 'bible_id'):
+        entry = {'type': 'book', 'id': str(book_id), 'label': name, 'detail': languages.get(bible_id)}
+        entries.append((entry, [name, abbreviation]))
+
+    return PrefixIndex(entries)
+
+
+_state = {'index': None, 'version': None, 'checked_at': 0.0}
+_build_lock = threading.Lock()
+
+
+def get_index():
+    """
+    Return this worker's index, rebuilding it when the catalog version changed.
+    """
+    now = time.monotonic()
+    if _state['index'] is not None and now - _state['checked_at'] < VERSION_CHECK_SECONDS:
+        return _state['index']
+
+    version = cache.get(VERSION_CACHE_KEY)
+    if version is None:
+        version = time.time()
+        cache.add(VERSION_CACHE_KEY, version, None)
+        version = cache.get(VERSION_CACHE_KEY, version)
+
+    if _state['index'] is None or version != _state['version']:
+        with _build_lock:
+            if _state['index'] is None or version != _state['version']:
+                _state['index'] = build_index()
+                _state['version'] = version
+    _state['checked_at'] = now
+    return _state['index']
+
+
+def invalidate():
+    """
+    Mark the catalog as changed so every worker rebuilds its index.
+    """
+    cache.set(VERSION_CACHE_KEY, time.time(), None)
+    _state['checked_at'] = 0.0
+
+
+def autocomplete(prefix, limit=10, types=None):
+    return get_index().search(prefix, limit=limit, types=types)
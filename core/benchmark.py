@@ -0,0 +1,513 @@
+import json
+import logging
+import os
+import platform
+import random
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from queue import Empty, Queue
+
+import django
+from django.conf import settings
+from django.db import connection
+from django.test import Client, override_settings
+from django.utils import timezone
+
+from . import http_client
+
+PROVIDERS = ('api_bible', 'suno', 'heygen', 'huggingface')
+SCENARIOS = (
+    'verse-list', 'search-verses', 'search_songs', 'playlists', 'generate',
+    'generate_music_callback', 'generate_video_callback',
+)
+PERCENTILES = (50, 90, 95, 99)
+# Fake media served by the Suno and HeyGen stand-ins
+AUDIO_BYTES = b'ID3' + bytes(256 * 1024)
+VIDEO_BYTES = bytes(1024 * 1024)
+
+BOOKS = (
+    'Genesis', 'Exodus', 'Leviticus', 'Numbers', 'Deuteronomy', 'Joshua', 'Judges', 'Ruth', '1 Samuel',
+    '2 Samuel', '1 Kings', '2 Kings', '1 Chronicles', '2 Chronicles', 'Ezra', 'Nehemiah', 'Esther', 'Job',
+    'Psalms', 'Proverbs', 'Ecclesiastes', 'Song of Solomon', 'Isaiah', 'Jeremiah', 'Lamentations',
+    'Ezekiel', 'Daniel', 'Hosea', 'Joel', 'Amos', 'Obadiah', 'Jonah', 'Micah', 'Nahum', 'Habakkuk',
+    'Zephaniah', 'Haggai', 'Zechariah', 'Malachi', 'Matthew', 'Mark', 'Luke', 'John', 'Acts', 'Romans',
+    '1 Corinthians', '2 Corinthians', 'Galatians', 'Ephesians', 'Philippians', 'Colossians',
+    '1 Thessalonians', '2 Thessalonians', '1 Timothy', '2 Timothy', 'Titus', 'Philemon', 'Hebrews',
+    'James', '1 Peter', '2 Peter', '1 John', '2 John', '3 John', 'Jude', 'Revelation',
+)
+WORDS = (
+    'lord', 'god', 'light', 'grace', 'mercy', 'shepherd', 'spirit', 'heart', 'soul', 'faith', 'hope',
+    'love', 'peace', 'glory', 'kingdom', 'heaven', 'earth', 'water', 'bread', 'word', 'truth', 'life',
+    'path', 'lamp', 'rock', 'salvation', 'praise', 'holy', 'righteous', 'people', 'israel', 'jerusalem',
+    'mountain', 'valley', 'river', 'fire', 'king', 'servant', 'children', 'father', 'blessed', 'eternal',
+    'strength', 'refuge', 'covenant', 'promise', 'wisdom', 'joy', 'song', 'voice', 'hand', 'day', 'night',
+)
+SEARCH_TERMS = ('light', 'shepherd', 'grace', 'mercy', 'salvation', 'covenant', 'refuge', 'lamp')
+GENRES = ('worship', 'gospel', 'hymn', 'contemporary christian', 'afrobeat')
+
+
+# Provider stand-ins
+
+def _api_bible(method, path, body):
+    return 200, {'data': []}
+
+
+def _huggingface(method, path, body):
+    return 200, {'choices': [{'message': {'content': '1. "Lamp Unto My Feet" 2. "Light Unto My Path"'}}]}
+
+
+def _suno(method, path, body):
+    if method == 'GET' and path.startswith('/audio/'):
+        return 200, AUDIO_BYTES
+    if method == 'POST' and path.endswith('/generate'):
+        return 200, {'code': 200, 'msg': 'success', 'data': {'taskId': uuid.uuid4().hex}}
+    return 404, {'code': 404, 'msg': 'Not found'}
+
+
+def _heygen(method, path, body):
+    if method == 'GET' and path.startswith('/videos/'):
+        return 200, VIDEO_BYTES
+    if method == 'POST' and path.endswith('/video/generate'):
+        return 200, {'error': None, 'data': {'video_id': uuid.uuid4().hex}}
+    if method == 'GET' and path.startswith('/v1/video_status.get'):
+        return 200, {'code': 100, 'data': {'status': 'processing'}}
+    return 404, {'error': 'Not found'}
+
+
+ROUTES = {'api_bible': _api_bible, 'suno': _suno, 'heygen': _heygen, 'huggingface': _huggingface}
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def _respond(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        status, payload = self.server.route(self.command, self.path, body)
+        if isinstance(payload, bytes):
+            content, content_type = payload, 'application/octet-stream'
+        else:
+            content, content_type = json.dumps(payload).encode(), 'application/json'
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    do_GET = do_POST = _respond
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StandIns:
+    """
+    Local HTTP servers answering like API.Bible, Suno, HeyGen and Hugging Face,
+    each after latency seconds. urls maps provider -> base URL once started.
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.servers = {}
+        self.urls = {}
+
+    def __enter__(self):
+        for provider in PROVIDERS:
+            server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+            server.daemon_threads = True
+            server.route = ROUTES[provider]
+            server.latency = self.latency
+            threading.Thread(target=server.serve_forever, name=f'standin-{provider}', daemon=True).start()
+            self.servers[provider] = server
+            self.urls[provider] = f'http://127.0.0.1:{server.server_address[1]}'
+        return self
+
+    def __exit__(self, *exc_info):
+        for server in self.servers.values():
+            server.shutdown()
+            server.server_close()
+
+
+# Dataset
+
+def _text(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize() + '.'
+
+
+def seed(scale=1, random_seed=42):
+    """
+    Fill the (empty, benchmark) database with a deterministic dataset sized by
+    scale. Returns what the scenarios need to build their requests.
+    """
+    from bible.models import BibleVersion, Book, Chapter, Verse
+    from core.models import Category
+    from songs.models import Playlist, PlaylistSong, Song, SongSearchTerm
+    from songs.search import song_terms
+    from users.authentication import tokens_for_user
+    from users.models import User
+
+    rng = random.Random(random_seed)
+
+    versions = BibleVersion.objects.bulk_create([
+        BibleVersion(bible_id='de4e12af7f28f599-02', name='King James Version', abbreviation='KJV'),
+        BibleVersion(bible_id='9879dbb7cfe39e4d-04', name='World English Bible', abbreviation='WEB'),
+    ])
+    books = Book.objects.bulk_create([
+        Book(book_id=f'B{number:02d}', name=name, abbreviation=name[:3].upper(),
+             testament='OT' if number <= 39 else 'NT', book_number=number, total_chapters=5 * scale)
+        for number, name in enumerate(BOOKS, start=1)
+    ])
+    # verse-list takes an integer chapter id, which UUIDField reads as UUID(int=n)
+    chapters = Chapter.objects.bulk_create([
+        Chapter(id=uuid.UUID(int=index * 5 * scale + number), book=book, chapter_number=str(number), total_verses=25)
+        for index, book in enumerate(books)
+        for number in range(1, 5 * scale + 1)
+    ])
+    Verse.objects.bulk_create([
+        Verse(chapter=chapter, verse_number=str(number), text=_text(rng, rng.randint(12, 30)), version=version)
+        for chapter in chapters
+        for version in versions
+        for number in range(1, chapter.total_verses + 1)
+    ], batch_size=2000)
+
+    categories = Category.objects.bulk_create([
+        Category(name=name.title(), slug=name.replace(' ', '-')) for name in GENRES
+    ])
+    artists = [f'{rng.choice(WORDS).title()} {rng.choice(WORDS).title()} Choir' for _ in range(40)]
+    songs = Song.objects.bulk_create([
+        Song(title=' '.join(rng.choice(WORDS) for _ in range(rng.randint(2, 4))).title(),
+             artist=rng.choice(artists), album=f'{rng.choice(WORDS).title()} Sessions',
+             lyrics='\n'.join(_text(rng, 8) for _ in range(16)), duration=timedelta(seconds=rng.randint(150, 330)),
+             category=rng.choice(categories), bpm=rng.randint(60, 140))
+        for _ in range(400 * scale)
+    ])
+    SongSearchTerm.objects.bulk_create([
+        SongSearchTerm(song_id=song.pk, term=term, weight=weight)
+        for song in songs
+        for term, weight in song_terms(song).items()
+    ], batch_size=2000)
+
+    users = [
+        User.objects.create_user(
+            email=f'listener{number}@example.com', username=f'listener{number}', password='benchmark-password',
+            first_name='Listener', last_name=str(number),
+        )
+        for number in range(20 * scale)
+    ]
+    playlists = Playlist.objects.bulk_create([
+        Playlist(name=f'{rng.choice(WORDS).title()} Playlist', user=users[number % len(users)],
+                 is_public=number % 3 == 0, songs_count=15)
+        for number in range(100 * scale)
+    ])
+    PlaylistSong.objects.bulk_create([
+        PlaylistSong(playlist=playlist, song=song, order=order)
+        for playlist in playlists
+        for order, song in enumerate(rng.sample(songs, 15))
+    ], batch_size=2000)
+
+    user = users[0]
+    return {
+        'user': user,
+        'token': str(tokens_for_user(user).access_token),
+        'chapters': [chapter.pk.int for chapter in chapters],
+        'counts': {
+            'verses': Verse.objects.count(),
+            'songs': len(songs),
+            'users': len(users),
+            'playlists': len(playlists),
+        },
+    }
+
+
+# Scenarios: each returns `count` (method, path, body, authenticated) requests
+
+def _verse_list(data, stand_ins, count, rng):
+    return [('GET', f'/api/v1/bible/chapters/{rng.choice(data["chapters"])}/verses/', None, False)
+            for _ in range(count)]
+
+
+def _search_verses(data, stand_ins, count, rng):
+    return [('GET', f'/api/v1/bible/search/?q={rng.choice(SEARCH_TERMS)}', None, False) for _ in range(count)]
+
+
+def _search_songs(data, stand_ins, count, rng):
+    return [('GET', f'/api/v1/songs/search/?q={rng.choice(WORDS)}', None, False) for _ in range(count)]
+
+
+def _playlists(data, stand_ins, count, rng):
+    return [('GET', '/api/v1/songs/playlists/', None, True) for _ in range(count)]
+
+
+def _generate(data, stand_ins, count, rng):
+    return [
+        ('POST', '/api/v1/songs/generate/',
+         {'bible_verse': f'{rng.choice(BOOKS)} 1:{rng.randint(1, 25)}', 'genre': rng.choice(GENRES), 'mood': 'uplifting'},
+         True)
+        for _ in range(count)
+    ]
+
+
+def _music_callback(data, stand_ins, count, rng):
+    from songs.models import GeneratedSongs
+
+    songs = GeneratedSongs.objects.bulk_create([
+        GeneratedSongs(bible_verse='Psalm 119:105', title='Light Unto My Path', genre='gospel', mood='uplifting',
+                       task_id=uuid.uuid4().hex, user=data['user'])
+        for _ in range(count)
+    ])
+    return [
+        ('POST', '/api/v1/songs/generated-music-callback/', {
+            'code': 200, 'msg': 'All generated successfully.',
+            'data': {'callbackType': 'complete', 'task_id': song.task_id, 'data': [
+                {'id': uuid.uuid4().hex, 'title': song.title, 'duration': 198.4,
+                 'audio_url': f'{stand_ins.urls["suno"]}/audio/{song.task_id}.mp3'},
+            ]},
+        }, False)
+        for song in songs
+    ]
+
+
+def _video_callback(data, stand_ins, count, rng):
+    from songs.models import GeneratedVideo
+
+    videos = GeneratedVideo.objects.bulk_create([
+        GeneratedVideo(bible_verse='John 3:16', title='For God So Loved', video_id=uuid.uuid4().hex, user=data['user'])
+        for _ in range(count)
+    ])
+    return [
+        ('POST', '/api/v1/songs/generated-videos-callback/', {
+            'event_type': 'avatar_video.success',
+            'event_data': {'video_id': video.video_id, 'url': f'{stand_ins.urls["heygen"]}/videos/{video.video_id}.mp4'},
+        }, False)
+        for video in videos
+    ]
+
+
+BUILDERS = {
+    'verse-list': _verse_list,
+    'search-verses': _search_verses,
+    'search_songs': _search_songs,
+    'playlists': _playlists,
+    'generate': _generate,
+    'generate_music_callback': _music_callback,
+    'generate_video_callback': _video_callback,
+}
+
+
+# Measurement
+
+_DB_TIMING = re.compile(r'db;dur=([\d.]+);desc="(\d+) queries"')
+_HTTP_TIMING = re.compile(r'http-[\w-]+;dur=([\d.]+)')
+
+
+def _send(client, request, token):
+    method, path, body, authenticated = request
+    extra = {'HTTP_AUTHORIZATION': f'Bearer {token}'} if authenticated else {}
+    started = time.perf_counter()
+    if method == 'GET':
+        response = client.get(path, **extra)
+    else:
+        response = client.generic(method, path, json.dumps(body), content_type='application/json', **extra)
+    elapsed = time.perf_counter() - started
+
+    # Query and upstream times come from PerformanceMiddleware's Server-Timing
+    server_timing = response.get('Server-Timing', '')
+    db = _DB_TIMING.search(server_timing)
+    return {
+        'status': response.status_code,
+        'ms': elapsed * 1000,
+        'db_queries': int(db.group(2)) if db else 0,
+        'db_ms': float(db.group(1)) if db else 0.0,
+        'upstream_ms': sum(float(ms) for ms in _HTTP_TIMING.findall(server_timing)),
+    }
+
+
+def _run_requests(requests, concurrency, token):
+    """
+    Send requests from `concurrency` threads. Returns (samples, wall seconds).
+    """
+    queue = Queue()
+    for request in requests:
+        queue.put(request)
+    samples = []
+    lock = threading.Lock()
+
+    def worker():
+        client = Client()
+        try:
+            while True:
+                try:
+                    request = queue.get_nowait()
+                except Empty:
+                    return
+                sample = _send(client, request, token)
+                with lock:
+                    samples.append(sample)
+        finally:
+            if threading.current_thread() is not threading.main_thread():
+                connection.close()
+
+    started = time.perf_counter()
+    if concurrency <= 1:
+        worker()
+    else:
+        threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    return samples, time.perf_counter() - started
+
+
+def percentile(values, q):
+    """
+    q-th percentile of sorted values, interpolating between ranks.
+    """
+    if not values:
+        return 0.0
+    rank = (len(values) - 1) * q / 100
+    low = int(rank)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (rank - low)
+
+
+def summarize(samples, wall):
+    latencies = sorted(sample['ms'] for sample in samples)
+    queries = [sample['db_queries'] for sample in samples]
+    count = len(samples) or 1
+    return {
+        'requests': len(samples),
+        'statuses': dict(Counter(str(sample['status']) for sample in samples)),
+        'errors': sum(1 for sample in samples if sample['status'] >= 400),
+        'throughput_rps': round(len(samples) / wall, 2) if wall else 0.0,
+        'latency_ms': {
+            'mean': round(sum(latencies) / count, 3),
+            **{f'p{q}': round(percentile(latencies, q), 3) for q in PERCENTILES},
+            'max': round(latencies[-1], 3) if latencies else 0.0,
+        },
+        'db_queries': {'mean': round(sum(queries) / count, 2), 'max': max(queries, default=0)},
+        'db_ms_mean': round(sum(sample['db_ms'] for sample in samples) / count, 3),
+        'upstream_ms_mean': round(sum(sample['upstream_ms'] for sample in samples) / count, 3),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(scenarios=SCENARIOS, iterations=200, warmup=20, concurrency=1, scale=1, upstream_latency=0.02,
+        use_configured_cache=False, report=None):
+    """
+    Seed a throwaway test database, point every provider at local stand-ins and
+    measure each scenario. Returns the results dict written by the command.
+    report, if given, is called with a progress message per step.
+    """
+    report = report or (lambda message: None)
+    media_root = tempfile.mkdtemp(prefix='benchmark-media-')
+    overrides = {
+        'DEBUG': False,
+        'ALLOWED_HOSTS': [*settings.ALLOWED_HOSTS, 'testserver'],
+        'PERF_SAMPLE_RATE': 1.0,
+        # Only the stand-ins' latency should limit generation
+        'GENERATION_QUOTAS': {'free': {}},
+        'MEDIA_ROOT': media_root,
+    }
+    if not use_configured_cache:
+        overrides['CACHES'] = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+    perf_logger = logging.getLogger('perf')
+    perf_level = perf_logger.level
+    perf_logger.setLevel(logging.WARNING)
+    old_name = connection.settings_dict['NAME']
+    created = False
+    try:
+        with StandIns(upstream_latency) as stand_ins:
+            outbound = {provider: dict(settings.OUTBOUND_HTTP.get(provider, {})) for provider in PROVIDERS}
+            for provider, url in stand_ins.urls.items():
+                outbound[provider]['base_url'] = url
+            with override_settings(OUTBOUND_HTTP=outbound, **overrides):
+                http_client.reset_sessions()
+                connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+                created = True
+
+                report(f'Seeding dataset (scale {scale})')
+                started = time.perf_counter()
+                data = seed(scale)
+                report(f'Seeded {data["counts"]} in {time.perf_counter() - started:.1f}s')
+
+                results = {}
+                rng = random.Random(7)
+                for name in scenarios:
+                    requests = BUILDERS[name](data, stand_ins, warmup + iterations, rng)
+                    _run_requests(requests[:warmup], concurrency, data['token'])
+                    samples, wall = _run_requests(requests[warmup:], concurrency, data['token'])
+                    results[name] = summarize(samples, wall)
+                    report(f'{name}: {results[name]["throughput_rps"]} req/s')
+    finally:
+        if created:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+        http_client.reset_sessions()
+        perf_logger.setLevel(perf_level)
+        shutil.rmtree(media_root, ignore_errors=True)
+
+    return {
+        'commit': git_commit(),
+        'created_at': timezone.now().isoformat(),
+        'environment': {
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'cache': 'configured' if use_configured_cache else 'locmem',
+            'cpus': os.cpu_count(),
+        },
+        'parameters': {
+            'iterations': iterations,
+            'warmup': warmup,
+            'concurrency': concurrency,
+            'scale': scale,
+            'upstream_latency_ms': upstream_latency * 1000,
+        },
+        'dataset': data['counts'],
+        'scenarios': results,
+    }
+
+
+def compare(previous, current):
+    """
+    One line per scenario with the change in p50/p95 latency, throughput and
+    queries against a previous run.
+    """
+    def change(old, new):
+        return f'{(new - old) / old * 100:+.1f}%' if old else 'n/a'
+
+    lines = []
+    if previous.get('parameters') != current['parameters']:
+        lines.append(f"Parameters differ: {previous.get('parameters')} -> {current['parameters']}")
+    for name, result in current['scenarios'].items():
+        before = previous.get('scenarios', {}).get(name)
+        if before is None:
+            lines.append(f'{name}: new')
+            continue
+        lines.append(
+            f"{name}: p50 {change(before['latency_ms']['p50'], result['latency_ms']['p50'])}, "
+            f"p95 {change(before['latency_ms']['p95'], result['latency_ms']['p95'])}, "
+            f"throughput {change(before['throughput_rps'], result['throughput_rps'])}, "
+            f"queries {before['db_queries']['mean']} -> {result['db_queries']['mean']}"
+        )
+    return lines
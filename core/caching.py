@@ -0,0 +1,254 @@
+import logging
+import threading
+import time
+import zlib
+from collections import Counter, OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import close_old_connections
+
+from . import timings
+
+logger = logging.getLogger(__name__)
+
+# How often a worker checks a namespace's shared generation for invalidations
+GENERATION_CHECK_SECONDS = 5
+# How long a caller waits for another worker's computation before doing it itself
+WAIT_POLL_SECONDS = 0.05
+
+_namespaces = {}
+_key_locks = [threading.Lock() for _ in range(64)]
+
+
+class TieredCache:
+    """
+    Two-tier cache for one namespace of keys.
+
+    Values are looked up in a small per-process LRU first, then in the shared
+    Django cache (Redis or files, see CACHES). Keys are prefixed with the
+    namespace, a code version (bump it when the cached shape changes) and a
+    shared generation, so invalidate() drops the whole namespace in every
+    worker at once.
+
+    get_or_set() recomputes a missing value once across all workers
+    (single-flight) while other callers wait for it, and with stale_ttl keeps
+    serving an expired value while one worker refreshes it in the background.
+
+    Local copies live for at most local_ttl seconds, so writes made by another
+    worker show up within that delay; use local_size=0 for values that must
+    never be stale.
+    """
+
+    def __init__(self, namespace, version=1, local_size=None, local_ttl=None, alias='default'):
+        self.namespace = namespace
+        self.version = version
+        self.local_size = settings.CACHE_LOCAL_SIZE if local_size is None else local_size
+        self.local_ttl = settings.CACHE_LOCAL_SECONDS if local_ttl is None else local_ttl
+        self.alias = alias
+        self.stats = Counter()
+        self._local = OrderedDict()
+        self._local_lock = threading.Lock()
+        self._generation = None
+        self._generation_checked_at = 0.0
+        _namespaces[namespace] = self
+
+    @property
+    def shared(self):
+        return caches[self.alias]
+
+    # Keys
+
+    def _generation_key(self):
+        return f'ns:{self.namespace}:generation'
+
+    def generation(self):
+        now = time.monotonic()
+        if self._generation is not None and now - self._generation_checked_at < GENERATION_CHECK_SECONDS:
+            return self._generation
+
+        key = self._generation_key()
+        generation = self.shared.get(key)
+        if generation is None:
+            self.shared.add(key, 1, None)
+            generation = self.shared.get(key, 1)
+        if generation != self._generation:
+            with self._local_lock:
+                self._local.clear()
+            self._generation = generation
+        self._generation_checked_at = now
+        return generation
+
+    def make_key(self, key):
+        return f'{self.namespace}:{self.version}:{self.generation()}:{key}'
+
+    # Local tier
+
+    def _local_get(self, full_key):
+        if not self.local_size:
+            return None
+        with self._local_lock:
+            entry = self._local.get(full_key)
+            if entry is None:
+                return None
+            envelope, expires = entry
+            if expires < time.monotonic():
+                del self._local[full_key]
+                return None
+            self._local.move_to_end(full_key)
+            return envelope
+
+    def _local_set(self, full_key, envelope):
+        if not self.local_size:
+            return
+        with self._local_lock:
+            self._local[full_key] = (envelope, time.monotonic() + self.local_ttl)
+            self._local.move_to_end(full_key)
+            while len(self._local) > self.local_size:
+                self._local.popitem(last=False)
+
+    def _local_delete(self, full_key):
+        with self._local_lock:
+            self._local.pop(full_key, None)
+
+    # Reads and writes
+
+    def _lookup(self, full_key):
+        """
+        Return the (value, fresh_until) envelope from the nearest tier, or None.
+        """
+        envelope = self._local_get(full_key)
+        if envelope is not None:
+            self.stats['local_hits'] += 1
+            timings.record_cache(hit=True)
+            return envelope
+        envelope = self.shared.get(full_key)
+        if envelope is not None:
+            self.stats['shared_hits'] += 1
+            self._local_set(full_key, envelope)
+        timings.record_cache(hit=envelope is not None)
+        return envelope
+
+    def _store(self, full_key, value, ttl, stale_ttl=0):
+        envelope = (value, time.time() + ttl)
+        self.shared.set(full_key, envelope, ttl + stale_ttl)
+        self._local_set(full_key, envelope)
+
+    def get(self, key, default=None):
+        envelope = self._lookup(self.make_key(key))
+        if envelope is None:
+            self.stats['misses'] += 1
+            return default
+        return envelope[0]
+
+    def set(self, key, value, ttl, stale_ttl=0):
+        self._store(self.make_key(key), value, ttl, stale_ttl)
+
+    def delete(self, key):
+        full_key = self.make_key(key)
+        self.shared.delete(full_key)
+        self._local_delete(full_key)
+
+    def invalidate(self):
+        """
+        Drop every key of the namespace, in all workers.
+        """
+        key = self._generation_key()
+        self.shared.add(key, 1, None)
+        try:
+            self.shared.incr(key)
+        except ValueError:
+            self.shared.set(key, int(time.time()), None)
+        self._generation_checked_at = 0.0
+
+    def get_or_set(self, key, compute, ttl, stale_ttl=0, lock_timeout=30):
+        """
+        Return the cached value for key, computing it with compute() on a miss.
+
+        Only one caller across all workers computes a missing key; the others
+        wait up to lock_timeout for its result. With stale_ttl, a value that
+        expired less than stale_ttl seconds ago is returned immediately and
+        refreshed in a background thread.
+        """
+        full_key = self.make_key(key)
+        envelope = self._lookup(full_key)
+        if envelope is not None:
+            value, fresh_until = envelope
+            if time.time() < fresh_until:
+                return value
+            self.stats['stale_hits'] += 1
+            self._refresh_in_background(full_key, compute, ttl, stale_ttl, lock_timeout)
+            return value
+
+        self.stats['misses'] += 1
+        return self._compute(full_key, compute, ttl, stale_ttl, lock_timeout)
+
+    # Single-flight recomputation
+
+    def _lock_key(self, full_key):
+        return f'{full_key}:lock'
+
+    def _compute(self, full_key, compute, ttl, stale_ttl, lock_timeout):
+        # One thread per process, then one process across workers
+        lock_key = self._lock_key(full_key)
+        with _key_locks[zlib.crc32(full_key.encode()) % len(_key_locks)]:
+            envelope = self.shared.get(full_key)
+            if envelope is not None and time.time() < envelope[1]:
+                self._local_set(full_key, envelope)
+                return envelope[0]
+
+            if self.shared.add(lock_key, True, lock_timeout):
+                try:
+                    value = compute()
+                    self.stats['computes'] += 1
+                    self._store(full_key, value, ttl, stale_ttl)
+                    return value
+                finally:
+                    self.shared.delete(lock_key)
+
+        # Another worker is computing it; wait outside the stripe lock so this
+        # process's other keys sharing the stripe are not held up meanwhile
+        deadline = time.monotonic() + lock_timeout
+        while time.monotonic() < deadline:
+            time.sleep(WAIT_POLL_SECONDS)
+            envelope = self.shared.get(full_key)
+            if envelope is not None and time.time() < envelope[1]:
+                self._local_set(full_key, envelope)
+                return envelope[0]
+            if self.shared.get(lock_key) is None:
+                break
+
+        # The other worker gave up or died; compute without the lock
+        value = compute()
+        self.stats['computes'] += 1
+        self._store(full_key, value, ttl, stale_ttl)
+        return value
+
+    def _refresh_in_background(self, full_key, compute, ttl, stale_ttl, lock_timeout):
+        lock_key = self._lock_key(full_key)
+        if not self.shared.add(lock_key, True, lock_timeout):
+            return
+
+        def refresh():
+            try:
+                self._store(full_key, compute(), ttl, stale_ttl)
+                self.stats['computes'] += 1
+            except Exception as e:
+                logger.error(f"[CACHE] Refreshing {full_key} failed: {e}")
+            finally:
+                self.shared.delete(lock_key)
+                close_old_connections()
+
+        threading.Thread(target=refresh, name=f'cache-refresh-{self.namespace}', daemon=True).start()
+
+
+def cache_stats():
+    """
+    Hit/miss counters of every namespace in this process:
+    {'bible_api': {'local_hits': 10, 'shared_hits': 2, 'stale_hits': 0, 'misses': 1, 'computes': 1}}
+    """
+    fields = ('local_hits', 'shared_hits', 'stale_hits', 'misses', 'computes')
+    return {
+        namespace: {field: tiered.stats[field] for field in fields}
+        for namespace, tiered in _namespaces.items()
+    }
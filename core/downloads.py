@@ -0,0 +1,87 @@
+import atexit
+import logging
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db.models import F
+
+from .caching import TieredCache
+
+logger = logging.getLogger(__name__)
+
+_pending = Counter()
+_pending_lock = threading.Lock()
+_last_flush = [time.monotonic()]
+
+
+apk_cache = TieredCache('apk')
+
+
+def _lookup_key(slug, platform):
+    return f'{slug}:{platform or "any"}'
+
+
+def get_apk(slug, platform=None):
+    """
+    Return the ApplicationAPK for a slug (and platform, when known).
+
+    Only the fields needed to serve the file are kept, and the lookup is
+    cached until the APK is saved or deleted.
+    """
+    from .models import ApplicationAPK
+
+    def lookup():
+        queryset = ApplicationAPK.objects.filter(slug=slug)
+        if platform:
+            queryset = queryset.filter(type=platform)
+        return queryset.values('id', 'name', 'version', 'type', 'file').first() or {}
+
+    cached = apk_cache.get_or_set(_lookup_key(slug, platform), lookup, settings.DOWNLOAD_LOOKUP_CACHE_SECONDS)
+
+    if not cached:
+        return None
+    return ApplicationAPK(**cached)
+
+
+def forget_apk(slug):
+    for platform in (None, 'android', 'ios'):
+        apk_cache.delete(_lookup_key(slug, platform))
+
+
+def record_download(apk_id):
+    """
+    Count a download in memory; counts are written in batches by flush_downloads.
+    """
+    with _pending_lock:
+        _pending[apk_id] += 1
+        due = (
+            sum(_pending.values()) >= settings.DOWNLOAD_COUNT_FLUSH_SIZE
+            or time.monotonic() - _last_flush[0] >= settings.DOWNLOAD_COUNT_FLUSH_SECONDS
+        )
+    if due:
+        flush_downloads()
+
+
+def flush_downloads():
+    """
+    Write buffered download counts, one UPDATE per APK version.
+    """
+    from .models import ApplicationAPK
+
+    with _pending_lock:
+        pending = dict(_pending)
+        _pending.clear()
+        _last_flush[0] = time.monotonic()
+
+    for apk_id, count in pending.items():
+        try:
+            ApplicationAPK.objects.filter(pk=apk_id).update(download_count=F('download_count') + count)
+        except Exception as e:
+            logger.error(f"[DOWNLOAD] Failed to store {count} downloads for {apk_id}: {e}")
+            with _pending_lock:
+                _pending[apk_id] += count
+
+
+atexit.register(flush_downloads)
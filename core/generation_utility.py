@@ -1,12 +1,20 @@
+import logging
 import requests
 import re
 import json
+from functools import lru_cache
 from huggingface_hub import InferenceClient, login
 from decouple import config
+from .http_client import get_async_client, get_session, huggingface_provider, use_for_huggingface
+
+logger = logging.getLogger(__name__)
 
 
 SUNO_API_KEY = config('SUNO_API_KEY')
 SUNO_BASE_URL = "https://api.sunoapi.org/api/v1"
+SUNO_CALLBACK_URL = "https://gospelux.com/api/v1/songs/generated-music-callback/"
+HF_CHAT_COMPLETIONS_URL = "https://router.huggingface.co/v1/chat/completions"
+HF_CHAT_MODEL = "mistralai/Mistral-7B-Instruct-v0.2"
 
 
 suno_headers = {
@@ -15,6 +23,7 @@ suno_headers = {
 }
 
 
+use_for_huggingface()
 login(config('HF_API_TOKEN'))
 
 
@@ -110,18 +119,26 @@ bible_verse = 'For I known the plans I have for you, says the Lord. They are pla
 # print(song)
 
 
+@lru_cache(maxsize=None)
+def get_inference_client(provider):
+    """
+    Return a shared InferenceClient for a Hugging Face inference provider.
+    """
+    return InferenceClient(
+        provider=provider,
+        api_key=config('HF_API_TOKEN'))
+
+
 def model_generator(prompt, max_tokens=50, temperature=0.8):
     """
     Send a text prompt to Mistral-7B-Instruct-v0.3 and return the generated response.
     """
     try:
-        client = InferenceClient(
-            provider="featherless-ai",
-            api_key=config('HF_API_TOKEN'))
+        client = get_inference_client("featherless-ai")
 
 
         completion = client.chat.completions.create(
-            model="mistralai/Mistral-7B-Instruct-v0.2",
+            model=HF_CHAT_MODEL,
             messages=[
                 {
                     "role": "user",
@@ -138,16 +155,8 @@ def model_generator(prompt, max_tokens=50, temperature=0.8):
         return f"Request error: {e}"
 
 
-def generate_song(bible_verse, title=None, genre='gospel', mood='uplifting', song_length_style='medium song with 2'):
-    
-    API_KEY = config('SUNO_API_KEY')
-    print(API_KEY)
-    BASE_URL = "https://api.sunoapi.org/api/v1"
-    headers = {
-        "Authorization": f"Bearer {API_KEY}",
-        "Content-Type": "application/json"
-    }
-    
+def song_prompt(bible_verse, genre='gospel', mood='uplifting', song_length_style='medium song with 2'):
+    """Validate the song options and build the lyrics prompt."""
     if mood not in ('uplifting', 'reflective', 'joyful', 'somber'):
         raise ValueError("Invalid mood. Choose from 'uplifting', 'reflective', 'joyful', 'somber'.")
     
@@ -157,24 +166,40 @@ def generate_song(bible_verse, title=None, genre='gospel', mood='uplifting', son
     if genre not in ('worship', 'classical', 'gospel', 'contemporary christian', 'hymn', 'pop', 'rock', 'afrobeat'):
         raise ValueError("Invalid genre. Choose from 'worship', 'gospel', 'contemporary Christian', 'hymn'.")
     
-    url = f"{BASE_URL}/generate"
-    prompt_template = f"""You are a professional Christian songwriter. 
+    return f"""You are a professional Christian songwriter. 
         Create a {genre} song based on {bible_verse}. The song should have a {mood} tone. Structure it as {song_length_style} verses, a repeating chorus, and a bridge. 
         Keep the lyrics faithful to the message of the verse while making it musically engaging and emotionally impactful. 
         Ensure the chorus is memorable and can be easily sung by others."""
-    
-    payload = {
-        "prompt": model_generator(prompt_template, max_tokens=2500, temperature=0.7),
+
+
+def song_payload(lyrics, title, genre):
+    """Build the Suno generate request body."""
+    return {
+        "prompt": lyrics,
         "style": genre,
         "title": title,
         "customMode": True,
         "instrumental": False,
         "model": "V3_5",
         # "negativeTags": "Heavy Metal, Upbeat Drums",
-        "callBackUrl": "https://gospelux.com/api/v1/songs/generated-music-callback/"
+        "callBackUrl": SUNO_CALLBACK_URL
+    }
+
+
+def generate_song(bible_verse, title=None, genre='gospel', mood='uplifting', song_length_style='medium song with 2'):
+    
+    API_KEY = config('SUNO_API_KEY')
+    BASE_URL = "https://api.sunoapi.org/api/v1"
+    headers = {
+        "Authorization": f"Bearer {API_KEY}",
+        "Content-Type": "application/json"
     }
+    
+    url = f"{BASE_URL}/generate"
+    prompt_template = song_prompt(bible_verse, genre, mood, song_length_style)
+    payload = song_payload(model_generator(prompt_template, max_tokens=2500, temperature=0.7), title, genre)
 
-    response = requests.post(url, headers=headers, json=payload)
+    response = get_session('suno').post(url, headers=headers, json=payload)
     if response.status_code == 200:
         return response.json()
     else:
@@ -182,13 +207,64 @@ def generate_song(bible_verse, title=None, genre='gospel', mood='uplifting', son
         return response
 
 
-def generate_sermon(bible_verse, length_points=5):
-    """Generate a song title based on a Bible verse using a text generation model."""
+async def amodel_generator(prompt, max_tokens=50, temperature=0.8):
+    """
+    Async version of model_generator, calling the Hugging Face router's
+    OpenAI-compatible endpoint without blocking a thread.
+    """
+    try:
+        response = await get_async_client('huggingface').post(
+            HF_CHAT_COMPLETIONS_URL,
+            headers={"Authorization": f"Bearer {config('HF_API_TOKEN')}"},
+            json={
+                "model": f"{HF_CHAT_MODEL}:featherless-ai",
+                "messages": [
+                    {
+                        "role": "user",
+                        "content": prompt
+                    }
+                ],
+                "max_tokens": max_tokens,
+                "temperature": temperature,
+                "top_p": 0.7,
+            },
+        )
+        response.raise_for_status()
+        return response.json()["choices"][0]["message"]["content"].strip()
+    except Exception as e:
+        return f"Request error: {e}"
+
+
+async def agenerate_song(bible_verse, title=None, genre='gospel', mood='uplifting', song_length_style='medium song with 2'):
+    """Async version of generate_song. Always returns the Suno JSON body."""
+    headers = {
+        "Authorization": f"Bearer {config('SUNO_API_KEY')}",
+        "Content-Type": "application/json"
+    }
 
-    prompt = f"""Generate a full sermon outline from {bible_verse}.
+    prompt_template = song_prompt(bible_verse, genre, mood, song_length_style)
+    lyrics = await amodel_generator(prompt_template, max_tokens=2500, temperature=0.7)
+
+    response = await get_async_client('suno').post(
+        f"{SUNO_BASE_URL}/generate", headers=headers, json=song_payload(lyrics, title, genre)
+    )
+    if response.status_code != 200:
+        logger.error(f"[SUNO] Song generation request failed ({response.status_code}): {response.text[:500]}")
+        return {"code": response.status_code, "msg": response.text}
+    return response.json()
+
+
+def sermon_prompt(bible_verse, length_points=5):
+    return f"""Generate a full sermon outline from {bible_verse}.
     Include: a captivating title, a clear objective, an introduction, 
     {length_points} main points with 1 or 2 sub-points (explanation, illustration, application, and supporting Scriptures), an application section, and a conclusion. 
     Make it inspirational and practical for teaching and preaching."""
+
+
+def generate_sermon(bible_verse, length_points=5):
+    """Generate a song title based on a Bible verse using a text generation model."""
+
+    prompt = sermon_prompt(bible_verse, length_points)
     titles = model_generator(prompt, max_tokens=3000)
     try:
         return titles[0]['generated_text'].strip()
@@ -196,20 +272,24 @@ def generate_sermon(bible_verse, length_points=5):
         return titles.strip()
 
 
+async def agenerate_sermon(bible_verse, length_points=5):
+    """Async version of generate_sermon."""
+    sermon = await amodel_generator(sermon_prompt(bible_verse, length_points), max_tokens=3000)
+    return sermon.strip()
+
+
 def generate_video(verse, video_style='bibilical', length_seconds=60):
     prompt = f"""You are a professional video scriptwriter. 
         Create a {length_seconds}-second {video_style} video script based on the following topic: {verse}. 
         Ensure the script is engaging, concise, and suitable for a short video format."""
     video_scripts = model_generator(prompt, max_tokens=500)
-    client = InferenceClient(
-        provider="fal-ai",
-        api_key=config("HF_API_TOKEN"),
-    )
+    client = get_inference_client("fal-ai")
 
-    video = client.text_to_video(
-        prompt=video_scripts,
-        model="meituan-longcat/LongCat-Video",
-    )
+    with huggingface_provider('huggingface_video'):
+        video = client.text_to_video(
+            prompt=video_scripts,
+            model="meituan-longcat/LongCat-Video",
+        )
     
     return video
 
@@ -275,7 +355,7 @@ def generate_heygen_video(verse: str, video_style: str ='bibilical', length_seco
     }
 
     try:
-        response = requests.post(url, headers=headers, data=json.dumps(payload))
+        response = get_session('heygen').post(url, headers=headers, data=json.dumps(payload))
         response.raise_for_status()  # Raises an HTTPError for bad responses (4xx or 5xx)
         return response.json()
     except requests.exceptions.RequestException as e:
@@ -301,7 +381,7 @@ def get_video_status(video_id: str):
 
     try:
         # Make the GET request
-        response = requests.get(base_url, headers=headers, params=params)
+        response = get_session('heygen').get(base_url, headers=headers, params=params)
 
         # Check for a successful response (status code 200)
         response.raise_for_status() 
@@ -1,8 +1,11 @@
 import requests
 import json
+import threading
 import time
 from typing import Optional, Dict, List, Any
 
+from .http_client import get_async_client, get_session
+
 class HeyGenVideoCreator:
     """
     A Python client for creating videos with HeyGen's V2 API.
@@ -21,22 +24,71 @@ class HeyGenVideoCreator:
             "x-api-key": api_key,
             "Content-Type": "application/json"
         }
+        self.session = get_session("heygen")
     
-    def api_callback_register(self):
-        url = "https://api.heygen.com/v1/webhook/endpoint.add"
-        headers = {
-            "accept": "application/json",
-            "content-type": "application/json",
-            "X-Api-Key": self.api_key
-        }
+    def api_callback_register(
+        self,
+        url: str = "https://gospelux.com/api/v1/songs/generated-videos-callback/",
+        events: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """
+        Register a webhook endpoint with HeyGen.
+
+        Every call adds a new endpoint, so prefer ensure_webhook_endpoint.
+
+        Args:
+            url: Public URL HeyGen should post video events to
+            events: Events to subscribe to (default: avatar video success/fail)
+
+        Returns:
+            Response containing the endpoint_id and secret
+        """
+        endpoint = f"{self.base_url}/v1/webhook/endpoint.add"
         payload = {
-            "url": "https://gospelux.com/generated-videos-callback",
-            "events": ["avatar_video.success", "avatar_video.fail"]
+            "url": url,
+            "events": events or ["avatar_video.success", "avatar_video.fail"]
         }
 
-        response = requests.post(url, json=payload, headers=headers)
-        print(response.json())
-    
+        response = self.session.post(endpoint, json=payload, headers=self.headers)
+        return response.json()
+
+    def list_webhook_endpoints(self) -> List[Dict[str, Any]]:
+        """
+        Retrieve the webhook endpoints registered for this API key.
+
+        Returns:
+            List of endpoint dicts with endpoint_id, url and events
+        """
+        endpoint = f"{self.base_url}/v1/webhook/endpoint.list"
+
+        response = self.session.get(endpoint, headers=self.headers)
+        response.raise_for_status()
+        return response.json().get("data") or []
+
+    def ensure_webhook_endpoint(
+        self,
+        url: str,
+        events: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """
+        Return the endpoint registered for ``url``, registering it only if missing.
+
+        Args:
+            url: Public URL HeyGen should post video events to
+            events: Events to subscribe to (default: avatar video success/fail)
+
+        Returns:
+            Endpoint dict with endpoint_id, url and events
+        """
+        for existing in self.list_webhook_endpoints():
+            if existing.get("url") == url:
+                return existing
+
+        response = self.api_callback_register(url=url, events=events)
+        if response.get("error") or not response.get("data"):
+            raise RuntimeError(f"HeyGen webhook registration failed: {response}")
+        return response["data"]
+
     def create_video(
         self,
         video_inputs: List[Dict[str, Any]],
@@ -81,7 +133,7 @@ class HeyGenVideoCreator:
         if folder_id:
             payload["folder_id"] = folder_id
         
-        response = requests.post(endpoint, headers=self.headers, json=payload)
+        response = self.session.post(endpoint, headers=self.headers, json=payload)
         return response.json()
     
     def get_voices_list(self) -> Dict[str, Any]:
@@ -93,7 +145,7 @@ class HeyGenVideoCreator:
         """
         endpoint = f"{self.base_url}/v2/voices"
         
-        return requests.get(endpoint, headers=self.headers).json()["data"]["voices"]
+        return self.session.get(endpoint, headers=self.headers).json()["data"]["voices"]
     
     def get_avatars_list(self, avatar_type: str = "avatars") -> Dict[str, Any]:
         """
@@ -106,7 +158,7 @@ class HeyGenVideoCreator:
         if avatar_type not in ("avatars", "talking_photos"):
             raise ValueError("avatar_type must be 'avatars' or 'talking_photos'")
         
-        return requests.get(endpoint, headers=self.headers).json()["data"][avatar_type]
+        return self.session.get(endpoint, headers=self.headers).json()["data"][avatar_type]
     
     def create_simple_video(
         self,
@@ -395,7 +447,23 @@ class HeyGenVideoCreator:
         endpoint = f"{self.base_url}/v1/video_status.get"
         params = {"video_id": video_id}
         
-        response = requests.get(endpoint, headers=self.headers, params=params)
+        response = self.session.get(endpoint, headers=self.headers, params=params)
+        return response.json()
+
+    async def aget_video_status(self, video_id: str) -> Dict[str, Any]:
+        """
+        Async version of get_video_status.
+        
+        Args:
+            video_id: The video ID returned from create_video
+            
+        Returns:
+            Response containing video status and URL if completed
+        """
+        endpoint = f"{self.base_url}/v1/video_status.get"
+        params = {"video_id": video_id}
+        
+        response = await get_async_client("heygen").get(endpoint, headers=self.headers, params=params)
         return response.json()
     
     def wait_for_video(
@@ -460,7 +528,7 @@ class HeyGenVideoCreator:
         """
         try:
             print(f"Downloading video to {output_path}...")
-            response = requests.get(video_url, stream=True)
+            response = self.session.get(video_url, stream=True)
             response.raise_for_status()
             
             with open(output_path, 'wb') as f:
@@ -584,11 +652,109 @@ def select_avatar_for_scene(speaker_type, avatars):
         for a in avatars:
             if a.get("gender").lower() == "female" and "casual" in a.get("avatar_name", "").lower() or "office" in a.get("avatar_name", "").lower():
                 return a["avatar_id"]
-        
+
 
     return avatars[0]["avatar_id"]
 
 
+SPEAKER_TYPES = ("presenter", "male", "female", "god", "angel")
+
+
+class HeyGenCatalog:
+    """
+    Process-wide cache of the HeyGen voice and avatar catalogs.
+
+    The catalogs are downloaded at most once per ``ttl`` seconds and a
+    speaker_type -> voice_id/avatar_id index is built from them, so picking
+    voices and avatars for a video is a dictionary lookup per scene.
+    """
+
+    def __init__(self, client: HeyGenVideoCreator, ttl: int = 6 * 60 * 60, retry_after: int = 60):
+        """
+        Initialize the catalog.
+
+        Args:
+            client: HeyGen client used to download the catalogs
+            ttl: Seconds before the catalogs are downloaded again (default: 6 hours)
+            retry_after: Seconds to keep serving the previous index after a
+                failed download before trying again (default: 60)
+        """
+        self.client = client
+        self.ttl = ttl
+        self.retry_after = retry_after
+        self._voice_index: Dict[str, str] = {}
+        self._avatar_index: Dict[str, str] = {}
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def _is_stale(self) -> bool:
+        return self._loaded_at is None or time.monotonic() - self._loaded_at > self.ttl
+
+    def refresh(self) -> None:
+        """
+        Download both catalogs and rebuild the speaker_type index.
+        """
+        voices = self.client.get_voices_list()
+        avatars = self.client.get_avatars_list()
+
+        voice_index = {}
+        avatar_index = {}
+        for speaker_type in SPEAKER_TYPES:
+            voice_index[speaker_type] = select_voice_for_scene(speaker_type, voices)
+            avatar_index[speaker_type] = select_avatar_for_scene(speaker_type, avatars)
+
+        self._voice_index = voice_index
+        self._avatar_index = avatar_index
+        self._loaded_at = time.monotonic()
+
+    def _ensure_loaded(self) -> None:
+        if not self._is_stale():
+            return
+        with self._lock:
+            if not self._is_stale():
+                return
+            try:
+                self.refresh()
+            except Exception:
+                # Keep serving the previous index if HeyGen is unreachable,
+                # and only try again after retry_after instead of on every lookup
+                if not self._voice_index:
+                    raise
+                self._loaded_at = time.monotonic() - self.ttl + self.retry_after
+
+    def invalidate(self) -> None:
+        """
+        Force the next lookup to download the catalogs again.
+        """
+        self._loaded_at = None
+
+    def voice_for(self, speaker_type: str) -> str:
+        """
+        Return the voice_id for a speaker type, falling back to the presenter voice.
+        """
+        self._ensure_loaded()
+        speaker_type = (speaker_type or "presenter").lower()
+        return self._voice_index.get(speaker_type, self._voice_index["presenter"])
+
+    def avatar_for(self, speaker_type: str) -> str:
+        """
+        Return the avatar_id for a speaker type, falling back to the presenter avatar.
+        """
+        self._ensure_loaded()
+        speaker_type = (speaker_type or "presenter").lower()
+        return self._avatar_index.get(speaker_type, self._avatar_index["presenter"])
+
+    def assign_scenes(self, scenes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Fill in voice_id and avatar_id for each scene from its speaker_type.
+        """
+        for scene in scenes:
+            speaker_type = scene.get("speaker_type", "presenter")
+            scene["voice_id"] = self.voice_for(speaker_type)
+            scene["avatar_id"] = self.avatar_for(speaker_type)
+        return scenes
+
+
 
 # Example usage
 # if __name__ == "__main__":
@@ -0,0 +1,347 @@
+import asyncio
+import contextlib
+import contextvars
+import functools
+import logging
+import threading
+import time
+import weakref
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit, urlunsplit
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from . import timings
+
+logger = logging.getLogger(__name__)
+
+# Per-provider defaults. Timeouts are (connect, read) in seconds; max_concurrency
+# caps in-flight requests per process so one slow upstream cannot take every
+# worker thread. Override any key through settings.OUTBOUND_HTTP, which also
+# accepts 'base_url' to send a provider's requests to another host.
+PROVIDER_DEFAULTS = {
+    'default': {'timeout': (5, 30), 'max_concurrency': 10, 'pool_size': 10, 'retries': 2},
+    'suno': {'timeout': (5, 30), 'max_concurrency': 10, 'pool_size': 10, 'retries': 2},
+    'heygen': {'timeout': (5, 30), 'max_concurrency': 10, 'pool_size': 10, 'retries': 2},
+    'huggingface': {'timeout': (5, 120), 'max_concurrency': 8, 'pool_size': 8, 'retries': 1},
+    # Text-to-video (fal-ai through Hugging Face) answers only once the video is rendered
+    'huggingface_video': {'timeout': (5, 600), 'max_concurrency': 2, 'pool_size': 2, 'retries': 0},
+    'api_bible': {'timeout': (5, 15), 'max_concurrency': 10, 'pool_size': 10, 'retries': 3},
+}
+
+# Generation calls (POST) are not idempotent, so only safe methods are retried.
+RETRY_METHODS = frozenset(['GET', 'HEAD', 'OPTIONS'])
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+_sessions: Dict[str, 'ProviderSession'] = {}
+_sessions_lock = threading.Lock()
+
+# Per-provider concurrency limits shared by the sync sessions and every async client
+_slots: Dict[str, threading.BoundedSemaphore] = {}
+_slots_lock = threading.Lock()
+
+_async_clients: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, AsyncProviderClient]]' = weakref.WeakKeyDictionary()
+# Provider whose session huggingface_hub's requests go through, see huggingface_provider()
+_huggingface_provider: contextvars.ContextVar = contextvars.ContextVar('huggingface_provider', default='huggingface')
+# Clients of the current async_client_scope(), closed when it exits
+_client_scope: contextvars.ContextVar = contextvars.ContextVar('async_client_scope', default=None)
+
+_metrics: Dict[str, Dict[str, float]] = {}
+_metrics_lock = threading.Lock()
+
+
+def get_provider_config(provider: str) -> Dict[str, Any]:
+    """
+    Return the effective configuration for a provider.
+    """
+    from django.conf import settings
+
+    provider_config = dict(PROVIDER_DEFAULTS['default'])
+    provider_config.update(PROVIDER_DEFAULTS.get(provider, {}))
+    provider_config.update(getattr(settings, 'OUTBOUND_HTTP', {}).get(provider, {}))
+    return provider_config
+
+
+def redirect_url(url, base_url: Optional[str]) -> str:
+    """
+    Move url to base_url's scheme and host, keeping its path and query, e.g.
+    to point a provider at a local stand-in. No-op without base_url.
+    """
+    if not base_url:
+        return url
+    base = urlsplit(base_url)
+    parts = urlsplit(str(url))
+    return urlunsplit((base.scheme, base.netloc, base.path.rstrip('/') + parts.path, parts.query, parts.fragment))
+
+
+def record_call(provider: str, elapsed: float, error: bool) -> None:
+    """
+    Record one outbound call in the per-provider counters.
+    """
+    timings.record_http(provider, elapsed)
+    with _metrics_lock:
+        stats = _metrics.setdefault(provider, {
+            'requests': 0, 'errors': 0, 'latency_total': 0.0, 'latency_max': 0.0
+        })
+        stats['requests'] += 1
+        stats['latency_total'] += elapsed
+        stats['latency_max'] = max(stats['latency_max'], elapsed)
+        if error:
+            stats['errors'] += 1
+
+
+def provider_metrics() -> Dict[str, Dict[str, float]]:
+    """
+    Return a snapshot of per-provider call counts, errors and latency.
+    """
+    with _metrics_lock:
+        snapshot = {provider: dict(stats) for provider, stats in _metrics.items()}
+
+    for stats in snapshot.values():
+        stats['latency_avg'] = stats['latency_total'] / stats['requests'] if stats['requests'] else 0.0
+    return snapshot
+
+
+def provider_slots(provider: str) -> threading.BoundedSemaphore:
+    """
+    Return the semaphore capping in-flight requests to a provider across
+    this whole process: sync sessions, every event loop and every client.
+    """
+    slots = _slots.get(provider)
+    if slots is None:
+        with _slots_lock:
+            slots = _slots.get(provider)
+            if slots is None:
+                slots = _slots[provider] = threading.BoundedSemaphore(get_provider_config(provider)['max_concurrency'])
+    return slots
+
+
+async def _acquire_slot(slots: threading.BoundedSemaphore, wait: float) -> bool:
+    # A threading semaphore is the only limit shared across event loops, so
+    # poll it with short sleeps instead of blocking the loop
+    deadline = time.monotonic() + wait
+    delay = 0.005
+    while not slots.acquire(blocking=False):
+        if time.monotonic() >= deadline:
+            return False
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, 0.1)
+    return True
+
+
+class ProviderSession(requests.Session):
+    """
+    A pooled requests.Session for one external provider.
+
+    Connections are kept alive and reused, every request gets the provider's
+    default timeout, safe methods are retried with backoff, in-flight requests
+    are capped by a semaphore, and latency/errors are recorded per provider.
+    """
+
+    def __init__(self, provider: str):
+        super().__init__()
+        self.provider = provider
+        provider_config = get_provider_config(provider)
+        self.default_timeout = provider_config['timeout']
+        self.upstream_url = provider_config.get('base_url')
+        self._slots = provider_slots(provider)
+
+        retry = Retry(
+            total=provider_config['retries'],
+            backoff_factor=0.5,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=RETRY_METHODS,
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=provider_config['pool_size'],
+            pool_maxsize=provider_config['pool_size'],
+            max_retries=retry,
+        )
+        self.mount('https://', adapter)
+        self.mount('http://', adapter)
+
+    def request(self, method, url, *args, **kwargs):
+        url = redirect_url(url, self.upstream_url)
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = self.default_timeout
+
+        wait = kwargs['timeout'][0] if isinstance(kwargs['timeout'], tuple) else kwargs['timeout']
+        if not self._slots.acquire(timeout=wait):
+            record_call(self.provider, 0.0, error=True)
+            raise requests.exceptions.ConnectTimeout(
+                f"Too many concurrent requests to {self.provider}"
+            )
+
+        started = time.perf_counter()
+        error = True
+        try:
+            response = super().request(method, url, *args, **kwargs)
+            error = response.status_code >= 500
+            return response
+        finally:
+            self._slots.release()
+            elapsed = time.perf_counter() - started
+            record_call(self.provider, elapsed, error)
+            if elapsed > 5:
+                logger.info(f"[HTTP] slow {self.provider} {method} {url} took {elapsed:.2f}s")
+
+
+def get_session(provider: str = 'default') -> ProviderSession:
+    """
+    Return the shared session for a provider, creating it on first use.
+    """
+    session = _sessions.get(provider)
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(provider)
+            if session is None:
+                session = ProviderSession(provider)
+                _sessions[provider] = session
+    return session
+
+
+class AsyncProviderClient(httpx.AsyncClient):
+    """
+    The asyncio counterpart of ProviderSession, built on httpx.
+
+    In-flight requests count against the same process-wide provider_slots()
+    as the sync sessions, connect errors are retried by the transport, and
+    latency/errors are recorded in the same per-provider counters.
+    """
+
+    def __init__(self, provider: str):
+        self.provider = provider
+        provider_config = get_provider_config(provider)
+        connect, read = provider_config['timeout']
+        self.connect_timeout = connect
+        self.upstream_url = provider_config.get('base_url')
+        super().__init__(
+            timeout=httpx.Timeout(read, connect=connect, pool=connect),
+            limits=httpx.Limits(
+                max_connections=provider_config['max_concurrency'],
+                max_keepalive_connections=provider_config['pool_size'],
+            ),
+            transport=httpx.AsyncHTTPTransport(retries=provider_config['retries']),
+            follow_redirects=True,
+        )
+
+    async def request(self, method, url, *args, **kwargs):
+        url = redirect_url(url, self.upstream_url)
+        slots = provider_slots(self.provider)
+        if not await _acquire_slot(slots, self.connect_timeout):
+            record_call(self.provider, 0.0, error=True)
+            raise httpx.PoolTimeout(f"Too many concurrent requests to {self.provider}")
+
+        started = time.perf_counter()
+        error = True
+        try:
+            response = await super().request(method, url, *args, **kwargs)
+            error = response.status_code >= 500
+            return response
+        finally:
+            slots.release()
+            elapsed = time.perf_counter() - started
+            record_call(self.provider, elapsed, error)
+            if elapsed > 5:
+                logger.info(f"[HTTP] slow {self.provider} {method} {url} took {elapsed:.2f}s")
+
+
+def get_async_client(provider: str = 'default') -> AsyncProviderClient:
+    """
+    Return the async client for a provider.
+
+    Inside async_client_scope() the client belongs to the scope and is closed
+    with it. Outside a scope one client is kept per event loop, which only
+    suits a long-lived ASGI loop (ASYNC_HTTP_SHARED_CLIENTS): under WSGI every
+    async view runs on its own short-lived loop and must use a scope.
+    """
+    clients = _client_scope.get()
+    if clients is None:
+        clients = _async_clients.setdefault(asyncio.get_running_loop(), {})
+    client = clients.get(provider)
+    if client is None:
+        client = clients[provider] = AsyncProviderClient(provider)
+    return client
+
+
+@contextlib.asynccontextmanager
+async def async_client_scope():
+    """
+    Give the enclosed code its own async clients and close them on exit,
+    unless clients are shared on a long-lived loop (ASYNC_HTTP_SHARED_CLIENTS).
+    """
+    from django.conf import settings
+
+    if settings.ASYNC_HTTP_SHARED_CLIENTS or _client_scope.get() is not None:
+        yield
+        return
+
+    clients = {}
+    token = _client_scope.set(clients)
+    try:
+        yield
+    finally:
+        _client_scope.reset(token)
+        for client in clients.values():
+            await client.aclose()
+
+
+def with_async_clients(view):
+    """
+    Run an async view (or view method) inside async_client_scope().
+    """
+    @functools.wraps(view)
+    async def wrapper(*args, **kwargs):
+        async with async_client_scope():
+            return await view(*args, **kwargs)
+    return wrapper
+
+
+def reset_sessions() -> None:
+    """
+    Close the shared sync sessions so the next get_session() call picks up
+    changed settings (async clients live only as long as their scope).
+    """
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+    with _slots_lock:
+        _slots.clear()
+
+
+class HuggingFaceSession(requests.Session):
+    """
+    The session huggingface_hub is given: every request is sent through the
+    ProviderSession of the current huggingface_provider().
+    """
+
+    def request(self, method, url, *args, **kwargs):
+        return get_session(_huggingface_provider.get()).request(method, url, *args, **kwargs)
+
+
+@contextlib.contextmanager
+def huggingface_provider(provider: str):
+    """
+    Send huggingface_hub calls made inside the block through provider's
+    session, e.g. 'huggingface_video' for its longer read timeout.
+    """
+    token = _huggingface_provider.set(provider)
+    try:
+        yield
+    finally:
+        _huggingface_provider.reset(token)
+
+
+def use_for_huggingface() -> None:
+    """
+    Route huggingface_hub (InferenceClient, login) through the shared sessions.
+    """
+    from huggingface_hub import configure_http_backend
+
+    configure_http_backend(backend_factory=HuggingFaceSession)
@@ -0,0 +1,212 @@
+import io
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.db.models.signals import post_save
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {
+    'webp': ('WEBP', '.webp', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', '.jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+# Keys of a variants dict that are not size labels
+META_KEYS = ('source', 'error')
+# Variants never share a directory with uploads, so they cannot collide with one
+VARIANTS_PREFIX = 'variants/'
+
+# (app_label.ModelName, field name) -> (model, on_processed callback)
+_registry = {}
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def variants_field(field_name):
+    return f'{field_name}_variants'
+
+
+def variant_name(model_label, pk, label, extension):
+    """
+    ('users.User', 42, 'small', '.webp') -> variants/users.user/42/small.webp
+
+    Only a suggestion: storage appends a suffix if the name is taken, and the
+    name it returns is the one stored in the variants dict.
+    """
+    return f'{VARIANTS_PREFIX}{model_label.lower()}/{pk}/{label}{extension}'
+
+
+def variant_urls(variants):
+    """
+    {'small': {'webp': url, 'jpeg': url}, ...} for a stored variants dict.
+    """
+    return {
+        label: {fmt: default_storage.url(name) for fmt, name in names.items()}
+        for label, names in (variants or {}).items()
+        if label not in META_KEYS
+    }
+
+
+def _variant_names(variants):
+    return {name for label, names in (variants or {}).items() if label not in META_KEYS for name in names.values()}
+
+
+def _delete_variants(names):
+    # Names stored before variants had their own prefix were derived from the
+    # upload's name and may belong to someone else's upload: leave them
+    for name in names:
+        if name.startswith(VARIANTS_PREFIX):
+            default_storage.delete(name)
+
+
+def _save(name, image, fmt, icc_profile=None):
+    pil_format, _, options = FORMATS[fmt]
+    buffer = io.BytesIO()
+    # Only the colour profile is kept; EXIF is never written
+    image.save(buffer, pil_format, icc_profile=icc_profile, **options)
+    return default_storage.save(name, ContentFile(buffer.getvalue()))
+
+
+def _strip_original(field_file, image):
+    """
+    Re-save the original without EXIF (camera details, GPS position) when it
+    has any. Orientation has already been applied to the pixels.
+    """
+    if not image.getexif() and 'exif' not in image.info:
+        return
+    pil_format = image.format or 'JPEG'
+    clean = ImageOps.exif_transpose(image)
+    if pil_format == 'JPEG' and clean.mode not in ('RGB', 'L'):
+        clean = clean.convert('RGB')
+    buffer = io.BytesIO()
+    options = {'quality': 90} if pil_format == 'JPEG' else {}
+    clean.save(buffer, pil_format, icc_profile=image.info.get('icc_profile'), **options)
+    name = field_file.name
+    default_storage.delete(name)
+    default_storage.save(name, ContentFile(buffer.getvalue()))
+
+
+def build_variants(field_file, model_label, pk):
+    """
+    Write square WebP and JPEG variants of an image at IMAGE_VARIANT_SIZES
+    under VARIANTS_PREFIX, and strip EXIF from the original. Returns the
+    variants dict stored on the model.
+    """
+    sizes = settings.IMAGE_VARIANT_SIZES
+    with field_file.open('rb') as f:
+        image = Image.open(f)
+        # Let the JPEG decoder downscale while decoding multi-megapixel photos
+        image.draft('RGB', (max(sizes.values()) * 2,) * 2)
+        image.load()
+    icc_profile = image.info.get('icc_profile')
+
+    oriented = ImageOps.exif_transpose(image)
+    if oriented.mode not in ('RGB', 'RGBA'):
+        oriented = oriented.convert('RGBA' if 'transparency' in oriented.info else 'RGB')
+
+    variants = {'source': field_file.name}
+    for label, size in sizes.items():
+        resized = ImageOps.fit(oriented, (size, size), Image.LANCZOS)
+        variants[label] = {}
+        for fmt, (_, extension, _) in FORMATS.items():
+            frame = resized.convert('RGB') if fmt == 'jpeg' else resized
+            variants[label][fmt] = _save(variant_name(model_label, pk, label, extension), frame, fmt, icc_profile)
+
+    with field_file.open('rb') as f:
+        _strip_original(field_file, Image.open(f))
+    return variants
+
+
+def process_image(model_label, pk, field_name):
+    """
+    Build the variants of one instance's image and store them on it. Does
+    nothing if the image changed or was removed in the meantime.
+
+    An image that cannot be processed is recorded as {'source': name,
+    'error': message}, so it is not retried until it changes (or
+    process_images --retry-failed), and the error is raised again.
+    """
+    model, on_processed = _registry[(model_label, field_name)]
+    instance = model.objects.filter(pk=pk).first()
+    field_file = getattr(instance, field_name, None)
+    if not field_file:
+        return None
+
+    target = variants_field(field_name)
+    previous = getattr(instance, target) or {}
+    try:
+        variants = build_variants(field_file, model_label, pk)
+    except Exception as e:
+        failure = {'source': field_file.name, 'error': str(e)[:500]}
+        if model.objects.filter(pk=pk, **{field_name: field_file.name}).update(**{target: failure}):
+            _delete_variants(_variant_names(previous))
+        raise
+
+    updated = model.objects.filter(pk=pk, **{field_name: field_file.name}).update(**{target: variants})
+    if not updated:
+        _delete_variants(_variant_names(variants))
+        return None
+
+    _delete_variants(_variant_names(previous) - _variant_names(variants))
+
+    setattr(instance, target, variants)
+    if on_processed:
+        on_processed(instance)
+    return variants
+
+
+def _run(model_label, pk, field_name):
+    try:
+        process_image(model_label, pk, field_name)
+    except Exception as e:
+        logger.error(f"[IMAGES] Could not process {model_label} {pk} {field_name}: {e}")
+    finally:
+        close_old_connections()
+
+
+def schedule(model_label, pk, field_name):
+    """
+    Process an image in this worker's background pool, unless processing is
+    left to the process_images command (IMAGE_PIPELINE_DISPATCH = 'cron').
+    """
+    global _executor
+    if settings.IMAGE_PIPELINE_DISPATCH != 'thread':
+        return
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.IMAGE_PIPELINE_WORKERS, thread_name_prefix='images')
+    _executor.submit(_run, model_label, pk, field_name)
+
+
+def needs_processing(instance, field_name, retry_failed=False):
+    field_file = getattr(instance, field_name)
+    variants = getattr(instance, variants_field(field_name)) or {}
+    if not field_file:
+        return False
+    return variants.get('source') != field_file.name or (retry_failed and 'error' in variants)
+
+
+def register_image_field(model, field_name, on_processed=None):
+    """
+    Build variants for model.field_name whenever a new image is saved.
+    The model needs a JSONField named <field_name>_variants. on_processed is
+    called with the instance once its variants are stored.
+    """
+    model_label = model._meta.label
+    _registry[(model_label, field_name)] = (model, on_processed)
+
+    def queue_image(sender, instance, raw=False, **kwargs):
+        if not raw and needs_processing(instance, field_name):
+            transaction.on_commit(lambda: schedule(model_label, instance.pk, field_name))
+
+    post_save.connect(queue_image, sender=model, weak=False, dispatch_uid=f'images:{model_label}:{field_name}')
+
+
+def registered_fields():
+    return [(model, field_name) for (_, field_name), (model, _) in _registry.items()]
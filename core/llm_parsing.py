@@ -0,0 +1,187 @@
+import json
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+SPEAKER_TYPES = ("presenter", "male", "female", "god", "angel")
+
+_FENCE_RE = re.compile(r'```(?:json)?')
+_TRAILING_COMMA_RE = re.compile(r',\s*([}\]])')
+_SMART_QUOTES = str.maketrans({'“': '"', '”': '"', '‘': "'", '’': "'"})
+
+
+def iter_json_candidates(text):
+    """
+    Yield every top-level ``{...}`` / ``[...]`` block in ``text``, in order.
+
+    A single pass that tracks bracket depth and string/escape state, so braces
+    inside string values do not end a block early. A block still open at the
+    end of the text (e.g. output cut off by max_tokens) is yielded as-is for
+    repair_json to close.
+    """
+    start = None
+    stack = []
+    in_string = False
+    escaped = False
+
+    for index, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == '\\':
+                escaped = True
+            elif char == '"':
+                in_string = False
+            continue
+
+        if char == '"' and stack:
+            in_string = True
+        elif char in '{[':
+            if not stack:
+                start = index
+            stack.append('}' if char == '{' else ']')
+        elif char in '}]' and stack:
+            if char != stack[-1]:
+                # Mismatched closer, drop this block and rescan after it
+                stack = []
+                start = None
+                continue
+            stack.pop()
+            if not stack:
+                yield text[start:index + 1]
+                start = None
+
+    if stack and start is not None:
+        yield text[start:]
+
+
+def repair_json(candidate):
+    """
+    Fix the mistakes LLMs commonly make in otherwise valid JSON.
+
+    Normalizes smart quotes, drops trailing commas and closes any string,
+    object or array left open by a truncated response.
+    """
+    candidate = candidate.translate(_SMART_QUOTES).strip()
+    candidate = _TRAILING_COMMA_RE.sub(r'\1', candidate)
+
+    stack = []
+    in_string = False
+    escaped = False
+    for char in candidate:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == '\\':
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in '{[':
+            stack.append('}' if char == '{' else ']')
+        elif char in '}]' and stack:
+            stack.pop()
+
+    if in_string:
+        candidate += '"'
+    candidate = candidate.rstrip().rstrip(',')
+    # A dangling key ("text": ) cannot be closed meaningfully, give it a null
+    if candidate.endswith(':'):
+        candidate += ' null'
+    candidate += ''.join(reversed(stack))
+    return _TRAILING_COMMA_RE.sub(r'\1', candidate)
+
+
+def iter_json_values(text):
+    """
+    Yield every JSON value that can be recovered from an LLM response, in
+    order, each candidate block parsed as-is or else after repair.
+
+    Raises:
+        ValueError: if the text is empty
+    """
+    if not text or not text.strip():
+        raise ValueError("Empty response text")
+
+    text = _FENCE_RE.sub('', text)
+    for candidate in iter_json_candidates(text):
+        for attempt in (candidate, repair_json(candidate)):
+            try:
+                yield json.loads(attempt)
+                break
+            except json.JSONDecodeError:
+                continue
+
+
+def extract_json(text):
+    """
+    Extract the first parseable JSON value from an LLM response.
+
+    Raises:
+        ValueError: if no JSON value can be recovered, even after repair
+    """
+    for value in iter_json_values(text):
+        return value
+    raise ValueError("Could not extract valid JSON from response: no JSON found")
+
+
+def validate_scenes(data, default_duration=5):
+    """
+    Validate and normalize a video script into a list of scenes.
+
+    Accepts ``{"scenes": [...]}`` or a bare list. Scenes without text are
+    dropped, unknown speaker types fall back to "presenter" and durations are
+    coerced to ints.
+
+    Raises:
+        ValueError: if no usable scene remains
+    """
+    scenes = data.get("scenes") if isinstance(data, dict) else data
+    if not isinstance(scenes, list):
+        raise ValueError("Script has no 'scenes' list")
+
+    valid = []
+    for scene in scenes:
+        if not isinstance(scene, dict):
+            continue
+        text = str(scene.get("text") or "").strip()
+        if not text:
+            continue
+
+        speaker_type = str(scene.get("speaker_type") or "presenter").lower()
+        if speaker_type not in SPEAKER_TYPES:
+            speaker_type = "presenter"
+
+        try:
+            duration = int(float(scene.get("duration_seconds") or default_duration))
+        except (TypeError, ValueError):
+            duration = default_duration
+
+        valid.append({
+            "speaker_type": speaker_type,
+            "text": text,
+            "duration_seconds": duration,
+        })
+
+    if not valid:
+        raise ValueError("Script contains no valid scenes")
+    return valid
+
+
+def parse_scenes(text):
+    """
+    Return the scenes of the first JSON value in a video script LLM response
+    that validates as a script, skipping unrelated JSON before it.
+
+    Raises:
+        ValueError: if no value in the response is a usable script
+    """
+    last_error = None
+    for value in iter_json_values(text):
+        try:
+            return validate_scenes(value)
+        except ValueError as e:
+            last_error = e
+    raise ValueError(f"Could not extract a video script from response: {last_error or 'no JSON found'}")
@@ -0,0 +1,181 @@
+import logging
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# A row left in 'sending' this long is assumed to belong to a dead worker
+STALE_SENDING = timedelta(minutes=10)
+
+_dispatch_lock = threading.Lock()
+_dispatch_pending = threading.Event()
+
+
+def enqueue_email(to, subject, body, html_body=''):
+    """
+    Queue an email and return the OutboundEmail row.
+
+    The request only pays for an INSERT; delivery happens after commit
+    according to EMAIL_QUEUE_DISPATCH ('thread', 'celery' or 'cron'). Only new
+    mail triggers a dispatch, so retries that come due later are sent by the
+    send_queued_email command, which must run from cron in every mode.
+    """
+    from .models import OutboundEmail
+
+    email = OutboundEmail.objects.create(to=to, subject=subject, body=body, html_body=html_body)
+    transaction.on_commit(dispatch)
+    return email
+
+
+def dispatch():
+    """
+    Start delivering the queue without blocking the caller.
+    """
+    mode = settings.EMAIL_QUEUE_DISPATCH
+    if mode == 'celery':
+        from .tasks import deliver_queued_email
+
+        deliver_queued_email.delay()
+    elif mode == 'thread':
+        _dispatch_pending.set()
+        # One delivery thread per process; a running one picks up the new mail
+        if _dispatch_lock.acquire(blocking=False):
+            threading.Thread(target=_deliver_in_thread, name='email-queue', daemon=True).start()
+
+
+def _deliver_in_thread():
+    while True:
+        try:
+            while _dispatch_pending.is_set():
+                _dispatch_pending.clear()
+                deliver_queued()
+        except Exception as e:
+            logger.error(f"[MAIL] Queue delivery failed: {e}")
+        finally:
+            _dispatch_lock.release()
+            close_old_connections()
+        # A dispatch() between the last check and release() found the lock
+        # taken and started no thread, so its mail is this thread's to send
+        if not (_dispatch_pending.is_set() and _dispatch_lock.acquire(blocking=False)):
+            return
+
+
+def backoff(attempts):
+    """
+    Delay before the next try: 1, 2, 4, 8 ... minutes, capped at an hour.
+    """
+    return timedelta(seconds=min(60 * 2 ** (attempts - 1), 3600))
+
+
+def _claim(limit):
+    from .models import OutboundEmail
+
+    now = timezone.now()
+    OutboundEmail.objects.filter(status='sending', updated_at__lt=now - STALE_SENDING).update(status='queued')
+
+    candidates = (
+        OutboundEmail.objects
+        .filter(status='queued', next_attempt_at__lte=now)
+        .order_by('next_attempt_at')
+        .values_list('pk', flat=True)[:limit]
+    )
+    claimed = [
+        pk for pk in candidates
+        if OutboundEmail.objects.filter(pk=pk, status='queued').update(status='sending', updated_at=now)
+    ]
+    return list(OutboundEmail.objects.filter(pk__in=claimed))
+
+
+def deliver_batch(limit=None):
+    """
+    Send up to limit due emails over a single backend connection.
+
+    Returns (sent, failed). Failures are retried with exponential backoff
+    until EMAIL_MAX_ATTEMPTS, then marked failed.
+    """
+    from .models import OutboundEmail
+
+    emails = _claim(limit or settings.EMAIL_QUEUE_BATCH_SIZE)
+    if not emails:
+        return 0, 0
+
+    sent = failed = 0
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception as e:
+        logger.error(f"[MAIL] Could not connect to the mail server: {e}")
+        connection = None
+
+    try:
+        for email in emails:
+            try:
+                if connection is None:
+                    raise ConnectionError("Mail server unavailable")
+                message = EmailMultiAlternatives(
+                    subject=email.subject,
+                    body=email.body,
+                    from_email=settings.DEFAULT_FROM_EMAIL,
+                    to=[email.to],
+                    connection=connection,
+                )
+                if email.html_body:
+                    message.attach_alternative(email.html_body, 'text/html')
+                message.send()
+            except Exception as e:
+                failed += 1
+                attempts = email.attempts + 1
+                gave_up = attempts >= settings.EMAIL_MAX_ATTEMPTS
+                # Bodies can hold OTP codes: keep them only while a retry needs them
+                cleared = {'body': '', 'html_body': ''} if gave_up else {}
+                OutboundEmail.objects.filter(pk=email.pk).update(
+                    status='failed' if gave_up else 'queued',
+                    attempts=attempts,
+                    **cleared,
+                    next_attempt_at=timezone.now() + backoff(attempts),
+                    last_error=str(e)[:2000],
+                    updated_at=timezone.now(),
+                )
+                logger.warning(f"[MAIL] Sending to {email.to} failed (attempt {attempts}): {e}")
+            else:
+                sent += 1
+                OutboundEmail.objects.filter(pk=email.pk).update(
+                    status='sent', attempts=email.attempts + 1, sent_at=timezone.now(),
+                    body='', html_body='', last_error='', updated_at=timezone.now(),
+                )
+    finally:
+        if connection is not None:
+            connection.close()
+
+    logger.info(f"[MAIL] Delivered {sent} emails, {failed} failed")
+    return sent, failed
+
+
+def deliver_queued(max_batches=20, batch_size=None):
+    """
+    Deliver batches until nothing is due (or max_batches is reached).
+    """
+    total_sent = total_failed = 0
+    for _ in range(max_batches):
+        sent, failed = deliver_batch(batch_size)
+        total_sent += sent
+        total_failed += failed
+        if not sent and not failed:
+            break
+    return total_sent, total_failed
+
+
+def purge_finished(older_than):
+    """
+    Delete sent and failed emails last updated more than older_than ago.
+    Returns the number of rows deleted.
+    """
+    from .models import OutboundEmail
+
+    cutoff = timezone.now() - older_than
+    return OutboundEmail.objects.filter(status__in=['sent', 'failed'], updated_at__lt=cutoff).delete()[0]
@@ -0,0 +1,62 @@
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.benchmark import SCENARIOS, compare, run
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark the main endpoints against a seeded test database, with API.Bible, Suno, '
+        'HeyGen and Hugging Face replaced by local stand-ins, and store the results as JSON'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scenario', action='append', choices=SCENARIOS, help='Scenario to run (repeatable, default all)')
+        parser.add_argument('--iterations', type=int, default=200, help='Measured requests per scenario')
+        parser.add_argument('--warmup', type=int, default=20, help='Unmeasured requests sent first per scenario')
+        parser.add_argument('--concurrency', type=int, default=1, help='Client threads sending requests')
+        parser.add_argument('--scale', type=int, default=1, help='Dataset size multiplier')
+        parser.add_argument('--upstream-latency-ms', type=float, default=20, help='Delay of every stand-in response')
+        parser.add_argument('--use-configured-cache', action='store_true', help='Use CACHES instead of a local memory cache')
+        parser.add_argument('--output', help='Results file (default benchmarks/<commit>.json)')
+        parser.add_argument('--compare', help='Previous results file to compare against')
+
+    def handle(self, *args, **options):
+        previous = None
+        if options['compare']:
+            try:
+                previous = json.loads(Path(options['compare']).read_text())
+            except (OSError, ValueError) as e:
+                raise CommandError(f'Could not read {options["compare"]}: {e}')
+
+        results = run(
+            scenarios=options['scenario'] or SCENARIOS,
+            iterations=options['iterations'],
+            warmup=options['warmup'],
+            concurrency=options['concurrency'],
+            scale=options['scale'],
+            upstream_latency=options['upstream_latency_ms'] / 1000,
+            use_configured_cache=options['use_configured_cache'],
+            report=self.stdout.write,
+        )
+
+        output = Path(options['output'] or Path(settings.BASE_DIR) / 'benchmarks' / f'{(results["commit"] or "local")[:12]}.json')
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(results, indent=2))
+
+        self.stdout.write('')
+        self.stdout.write(f'{"scenario":<26}{"req/s":>9}{"p50 ms":>10}{"p95 ms":>10}{"p99 ms":>10}{"queries":>9}{"errors":>8}')
+        for name, result in results['scenarios'].items():
+            latency = result['latency_ms']
+            self.stdout.write(
+                f'{name:<26}{result["throughput_rps"]:>9}{latency["p50"]:>10}{latency["p95"]:>10}'
+                f'{latency["p99"]:>10}{result["db_queries"]["mean"]:>9}{result["errors"]:>8}'
+            )
+        if previous is not None:
+            self.stdout.write('')
+            for line in compare(previous, results):
+                self.stdout.write(line)
+        self.stdout.write(self.style.SUCCESS(f'Results written to {output}'))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from core.images import needs_processing, process_image, registered_fields, variants_field
+
+
+class Command(BaseCommand):
+    help = 'Build missing or outdated resized variants of profile pictures and playlist covers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=500, help='Images to process per field in this run')
+        parser.add_argument('--retry-failed', action='store_true', help='Also retry images that failed before')
+
+    def handle(self, *args, **options):
+        done = failed = 0
+        for model, field_name in registered_fields():
+            queryset = (
+                model.objects
+                .exclude(Q(**{field_name: ''}) | Q(**{f'{field_name}__isnull': True}))
+                .only('pk', field_name, variants_field(field_name))
+                .order_by('pk')
+            )
+            pending = [obj.pk for obj in queryset.iterator() if needs_processing(obj, field_name, options['retry_failed'])]
+            for pk in pending[:options['limit']]:
+                try:
+                    process_image(model._meta.label, pk, field_name)
+                    done += 1
+                except Exception as e:
+                    failed += 1
+                    self.stderr.write(f'{model._meta.label} {pk} {field_name} failed: {e}')
+
+        self.stdout.write(self.style.SUCCESS(f'Processed {done} images, {failed} failed'))
@@ -0,0 +1,19 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from core.mail import deliver_queued, purge_finished
+
+
+class Command(BaseCommand):
+    help = 'Send queued outgoing emails that are due, retrying failed ones with backoff; run every minute from cron'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batches', type=int, default=20, help='Maximum batches to send in this run')
+        parser.add_argument('--batch-size', type=int, default=None, help='Emails per batch (default EMAIL_QUEUE_BATCH_SIZE)')
+        parser.add_argument('--keep-days', type=int, default=7, help='Delete sent and failed emails older than this')
+
+    def handle(self, *args, **options):
+        sent, failed = deliver_queued(options['batches'], options['batch_size'])
+        purged = purge_finished(timedelta(days=options['keep_days']))
+        self.stdout.write(self.style.SUCCESS(f'Sent {sent} emails, {failed} failed; purged {purged} old emails'))
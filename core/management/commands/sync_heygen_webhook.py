@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from decouple import config
+
+from core.heygen import HeyGenVideoCreator
+from core.webhooks import ensure_heygen_webhook
+
+
+class Command(BaseCommand):
+    help = 'Register the HeyGen video webhook if it is not registered yet'
+
+    def handle(self, *args, **options):
+        client = HeyGenVideoCreator(config('HeyGen_API_KEY'))
+
+        try:
+            record = ensure_heygen_webhook(client, reconcile=True)
+        except Exception as e:
+            self.stderr.write(self.style.ERROR(f'HeyGen webhook sync failed: {e}'))
+            return
+
+        self.stdout.write(self.style.SUCCESS(f'HeyGen webhook {record.endpoint_id} -> {record.url}'))
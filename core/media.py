@@ -0,0 +1,144 @@
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date
+
+CHUNK_SIZE = 64 * 1024
+
+_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def file_etag(size, modified):
+    return f'"{size:x}-{int(modified.timestamp()):x}"'
+
+
+def parse_range(header, size):
+    """
+    Parse a single-range ``Range: bytes=...`` header.
+
+    Returns (start, end) inclusive, None when the header is absent or not a
+    single byte range (serve the whole file), or False when it cannot be
+    satisfied.
+    """
+    match = _RANGE_RE.match(header.strip()) if header else None
+    if not match or not any(match.groups()):
+        return None
+
+    start, end = match.groups()
+    if not start:
+        # Suffix range: the last N bytes
+        length = int(end)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def _iter_range(file, start, length):
+    try:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        file.close()
+
+
+def _offload(field_file, response):
+    """
+    Hand the transfer to the front-end server if MEDIA_OFFLOAD is configured.
+
+    nginx: X-Accel-Redirect to MEDIA_OFFLOAD['prefix'] + file name (an
+    ``internal`` location aliased to MEDIA_ROOT). apache/lighttpd: X-Sendfile
+    with the absolute path. The server then handles Range requests itself.
+    """
+    offload = getattr(settings, 'MEDIA_OFFLOAD', {}) or {}
+    backend = offload.get('backend')
+    if backend == 'nginx':
+        prefix = offload.get('prefix', '/protected-media/')
+        response['X-Accel-Redirect'] = quote(prefix.rstrip('/') + '/' + field_file.name.lstrip('/'))
+    elif backend in ('apache', 'lighttpd'):
+        response['X-Sendfile'] = field_file.path
+    else:
+        return False
+    return True
+
+
+def serve_file(request, field_file, content_type=None, filename=None, as_attachment=False):
+    """
+    Serve a stored FileField file without loading it into worker memory.
+
+    Answers conditional requests (If-None-Match / If-Modified-Since) with 304,
+    honours single byte ranges with 206, offloads the body to nginx/apache
+    when MEDIA_OFFLOAD is set, and otherwise streams in CHUNK_SIZE pieces.
+    """
+    storage = field_file.storage
+    name = field_file.name
+    size = storage.size(name)
+    modified = storage.get_modified_time(name)
+    etag = file_etag(size, modified)
+    last_modified = http_date(modified.timestamp())
+
+    content_type = content_type or mimetypes.guess_type(name)[0] or 'application/octet-stream'
+    filename = filename or os.path.basename(name)
+
+    def finish(response):
+        response['ETag'] = etag
+        response['Last-Modified'] = last_modified
+        response['Accept-Ranges'] = 'bytes'
+        response['Cache-Control'] = 'private, max-age=3600'
+        response['Content-Disposition'] = content_disposition_header(as_attachment, filename)
+        return response
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=modified.timestamp())
+    if not_modified is not None:
+        return finish(not_modified)
+
+    if request.method == 'HEAD':
+        response = HttpResponse(content_type=content_type)
+        response['Content-Length'] = size
+        return finish(response)
+
+    response = HttpResponse(content_type=content_type)
+    if _offload(field_file, response):
+        return finish(response)
+
+    # A Range is only honoured if If-Range (when sent) still matches
+    if_range = request.META.get('HTTP_IF_RANGE')
+    byte_range = None
+    if not if_range or if_range in (etag, last_modified):
+        byte_range = parse_range(request.META.get('HTTP_RANGE'), size)
+
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return finish(response)
+
+    if byte_range is None:
+        response = FileResponse(storage.open(name, 'rb'), content_type=content_type)
+        response.block_size = CHUNK_SIZE
+        return finish(response)
+
+    start, end = byte_range
+    length = end - start + 1
+    response = StreamingHttpResponse(
+        _iter_range(storage.open(name, 'rb'), start, length),
+        status=206,
+        content_type=content_type,
+    )
+    response['Content-Length'] = length
+    response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    return finish(response)
@@ -0,0 +1,259 @@
+import logging
+import os
+import socket
+import threading
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+
+from .caching import cache_stats
+from .http_client import provider_metrics
+
+logger = logging.getLogger(__name__)
+
+METRIC_PREFIX = 'gospelux'
+# Upper bounds (seconds) of the request latency histogram buckets
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Generation work waiting on Celery/cron: model -> statuses counted as queued
+QUEUES = {
+    'songs.GeneratedVideo': ('queued', 'processing'),
+    'songs.GeneratedSongs': ('processing',),
+}
+# cache_stats() field -> result label
+CACHE_RESULTS = {'local_hits': 'local_hit', 'shared_hits': 'shared_hit', 'misses': 'miss'}
+
+WORKERS_CACHE_KEY = 'metrics:workers'
+
+# Counters of this process since it started
+_requests = {}  # (view, method) -> {'buckets': [...], 'sum': seconds, 'count': n}
+_responses = {}  # (view, method, status) -> count
+_queries = {}  # view -> [queries, seconds]
+_lock = threading.Lock()
+_published = {'at': 0.0}
+
+
+def worker_id():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def _worker_key(worker):
+    return f'metrics:worker:{worker}'
+
+
+def observe_request(view, method, status, seconds, db_queries, db_time):
+    """
+    Count one finished request (called by PerformanceMiddleware).
+    """
+    with _lock:
+        histogram = _requests.get((view, method))
+        if histogram is None:
+            histogram = _requests[(view, method)] = {'buckets': [0] * len(LATENCY_BUCKETS), 'sum': 0.0, 'count': 0}
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                histogram['buckets'][i] += 1
+        histogram['sum'] += seconds
+        histogram['count'] += 1
+
+        key = (view, method, str(status))
+        _responses[key] = _responses.get(key, 0) + 1
+
+        queries = _queries.setdefault(view, [0, 0.0])
+        queries[0] += db_queries
+        queries[1] += db_time
+    maybe_publish()
+
+
+def snapshot():
+    """
+    Everything this process has counted since it started.
+    """
+    with _lock:
+        requests = {key: {**histogram, 'buckets': list(histogram['buckets'])} for key, histogram in _requests.items()}
+        responses = dict(_responses)
+        queries = {view: list(values) for view, values in _queries.items()}
+    return {
+        'requests': requests,
+        'responses': responses,
+        'queries': queries,
+        'providers': provider_metrics(),
+        'caches': cache_stats(),
+    }
+
+
+def publish():
+    """
+    Store this process's snapshot in the shared cache, where collect() finds
+    it. Snapshots are cumulative, so a lost or late publish only delays data.
+    """
+    worker = worker_id()
+    try:
+        cache.set(_worker_key(worker), snapshot(), settings.METRICS_WORKER_TTL)
+        workers = cache.get(WORKERS_CACHE_KEY) or set()
+        if worker not in workers:
+            # Not atomic: a worker dropped by a concurrent write re-adds itself
+            # on its next publish
+            cache.set(WORKERS_CACHE_KEY, workers | {worker}, None)
+    except Exception as e:
+        logger.error(f"[METRICS] Could not publish worker metrics: {e}")
+    _published['at'] = time.monotonic()
+
+
+def maybe_publish():
+    if time.monotonic() - _published['at'] >= settings.METRICS_PUBLISH_SECONDS:
+        publish()
+
+
+def _merge(total, snapshot):
+    for key, histogram in snapshot['requests'].items():
+        merged = total['requests'].setdefault(key, {'buckets': [0] * len(LATENCY_BUCKETS), 'sum': 0.0, 'count': 0})
+        merged['buckets'] = [a + b for a, b in zip(merged['buckets'], histogram['buckets'])]
+        merged['sum'] += histogram['sum']
+        merged['count'] += histogram['count']
+
+    for key, count in snapshot['responses'].items():
+        total['responses'][key] = total['responses'].get(key, 0) + count
+
+    for view, (queries, seconds) in snapshot['queries'].items():
+        merged = total['queries'].setdefault(view, [0, 0.0])
+        merged[0] += queries
+        merged[1] += seconds
+
+    for provider, stats in snapshot['providers'].items():
+        merged = total['providers'].setdefault(provider, {'requests': 0, 'errors': 0, 'latency_total': 0.0, 'latency_max': 0.0})
+        merged['requests'] += stats['requests']
+        merged['errors'] += stats['errors']
+        merged['latency_total'] += stats['latency_total']
+        merged['latency_max'] = max(merged['latency_max'], stats['latency_max'])
+
+    for namespace, stats in snapshot['caches'].items():
+        merged = total['caches'].setdefault(namespace, {})
+        for field, count in stats.items():
+            merged[field] = merged.get(field, 0) + count
+
+
+def collect():
+    """
+    Sum the snapshots of every worker that published within METRICS_WORKER_TTL,
+    this one included. Returns (totals, number of workers).
+    """
+    publish()
+    total = {'requests': {}, 'responses': {}, 'queries': {}, 'providers': {}, 'caches': {}}
+    workers = cache.get(WORKERS_CACHE_KEY) or {worker_id()}
+    snapshots = cache.get_many([_worker_key(worker) for worker in workers])
+    if not snapshots:
+        snapshots = {_worker_key(worker_id()): snapshot()}
+
+    for worker_snapshot in snapshots.values():
+        _merge(total, worker_snapshot)
+
+    live = {worker for worker in workers if _worker_key(worker) in snapshots}
+    if live != workers:
+        cache.set(WORKERS_CACHE_KEY, live, None)
+    return total, len(snapshots)
+
+
+def queue_depths():
+    """
+    {('songs.GeneratedVideo', 'queued'): 3, ...}, counted in the database.
+    """
+    from django.db.models import Count
+
+    depths = {}
+    for model_label, statuses in QUEUES.items():
+        model = apps.get_model(model_label)
+        counts = {
+            row['status']: row['n']
+            for row in model.objects.filter(status__in=statuses).values('status').annotate(n=Count('pk'))
+        }
+        for status in statuses:
+            depths[(model_label, status)] = counts.get(status, 0)
+    return depths
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+
+def _bound(value):
+    return f'{value:g}'
+
+
+def render():
+    """
+    All metrics in the Prometheus text exposition format (version 0.0.4).
+    """
+    total, worker_count = collect()
+    lines = []
+
+    def metric(name, kind, help_text, samples):
+        name = f'{METRIC_PREFIX}_{name}'
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for suffix, labels, value in samples:
+            lines.append(f'{name}{suffix}{_labels(**labels) if labels else ""} {value}')
+
+    samples = []
+    for (view, method), histogram in sorted(total['requests'].items()):
+        for bound, count in zip(LATENCY_BUCKETS, histogram['buckets']):
+            samples.append(('_bucket', {'view': view, 'method': method, 'le': _bound(bound)}, count))
+        samples.append(('_bucket', {'view': view, 'method': method, 'le': '+Inf'}, histogram['count']))
+        samples.append(('_sum', {'view': view, 'method': method}, histogram['sum']))
+        samples.append(('_count', {'view': view, 'method': method}, histogram['count']))
+    metric('http_request_duration_seconds', 'histogram', 'Request latency by URL name.', samples)
+
+    metric('http_responses_total', 'counter', 'Responses by URL name and status code.', [
+        ('', {'view': view, 'method': method, 'status': status}, count)
+        for (view, method, status), count in sorted(total['responses'].items())
+    ])
+    metric('db_queries_total', 'counter', 'Database queries made by requests, by URL name.', [
+        ('', {'view': view}, queries) for view, (queries, _) in sorted(total['queries'].items())
+    ])
+    metric('db_query_duration_seconds_total', 'counter', 'Time spent in database queries by requests, by URL name.', [
+        ('', {'view': view}, seconds) for view, (_, seconds) in sorted(total['queries'].items())
+    ])
+
+    metric('queue_depth', 'gauge', 'Generation jobs waiting or in progress.', [
+        ('', {'model': model_label, 'status': status}, depth)
+        for (model_label, status), depth in queue_depths().items()
+    ])
+
+    providers = sorted(total['providers'].items())
+    metric('provider_requests_total', 'counter', 'Outbound calls per provider.', [
+        ('', {'provider': provider}, stats['requests']) for provider, stats in providers
+    ])
+    metric('provider_errors_total', 'counter', 'Failed outbound calls per provider.', [
+        ('', {'provider': provider}, stats['errors']) for provider, stats in providers
+    ])
+    metric('provider_request_duration_seconds', 'summary', 'Outbound call latency per provider.', [
+        sample
+        for provider, stats in providers
+        for sample in (('_sum', {'provider': provider}, stats['latency_total']),
+                       ('_count', {'provider': provider}, stats['requests']))
+    ])
+    metric('provider_request_duration_seconds_max', 'gauge', 'Slowest outbound call per provider in any worker.', [
+        ('', {'provider': provider}, stats['latency_max']) for provider, stats in providers
+    ])
+
+    caches = sorted(total['caches'].items())
+    metric('cache_requests_total', 'counter', 'core.caching lookups by namespace and result.', [
+        ('', {'namespace': namespace, 'result': result}, stats.get(field, 0))
+        for namespace, stats in caches for field, result in CACHE_RESULTS.items()
+    ])
+    metric('cache_stale_hits_total', 'counter', 'Hits served past their TTL while being refreshed (also counted as hits).', [
+        ('', {'namespace': namespace}, stats.get('stale_hits', 0)) for namespace, stats in caches
+    ])
+    hit_ratios = []
+    for namespace, stats in caches:
+        lookups = sum(stats.get(field, 0) for field in CACHE_RESULTS)
+        if lookups:
+            hit_ratios.append(('', {'namespace': namespace}, (lookups - stats.get('misses', 0)) / lookups))
+    metric('cache_hit_ratio', 'gauge', 'Share of core.caching lookups served from a cache tier.', hit_ratios)
+
+    metric('workers', 'gauge', 'Workers whose metrics are included.', [('', {}, worker_count)])
+    return '\n'.join(lines) + '\n'
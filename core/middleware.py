@@ -1,32 +1,72 @@
+import json
+import logging
+import random
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
 from django.http import JsonResponse
 from django.utils.deprecation import MiddlewareMixin
-from django.urls import resolve
+from whitenoise.middleware import WhiteNoiseMiddleware
+from . import metrics, timings
 from .models import AccessModel
 
+# [PERF] lines go to their own logger so they can be routed separately (see LOGGING)
+perf_logger = logging.getLogger('perf')
+
+_site_access = {'rule': None, 'expires_at': 0.0}
+_site_access_lock = threading.Lock()
+
+
+def get_site_access_rule():
+    """
+    Return the cached (allowed, description) site_access rule, or None.
+
+    The rule is read from the DB at most once per SITE_ACCESS_CACHE_SECONDS
+    per process; saving an AccessModel clears the cache immediately in the
+    process that saved it, and other workers pick it up when their TTL runs out.
+    """
+    now = time.monotonic()
+    if now < _site_access['expires_at']:
+        return _site_access['rule']
+
+    with _site_access_lock:
+        if now < _site_access['expires_at']:
+            return _site_access['rule']
+
+        access_control = AccessModel.objects.filter(mode="site_access").first()
+        rule = (access_control.allowed, access_control.description) if access_control else None
+        _site_access['rule'] = rule
+        _site_access['expires_at'] = now + getattr(settings, 'SITE_ACCESS_CACHE_SECONDS', 5)
+        return rule
+
+
+def invalidate_site_access_cache():
+    _site_access['expires_at'] = 0.0
+
 
 class GlobalAccessMiddleware(MiddlewareMixin):
     """
     Middleware to control global site access based on AccessModel settings.
-    /admin/ is always allowed.
+    /@gig-admin/ is always allowed.
     """
 
     def process_request(self, request):
         try:
-            # Get the current URL name (useful if you want finer controls later)
-            resolver_match = resolve(request.path_info)
-            current_path = request.path_info
-
             # Allow admin always
-            if current_path.startswith("/@gig-admin/"):
+            if request.path_info.startswith("/@gig-admin/"):
                 return None
 
             # Check if global site access is allowed
-            access_control = AccessModel.objects.filter(mode="site_access").first()
+            rule = get_site_access_rule()
 
-            if access_control and not access_control.allowed:
+            if rule and not rule[0]:
                 return JsonResponse(
                     {
-                        "detail": access_control.description
+                        "detail": rule[1]
                         or "Access to this site is currently restricted."
                     },
                     status=403,
@@ -34,3 +74,152 @@ class GlobalAccessMiddleware(MiddlewareMixin):
         except Exception:
             # Fail safe (e.g., before migrations)
             return None
+
+
+def install_query_timer(connection, **kwargs):
+    if timings.time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(timings.time_query)
+
+
+connection_created.connect(install_query_timer, dispatch_uid='core.install_query_timer')
+
+
+def view_name(request):
+    """
+    URL name of the matched route; raw paths are never used as labels.
+    """
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match and match.view_name else 'unmatched'
+
+
+class PerformanceMiddleware:
+    """
+    Measure every request: database queries and their time, outbound HTTP
+    time per provider (core.http_client), core.caching hits/misses and
+    response rendering (serialization) time.
+
+    Every request is counted in core.metrics. A PERF_SAMPLE_RATE share of
+    requests, and every request slower than PERF_SLOW_REQUEST_MS, also get a
+    Server-Timing header and a [PERF] log line with the breakdown as JSON.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        token = self.start(request)
+        request_timings = timings.current()
+        try:
+            response = self.get_response(request)
+        finally:
+            timings.stop(token)
+        return self.finish(request, response, request_timings)
+
+    async def __acall__(self, request):
+        token = self.start(request)
+        request_timings = timings.current()
+        try:
+            response = await self.get_response(request)
+        finally:
+            timings.stop(token)
+        return self.finish(request, response, request_timings)
+
+    def start(self, request):
+        for connection in connections.all(initialized_only=True):
+            install_query_timer(connection)
+        return timings.start()
+
+    def finish(self, request, response, request_timings):
+        total = request_timings.elapsed
+        metrics.observe_request(
+            view_name(request), request.method, response.status_code,
+            total, request_timings.db_queries, request_timings.db_time,
+        )
+        sampled = random.random() < settings.PERF_SAMPLE_RATE
+        if sampled or total * 1000 >= settings.PERF_SLOW_REQUEST_MS:
+            response['Server-Timing'] = self.server_timing(request_timings, total)
+            perf_logger.info(f"[PERF] {json.dumps(self.log_record(request, response, request_timings, total))}")
+        return response
+
+    def process_template_response(self, request, response):
+        # Runs right before DRF/template rendering; the callback right after
+        request_timings = timings.current()
+        if request_timings is not None:
+            started = time.perf_counter()
+
+            def rendered(response):
+                request_timings.serialize_time += time.perf_counter() - started
+
+            response.add_post_render_callback(rendered)
+        return response
+
+    def server_timing(self, request_timings, total):
+        metrics = [
+            f'db;dur={request_timings.db_time * 1000:.1f};desc="{request_timings.db_queries} queries"',
+        ]
+        for provider, (calls, seconds) in request_timings.http.items():
+            metrics.append(f'http-{provider};dur={seconds * 1000:.1f};desc="{calls} calls"')
+        metrics += [
+            f'cache;desc="{request_timings.cache_hits} hits, {request_timings.cache_misses} misses"',
+            f'serialize;dur={request_timings.serialize_time * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ]
+        return ', '.join(metrics)
+
+    def log_record(self, request, response, request_timings, total):
+        return {
+            'method': request.method,
+            'path': request.path,
+            'view': view_name(request),
+            'status': response.status_code,
+            'total_ms': round(total * 1000, 1),
+            'db_queries': request_timings.db_queries,
+            'db_ms': round(request_timings.db_time * 1000, 1),
+            'http_ms': round(request_timings.http_time * 1000, 1),
+            'http': {
+                provider: {'calls': calls, 'ms': round(seconds * 1000, 1)}
+                for provider, (calls, seconds) in request_timings.http.items()
+            },
+            'cache_hits': request_timings.cache_hits,
+            'cache_misses': request_timings.cache_misses,
+            'serialize_ms': round(request_timings.serialize_time * 1000, 1),
+        }
+
+
+class StaticFilesMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoiseMiddleware that also runs natively under ASGI, so async views
+    are not pushed through async_to_sync. Finding a static file is a dict
+    lookup (a stat with autorefresh in development), cheap enough to do on
+    the event loop.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = self.find_file(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return self.serve(static_file, request)
+        return await self.get_response(request)
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.6 on 2026-10-18 22:05
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WebhookEndpoint',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('provider', models.CharField(choices=[('heygen', 'HeyGen')], max_length=50)),
+                ('url', models.URLField(max_length=500)),
+                ('endpoint_id', models.CharField(max_length=100)),
+                ('events', models.JSONField(blank=True, default=list)),
+                ('secret', models.CharField(blank=True, max_length=255)),
+            ],
+            options={
+                'unique_together': {('provider', 'url')},
+            },
+        ),
+    ]
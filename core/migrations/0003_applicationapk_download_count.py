@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 22:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_webhookendpoint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='applicationapk',
+            name='download_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
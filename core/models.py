@@ -54,6 +54,7 @@ class ApplicationAPK(BaseModel):
     ])
     file = models.FileField(upload_to='apk_files/')
     description = models.TextField(blank=True)
+    download_count = models.PositiveIntegerField(default=0, editable=False)
 
     def __str__(self):
         return f"{self.name} - {self.version}"
@@ -74,4 +75,48 @@ class AccessModel(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='created at')
     
     def __str__(self):
-        return self.mode
\ No newline at end of file
+        return self.mode
+
+class WebhookEndpoint(BaseModel):
+    """Webhook endpoints registered with external providers"""
+    provider = models.CharField(max_length=50, choices=[
+        ('heygen', 'HeyGen'),
+    ])
+    url = models.URLField(max_length=500)
+    endpoint_id = models.CharField(max_length=100)
+    events = models.JSONField(default=list, blank=True)
+    secret = models.CharField(max_length=255, blank=True)
+
+    class Meta:
+        unique_together = ['provider', 'url']
+
+    def __str__(self):
+        return f"{self.provider} - {self.url}"
+
+class OutboundEmail(BaseModel):
+    """Queued outgoing email, delivered in batches by core.mail"""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+
+    to = models.EmailField()
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    html_body = models.TextField(blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(auto_now_add=True)
+    last_error = models.TextField(blank=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.to} - {self.subject} ({self.status})"
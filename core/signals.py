@@ -0,0 +1,41 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from bible.models import version_cache
+
+from . import autocomplete
+from .downloads import forget_apk
+from .middleware import invalidate_site_access_cache
+from .models import AccessModel, ApplicationAPK
+
+
+@receiver([post_save, post_delete], sender=AccessModel)
+def clear_site_access_cache(sender, **kwargs):
+    invalidate_site_access_cache()
+
+
+@receiver([post_save, post_delete], sender='songs.Song')
+@receiver([post_save, post_delete], sender='bible.Book')
+@receiver([post_save, post_delete], sender='bible.BibleVersion')
+def clear_autocomplete_index(sender, **kwargs):
+    autocomplete.invalidate()
+
+
+@receiver([post_save, post_delete], sender='bible.BibleVersion')
+def clear_bible_version_cache(sender, **kwargs):
+    version_cache.invalidate()
+
+
+@receiver(pre_save, sender=ApplicationAPK)
+def remember_apk_slug(sender, instance, **kwargs):
+    # A renamed slug must also drop the lookups cached under the old one
+    if not instance._state.adding:
+        instance._previous_slug = sender.objects.filter(pk=instance.pk).values_list('slug', flat=True).first()
+
+
+@receiver([post_save, post_delete], sender=ApplicationAPK)
+def clear_apk_lookup(sender, instance, **kwargs):
+    forget_apk(instance.slug)
+    previous_slug = getattr(instance, '_previous_slug', None)
+    if previous_slug and previous_slug != instance.slug:
+        forget_apk(previous_slug)
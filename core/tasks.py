@@ -0,0 +1,9 @@
+from celery import shared_task
+
+from .mail import deliver_queued
+
+
+@shared_task(ignore_result=True)
+def deliver_queued_email():
+    """Deliver due queued emails (EMAIL_QUEUE_DISPATCH = 'celery')"""
+    deliver_queued()
@@ -1,3 +1,480 @@
-from django.test import TestCase
+import io
+import shutil
+import tempfile
+import threading
+import time
+import zlib
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+import httpx
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+from rest_framework.exceptions import NotFound
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from .caching import TieredCache, _key_locks
+from .downloads import flush_downloads, get_apk
+from .heygen import HeyGenCatalog
+from .http_client import (
+    HuggingFaceSession, async_client_scope, get_async_client, get_provider_config, get_session, huggingface_provider,
+    provider_slots, redirect_url, reset_sessions, with_async_clients,
+)
+from .llm_parsing import extract_json, iter_json_candidates, parse_scenes, repair_json
+from .mail import deliver_queued, enqueue_email, purge_finished
+from .media import parse_range
+from .middleware import PerformanceMiddleware, StaticFilesMiddleware
+from .pagination import KeysetPagination
+
+
+class AsyncClientScopeTests(SimpleTestCase):
+    def test_scope_closes_its_clients(self):
+        async def view():
+            async with async_client_scope():
+                client = get_async_client('suno')
+                self.assertIs(get_async_client('suno'), client)
+                self.assertFalse(client.is_closed)
+            return client
+
+        clients = [async_to_sync(view)() for _ in range(3)]
+        self.assertTrue(all(client.is_closed for client in clients))
+        self.assertEqual(len({id(client) for client in clients}), 3)
+
+    def test_decorated_view_closes_clients(self):
+        @with_async_clients
+        async def view():
+            return get_async_client('heygen')
+
+        self.assertTrue(async_to_sync(view)().is_closed)
+
+    def test_nested_scope_reuses_outer_clients(self):
+        async def view():
+            async with async_client_scope():
+                outer = get_async_client('suno')
+                async with async_client_scope():
+                    self.assertIs(get_async_client('suno'), outer)
+                self.assertFalse(outer.is_closed)
+            return outer
+
+        self.assertTrue(async_to_sync(view)().is_closed)
+
+    @override_settings(ASYNC_HTTP_SHARED_CLIENTS=True)
+    def test_shared_clients_stay_open(self):
+        @with_async_clients
+        async def view():
+            client = get_async_client('suno')
+            return client
+
+        client = async_to_sync(view)()
+        self.assertFalse(client.is_closed)
+
+    @override_settings(OUTBOUND_HTTP={'suno': {'max_concurrency': 1, 'timeout': (0.05, 1)}})
+    def test_concurrency_limit_is_process_wide(self):
+        reset_sessions()
+        self.addCleanup(reset_sessions)
+        slots = provider_slots('suno')
+        self.assertIs(get_session('suno')._slots, slots)
+        # The one slot is taken (by a sync session or another event loop)
+        slots.acquire()
+
+        @with_async_clients
+        async def view():
+            return await get_async_client('suno').get('http://suno.invalid/status')
+
+        with self.assertRaises(httpx.PoolTimeout):
+            async_to_sync(view)()
+        slots.release()
+
+
+class StaticFilesMiddlewareTests(SimpleTestCase):
+    def test_passes_through_in_both_modes(self):
+        async def aview(request):
+            return 'async'
+
+        middleware = StaticFilesMiddleware(aview)
+        self.assertTrue(iscoroutinefunction(middleware))
+        request = APIRequestFactory().get('/api/songs/')
+        self.assertEqual(async_to_sync(middleware)(request), 'async')
+
+        middleware = StaticFilesMiddleware(lambda request: 'sync')
+        self.assertFalse(iscoroutinefunction(middleware))
+        self.assertEqual(middleware(request), 'sync')
+
+
+class RedirectUrlTests(SimpleTestCase):
+    def test_moves_scheme_and_host(self):
+        self.assertEqual(
+            redirect_url('https://api.sunoapi.org/api/v1/generate?x=1', 'http://127.0.0.1:9000'),
+            'http://127.0.0.1:9000/api/v1/generate?x=1',
+        )
+
+    def test_without_base_url(self):
+        self.assertEqual(redirect_url('https://api.heygen.com/v2/voices', None), 'https://api.heygen.com/v2/voices')
+
+
+class LLMParsingTests(SimpleTestCase):
+    def test_candidates_ignore_braces_in_strings(self):
+        text = 'Sure! {"text": "a } b", "n": [1, 2]} trailing'
+        self.assertEqual(list(iter_json_candidates(text)), ['{"text": "a } b", "n": [1, 2]}'])
+
+    def test_repair_closes_truncated_output(self):
+        self.assertEqual(repair_json('{"scenes": [{"text": "In the beg'), '{"scenes": [{"text": "In the beg"}]}')
+
+    def test_repair_drops_trailing_commas_and_smart_quotes(self):
+        self.assertEqual(extract_json('{\u201ca\u201d: [1, 2,],}'), {'a': [1, 2]})
+
+    def test_extract_json_from_fenced_block(self):
+        self.assertEqual(extract_json('```json\n{"a": 1}\n```'), {'a': 1})
+
+    def test_extract_json_without_json(self):
+        with self.assertRaises(ValueError):
+            extract_json('no json here')
+        with self.assertRaises(ValueError):
+            extract_json('   ')
+
+    def test_parse_scenes_normalizes(self):
+        scenes = parse_scenes('{"scenes": [{"speaker_type": "Narrator", "text": " Hi ", "duration_seconds": "4.5"},'
+                              ' {"text": ""}]}')
+        self.assertEqual(scenes, [{'speaker_type': 'presenter', 'text': 'Hi', 'duration_seconds': 4}])
+
+    def test_parse_scenes_skips_unrelated_json(self):
+        text = 'Verses [1,2] and {"a": "b"} then {"scenes": [{"speaker_type": "god", "text": "Let there be light"}]}'
+        self.assertEqual(parse_scenes(text), [{'speaker_type': 'god', 'text': 'Let there be light', 'duration_seconds': 5}])
+
+    def test_parse_scenes_without_script(self):
+        with self.assertRaises(ValueError):
+            parse_scenes('[1, 2] {"a": "b"}')
+
+
+@override_settings(EMAIL_QUEUE_DISPATCH='cron')
+class MailQueueTests(TestCase):
+    def test_sent_email_keeps_no_body(self):
+        email = enqueue_email('ann@example.com', 'Your code', 'Code: 123456', '<b>123456</b>')
+
+        self.assertEqual(deliver_queued(), (1, 0))
+
+        self.assertEqual(mail.outbox[0].body, 'Code: 123456')
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.body, email.html_body), ('sent', '', ''))
+
+    def test_purge_finished_keeps_queued_and_recent_rows(self):
+        from .models import OutboundEmail
+
+        old = timezone.now() - timedelta(days=8)
+        for status in ('sent', 'failed', 'queued'):
+            OutboundEmail.objects.create(to='ann@example.com', subject=status, body='', status=status)
+        OutboundEmail.objects.update(updated_at=old)
+        OutboundEmail.objects.create(to='ann@example.com', subject='recent', body='', status='sent')
+
+        self.assertEqual(purge_finished(timedelta(days=7)), 2)
+        self.assertEqual(sorted(OutboundEmail.objects.values_list('subject', flat=True)), ['queued', 'recent'])
+
+
+class DownloadTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+        from .models import ApplicationAPK
+
+        self.apk = ApplicationAPK(name='Gospelux', version='1.0', slug='gospelux', type='android')
+        self.apk.file.save('gospelux.apk', ContentFile(b'0123456789'))
+        self.addCleanup(flush_downloads)
+
+    def test_detected_platform_never_gets_another_platforms_build(self):
+        iphone = self.client.get('/download/gospelux/', HTTP_USER_AGENT='Mozilla/5.0 (iPhone)')
+        android = self.client.get('/download/gospelux/', HTTP_USER_AGENT='Mozilla/5.0 (Linux; Android 14)')
+        desktop = self.client.get('/download/gospelux/', HTTP_USER_AGENT='Mozilla/5.0 (X11; Linux)')
+
+        self.assertEqual(iphone.status_code, 404)
+        self.assertEqual(android.status_code, 200)
+        self.assertEqual(desktop.status_code, 200)
+
+    def test_range_requests(self):
+        partial = self.client.get('/download/gospelux/', HTTP_RANGE='bytes=2-5')
+        suffix = self.client.get('/download/gospelux/', HTTP_RANGE='bytes=-3')
+        unsatisfiable = self.client.get('/download/gospelux/', HTTP_RANGE='bytes=20-')
+
+        self.assertEqual(partial.status_code, 206)
+        self.assertEqual(b''.join(partial.streaming_content), b'2345')
+        self.assertEqual(partial['Content-Range'], 'bytes 2-5/10')
+        self.assertEqual(b''.join(suffix.streaming_content), b'789')
+        self.assertEqual(unsatisfiable.status_code, 416)
+        self.assertEqual(unsatisfiable['Content-Range'], 'bytes */10')
+
+    def test_etag_answers_conditional_requests(self):
+        full = self.client.get('/download/gospelux/')
+        etag = full['ETag']
+
+        self.assertEqual(b''.join(full.streaming_content), b'0123456789')
+        self.assertEqual(self.client.get('/download/gospelux/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        # A Range with a stale If-Range gets the whole file
+        stale = self.client.get('/download/gospelux/', HTTP_RANGE='bytes=2-5', HTTP_IF_RANGE='"old"')
+        self.assertEqual(stale.status_code, 200)
+        fresh = self.client.get('/download/gospelux/', HTTP_RANGE='bytes=2-5', HTTP_IF_RANGE=etag)
+        self.assertEqual(fresh.status_code, 206)
+
+    def test_renamed_slug_drops_the_old_lookup(self):
+        self.assertIsNotNone(get_apk('gospelux'))
+
+        self.apk.slug = 'gospelux-app'
+        self.apk.save()
+
+        self.assertIsNone(get_apk('gospelux'))
+        self.assertEqual(get_apk('gospelux-app').pk, self.apk.pk)
+
+
+class TieredCacheTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.cache = TieredCache('tests', local_size=0)
+
+    def same_stripe_keys(self):
+        def stripe(key):
+            return zlib.crc32(self.cache.make_key(key).encode()) % len(_key_locks)
+
+        first = 'key-0'
+        second = next(f'key-{i}' for i in range(1, 10000) if stripe(f'key-{i}') == stripe(first))
+        return first, second
+
+    def test_get_or_set_computes_once(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return 'value'
+
+        self.assertEqual(self.cache.get_or_set('key', compute, 60), 'value')
+        self.assertEqual(self.cache.get_or_set('key', compute, 60), 'value')
+        self.assertEqual(len(calls), 1)
+
+    def test_waiting_for_another_worker_does_not_block_the_stripe(self):
+        waiting_key, other_key = self.same_stripe_keys()
+        # Another worker is computing waiting_key
+        cache.add(self.cache._lock_key(self.cache.make_key(waiting_key)), True, 30)
+        waiter = threading.Thread(target=self.cache.get_or_set, args=(waiting_key, lambda: 'late', 60),
+                                  kwargs={'lock_timeout': 2})
+        waiter.start()
+        self.addCleanup(waiter.join)
+        time.sleep(0.2)
+
+        started = time.monotonic()
+        self.assertEqual(self.cache.get_or_set(other_key, lambda: 'value', 60), 'value')
+        self.assertLess(time.monotonic() - started, 1)
+
+
+class FlakyHeyGenClient:
+    def __init__(self):
+        self.calls = 0
+        self.fail = False
+
+    def get_voices_list(self):
+        self.calls += 1
+        if self.fail:
+            raise ConnectionError('HeyGen unreachable')
+        return [{'voice_id': 'v1', 'name': 'Calm', 'gender': 'male', 'language': 'Multilingual'}]
+
+    def get_avatars_list(self):
+        return [{'avatar_id': 'a1', 'avatar_name': 'Office', 'gender': 'male'}]
+
+
+class HeyGenCatalogTests(SimpleTestCase):
+    def test_failed_refresh_keeps_the_index_and_backs_off(self):
+        client = FlakyHeyGenClient()
+        catalog = HeyGenCatalog(client, ttl=0, retry_after=60)
+        self.assertEqual(catalog.voice_for('god'), 'v1')
+
+        client.fail = True
+        time.sleep(0.01)
+        self.assertEqual(catalog.voice_for('god'), 'v1')
+        self.assertEqual(catalog.avatar_for('male'), 'a1')
+        self.assertEqual(client.calls, 2)
+
+    def test_first_load_failure_is_raised(self):
+        client = FlakyHeyGenClient()
+        client.fail = True
+        with self.assertRaises(ConnectionError):
+            HeyGenCatalog(client).voice_for('presenter')
+
+
+class HuggingFaceSessionTests(SimpleTestCase):
+    def test_requests_go_through_the_current_provider(self):
+        session = HuggingFaceSession()
+        with mock.patch.object(get_session('huggingface'), 'request') as default, \
+                mock.patch.object(get_session('huggingface_video'), 'request') as video:
+            session.post('https://router.huggingface.co/v1/chat/completions')
+            with huggingface_provider('huggingface_video'):
+                session.post('https://router.huggingface.co/fal-ai/fal-ai/longcat-video')
+            session.get('https://huggingface.co/api/whoami-v2')
+
+        self.assertEqual(default.call_count, 2)
+        self.assertEqual(video.call_count, 1)
+        self.assertGreater(get_provider_config('huggingface_video')['timeout'][1],
+                           get_provider_config('huggingface')['timeout'][1])
+
+
+@override_settings(IMAGE_PIPELINE_DISPATCH='cron', IMAGE_VARIANT_SIZES={'small': 16})
+class ProcessImagesTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+        from users.models import User
+
+        self.user = User.objects.create_user(email='ann@example.com', username='ann', password='password-1')
+
+    def set_picture(self, name, content):
+        self.user.profile_picture.save(name, ContentFile(content))
+        self.user.refresh_from_db()
+
+    def run_command(self, *args):
+        out = io.StringIO()
+        call_command('process_images', *args, stdout=out, stderr=io.StringIO())
+        return out.getvalue()
+
+    def jpeg(self, colour='red'):
+        buffer = io.BytesIO()
+        Image.new('RGB', (40, 30), colour).save(buffer, 'JPEG')
+        return buffer.getvalue()
+
+    def test_builds_variants(self):
+        self.set_picture('me.jpg', self.jpeg())
+
+        self.assertIn('Processed 1 images, 0 failed', self.run_command())
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.profile_picture_variants['source'], self.user.profile_picture.name)
+        self.assertEqual(set(self.user.profile_picture_variants['small']), {'webp', 'jpeg'})
+
+    def test_variants_never_touch_other_uploads(self):
+        from users.models import User
+
+        other = User.objects.create_user(email='bob@example.com', username='bob', password='password-1')
+        other.profile_picture.save('photo_small.jpg', ContentFile(self.jpeg('blue')))
+        other_content = other.profile_picture.read()
+        other.profile_picture.close()
+        self.set_picture('photo.jpg', self.jpeg())
+        self.run_command()
+        self.user.refresh_from_db()
+        first = self.user.profile_picture_variants['small']['jpeg']
+
+        self.set_picture('photo.jpg', self.jpeg('green'))
+        self.run_command()
+        self.user.refresh_from_db()
+
+        self.assertTrue(first.startswith(f'variants/users.user/{self.user.pk}/'))
+        self.assertFalse(default_storage.exists(first))
+        self.assertTrue(default_storage.exists(self.user.profile_picture_variants['small']['jpeg']))
+        with default_storage.open(other.profile_picture.name) as f:
+            self.assertEqual(f.read(), other_content)
+
+    def test_failed_image_is_recorded_and_skipped(self):
+        self.set_picture('broken.jpg', b'not an image')
+
+        self.assertIn('Processed 0 images, 1 failed', self.run_command())
+        self.user.refresh_from_db()
+        self.assertIn('error', self.user.profile_picture_variants)
+        self.assertIn('Processed 0 images, 0 failed', self.run_command())
+        self.assertIn('Processed 0 images, 1 failed', self.run_command('--retry-failed'))
+
+
+class MetricsViewTests(TestCase):
+    @override_settings(METRICS_TOKEN='secret')
+    def test_token_is_required(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 401)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer wrong').status_code, 401)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer s\u00e9cret').status_code, 401)
+
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'gospelux_workers', response.content)
+
+    @override_settings(METRICS_TOKEN='', ENVIRONMENT='production', DEBUG=True)
+    def test_no_token_outside_development_is_hidden(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 404)
+
+    @override_settings(METRICS_TOKEN='', ENVIRONMENT='development')
+    def test_no_token_in_development_is_open(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 200)
+
+
+class PerformanceMiddlewareTests(TestCase):
+    def test_runs_natively_in_both_modes(self):
+        async def aview(request):
+            return None
+
+        self.assertTrue(iscoroutinefunction(PerformanceMiddleware(aview)))
+        self.assertFalse(iscoroutinefunction(PerformanceMiddleware(lambda request: None)))
+
+    @override_settings(PERF_SAMPLE_RATE=1.0, METRICS_TOKEN='', ENVIRONMENT='development')
+    async def test_async_request_is_measured(self):
+        response = await self.async_client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('total;dur=', response['Server-Timing'])
+        self.assertIn('queries"', response['Server-Timing'])
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        from songs.models import Song
+
+        self.Song = Song
+        songs = [Song.objects.create(title=f'Song {i}') for i in range(5)]
+        # Ties on created_at are broken by id
+        Song.objects.filter(pk__in=[song.pk for song in songs[1:4]]).update(created_at=songs[1].created_at)
+        self.expected = list(Song.objects.order_by('-created_at', '-id').values_list('pk', flat=True))
+
+    def page(self, url):
+        paginator = KeysetPagination()
+        results = paginator.paginate_queryset(self.Song.objects.all(), Request(APIRequestFactory().get(url)))
+        return [song.pk for song in results], paginator
+
+    def test_walks_forward_and_back_without_gaps(self):
+        seen = []
+        url = '/songs/?page_size=2'
+        pages = []
+        while url:
+            ids, paginator = self.page(url)
+            seen += ids
+            pages.append(ids)
+            url = paginator.get_next_link()
+        self.assertEqual(seen, self.expected)
+        self.assertEqual(paginator.count, 5)
+
+        ids, paginator = self.page(paginator.get_previous_link())
+        self.assertEqual(ids, pages[-2])
+
+    def test_count_can_be_skipped(self):
+        _, paginator = self.page('/songs/?count=false')
+        self.assertIsNone(paginator.count)
+
+    def test_invalid_cursor_is_rejected(self):
+        with self.assertRaises(NotFound):
+            self.page('/songs/?cursor=not-a-cursor')
+
+
+class ParseRangeTests(SimpleTestCase):
+    def test_parse_range(self):
+        self.assertEqual(parse_range('bytes=0-', 10), (0, 9))
+        self.assertEqual(parse_range('bytes=3-100', 10), (3, 9))
+        self.assertEqual(parse_range('bytes=-4', 10), (6, 9))
+        self.assertEqual(parse_range('bytes=-40', 10), (0, 9))
+        self.assertIsNone(parse_range('', 10))
+        self.assertIsNone(parse_range('bytes=0-1,4-5', 10))
+        self.assertIs(parse_range('bytes=10-', 10), False)
+        self.assertIs(parse_range('bytes=5-2', 10), False)
+        self.assertIs(parse_range('bytes=-0', 10), False)
@@ -0,0 +1,77 @@
+import contextvars
+import time
+
+_current = contextvars.ContextVar('request_timings', default=None)
+
+
+class RequestTimings:
+    """
+    Where one request spent its time. Filled by the database execute wrapper,
+    core.http_client, core.caching and PerformanceMiddleware while the request
+    runs, including in sync_to_async/async_to_sync threads (they share the
+    request's context).
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.http = {}  # provider -> [calls, seconds]
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.serialize_time = 0.0
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    @property
+    def http_time(self):
+        return sum(seconds for _, seconds in self.http.values())
+
+
+def start():
+    """
+    Begin collecting for the current request. Returns a token for stop().
+    """
+    return _current.set(RequestTimings())
+
+
+def stop(token):
+    _current.reset(token)
+
+
+def current():
+    return _current.get()
+
+
+def time_query(execute, sql, params, many, context):
+    """
+    Database execute wrapper (see connection.execute_wrappers).
+    """
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.db_queries += 1
+        timings.db_time += time.perf_counter() - started
+
+
+def record_http(provider, elapsed):
+    timings = _current.get()
+    if timings is not None:
+        calls = timings.http.setdefault(provider, [0, 0.0])
+        calls[0] += 1
+        calls[1] += elapsed
+
+
+def record_cache(hit):
+    timings = _current.get()
+    if timings is not None:
+        if hit:
+            timings.cache_hits += 1
+        else:
+            timings.cache_misses += 1
@@ -5,6 +5,8 @@ from . import views
 urlpatterns = [
     path('health/', views.health_check, name='health_check'),
     path('info/', views.api_info, name='api_info'),
+    path('metrics', views.metrics_view, name='metrics'),
+    path('api/v1/autocomplete/', views.autocomplete_view, name='autocomplete'),
     path('', views.home_page, name='home'),
     path('contact/', views.contact_page, name='contact'),
     path('about/', views.about_page, name='about'),
@@ -1,13 +1,23 @@
+import hmac
+import os
+
 from django.shortcuts import render
 from rest_framework import generics, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
 from django.conf import settings
-from django.http import HttpResponse
+from django.http import HttpResponse, JsonResponse
+from django.views.decorators.http import require_GET
 
+from . import metrics
+from .autocomplete import autocomplete
+from .downloads import get_apk, record_download
+from .media import serve_file
 from .models import ApplicationAPK, UserFeedBack, NewsLetterSubscriber
 
+AUTOCOMPLETE_TYPES = ('song', 'artist', 'book')
+
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
@@ -35,6 +45,45 @@ def api_info(request):
     })
 
 
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def autocomplete_view(request):
+    """
+    Typeahead suggestions for song titles, artists and Bible book names.
+
+    Served from an in-memory prefix index, so no database query is made.
+    """
+    query = request.query_params.get('q', '')
+    types = [t for t in request.query_params.get('type', '').split(',') if t in AUTOCOMPLETE_TYPES]
+    try:
+        limit = min(max(int(request.query_params.get('limit', 10)), 1), 25)
+    except ValueError:
+        limit = 10
+
+    return Response({
+        'query': query,
+        'results': autocomplete(query, limit=limit, types=types or None),
+    })
+
+
+@require_GET
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint, summed over every worker (see core.metrics).
+    Kept outside DRF so scrapes skip authentication and throttling.
+    """
+    token = settings.METRICS_TOKEN
+    if token:
+        # Compared as bytes: compare_digest() rejects non-ASCII str
+        supplied = request.META.get('HTTP_AUTHORIZATION', '').encode()
+        if not hmac.compare_digest(supplied, f'Bearer {token}'.encode()):
+            return JsonResponse({'error': 'Unauthorized'}, status=401)
+    elif settings.ENVIRONMENT != 'development':
+        return JsonResponse({'error': 'Not found'}, status=404)
+
+    return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
 def home_page(request):
     template_name = 'core/home.html'
     # template_name = 'gospelux_landing.html'
@@ -77,17 +126,35 @@ def about_page(request):
     return render(request, template_name)
 
 def download_file(request, slug):
-    # Auto Detect platform
+    # Auto Detect platform; other user agents get the APK by slug alone,
+    # detected ones only their platform's build
     user_agent = request.META.get('HTTP_USER_AGENT', '').lower()
+    platform = None
     if 'android' in user_agent:
-        platform = 'Android'
+        platform = 'android'
     elif 'iphone' in user_agent or 'ipad' in user_agent or 'ios' in user_agent:
-        platform = 'iOS'
-        
-    apk = ApplicationAPK.objects.filter(slug=slug, type=platform).first()
-    if apk:
-        response = HttpResponse(apk.file, content_type='application/vnd.android.package-archive')
-        response['Content-Disposition'] = f'attachment; filename="{apk.name}.apk"'
-        return response
-    else:
-        return Response({'error': 'File not found'}, status=404)
\ No newline at end of file
+        platform = 'ios'
+
+    apk = get_apk(slug, platform)
+    if not apk or not apk.file:
+        return JsonResponse({'error': 'File not found'}, status=404)
+
+    extension = os.path.splitext(apk.file.name)[1] or ('.ipa' if apk.type == 'ios' else '.apk')
+    content_type = 'application/vnd.android.package-archive' if extension == '.apk' else 'application/octet-stream'
+    try:
+        response = serve_file(
+            request, apk.file,
+            content_type=content_type,
+            filename=f"{apk.name}-{apk.version}{extension}",
+            as_attachment=True,
+        )
+    except FileNotFoundError:
+        return JsonResponse({'error': 'File not found'}, status=404)
+
+    # Count full downloads and the first chunk of ranged ones, not resumes or 304s
+    if request.method == 'GET' and (
+        response.status_code == 200
+        or (response.status_code == 206 and response['Content-Range'].startswith('bytes 0-'))
+    ):
+        record_download(apk.pk)
+    return response
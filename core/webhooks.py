@@ -0,0 +1,37 @@
+import logging
+
+from django.conf import settings
+
+from .models import WebhookEndpoint
+
+logger = logging.getLogger(__name__)
+
+HEYGEN_WEBHOOK_EVENTS = ["avatar_video.success", "avatar_video.fail"]
+
+
+def ensure_heygen_webhook(client, reconcile=False):
+    """
+    Make sure the HeyGen video webhook is registered exactly once.
+
+    The registered endpoint is persisted, so the common path is a single DB
+    lookup. With ``reconcile`` the endpoint list is fetched from HeyGen and
+    the endpoint is registered only if HeyGen does not already have it.
+    """
+    url = settings.HEYGEN_WEBHOOK_URL
+    record = WebhookEndpoint.objects.filter(provider='heygen', url=url).first()
+    if record and not reconcile:
+        return record
+
+    data = client.ensure_webhook_endpoint(url, events=HEYGEN_WEBHOOK_EVENTS)
+    defaults = {
+        'endpoint_id': data.get('endpoint_id', ''),
+        'events': data.get('events') or HEYGEN_WEBHOOK_EVENTS,
+    }
+    if data.get('secret'):
+        defaults['secret'] = data['secret']
+
+    record, created = WebhookEndpoint.objects.update_or_create(
+        provider='heygen', url=url, defaults=defaults
+    )
+    logger.info(f"HeyGen webhook {'registered' if created else 'reconciled'}: {record.endpoint_id} -> {url}")
+    return record
@@ -40,9 +40,6 @@ class PlaylistAdmin(admin.ModelAdmin):
     search_fields = ('name', 'user__email', 'description')
     ordering = ('-created_at',)
     
-    def songs_count(self, obj):
-        return obj.songs.count()
-    
     
 @admin.register(PlaylistSong)
 class PlaylistSongAdmin(admin.ModelAdmin):
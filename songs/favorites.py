@@ -0,0 +1,71 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+
+from .models import Favorite, Song
+
+
+def _cache_key(user_id):
+    return f'favorites:{user_id}'
+
+
+def get_favorite_ids(user):
+    """
+    Return the set of song ids (as strings) the user has favorited.
+
+    Loaded with one query on a miss and cached per user; toggle_favorite
+    drops the cached set after each change.
+    """
+    if not user or not user.is_authenticated:
+        return frozenset()
+
+    key = _cache_key(user.pk)
+    favorite_ids = cache.get(key)
+    if favorite_ids is None:
+        favorite_ids = frozenset(
+            str(song_id) for song_id in Favorite.objects.filter(user=user).values_list('song_id', flat=True)
+        )
+        cache.set(key, favorite_ids, settings.FAVORITES_CACHE_SECONDS)
+    return favorite_ids
+
+
+def forget_favorites(user):
+    """
+    Drop the cached set after the user's favorites changed.
+    """
+    cache.delete(_cache_key(user.pk))
+
+
+def toggle_favorite(user, song_id):
+    """
+    Add or remove a favorite and return the new state.
+
+    The cached set decides which write to try first, so a toggle is a single
+    DELETE or an existence check plus INSERT; a stale cache only costs one
+    extra statement. The set is dropped rather than updated once the write
+    commits, so concurrent toggles never write back each other's stale copy.
+
+    Raises:
+        Song.DoesNotExist: if the song is to be added but is missing or inactive
+    """
+    song_id = str(song_id)
+    favorite_ids = get_favorite_ids(user)
+
+    is_favorited = song_id not in favorite_ids
+    if not is_favorited:
+        deleted, _ = Favorite.objects.filter(user=user, song_id=song_id).delete()
+        is_favorited = not deleted
+
+    if is_favorited:
+        if not Song.objects.filter(id=song_id, is_active=True).exists():
+            raise Song.DoesNotExist
+        try:
+            with transaction.atomic():
+                Favorite.objects.create(user=user, song_id=song_id)
+        except IntegrityError:
+            # Already favorited (stale cache or a concurrent request), toggle it off
+            Favorite.objects.filter(user=user, song_id=song_id).delete()
+            is_favorited = False
+
+    transaction.on_commit(lambda: forget_favorites(user))
+    return is_favorited
@@ -0,0 +1,67 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.models import Q
+from django.utils import timezone
+
+from songs.media_pipeline import get_pipeline_config, init_worker, process_song_data
+from songs.models import GeneratedSongsData
+
+
+class Command(BaseCommand):
+    help = 'Transcode newly ingested generated songs into renditions, HLS and waveforms; run every few minutes from cron'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=20, help='Songs to process in this run')
+        parser.add_argument('--workers', type=int, default=None, help='Worker processes (default MEDIA_PIPELINE workers)')
+        parser.add_argument('--retry-failed', action='store_true', help='Also retry songs that failed before')
+
+    def handle(self, *args, **options):
+        pipeline_config = get_pipeline_config()
+        now = timezone.now()
+
+        # A row left in 'processing' this long belongs to a run that died
+        reclaimed = GeneratedSongsData.objects.filter(
+            media_status='processing', updated_at__lt=now - timedelta(seconds=pipeline_config['stale_after']),
+        ).update(media_status='pending', updated_at=now)
+        if reclaimed:
+            self.stdout.write(f'Reclaimed {reclaimed} songs left processing by an earlier run')
+
+        statuses = ['pending', 'failed'] if options['retry_failed'] else ['pending']
+        candidates = (
+            GeneratedSongsData.objects
+            .filter(media_status__in=statuses)
+            .exclude(Q(audio_file='') | Q(audio_file__isnull=True))
+            .order_by('created_at')
+            .values_list('pk', flat=True)[:options['limit']]
+        )
+
+        # Claim each row so overlapping cron runs do not process it twice
+        claimed = [
+            pk for pk in candidates
+            if GeneratedSongsData.objects.filter(pk=pk, media_status__in=statuses).update(media_status='processing', updated_at=now)
+        ]
+        if not claimed:
+            self.stdout.write('No songs to process')
+            return
+
+        workers = options['workers'] or pipeline_config['workers']
+        # Forked workers must not share the parent's database connection
+        connections.close_all()
+
+        done = failed = 0
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as pool:
+            futures = {pool.submit(process_song_data, pk): pk for pk in claimed}
+            for future in as_completed(futures):
+                pk = futures[future]
+                try:
+                    future.result()
+                    done += 1
+                except Exception as e:
+                    failed += 1
+                    GeneratedSongsData.objects.filter(pk=pk).update(media_status='failed', media_error=str(e)[:2000])
+                    self.stderr.write(f'Song data {pk} failed: {e}')
+
+        self.stdout.write(self.style.SUCCESS(f'Processed {done} songs, {failed} failed'))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from songs.models import Song
+from songs.search import index_song
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the song search index from scratch'
+
+    def handle(self, *args, **options):
+        count = 0
+        for song in Song.objects.iterator():
+            index_song(song)
+            count += 1
+
+        self.stdout.write(self.style.SUCCESS(f'Indexed {count} songs'))
@@ -0,0 +1,168 @@
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+from array import array
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+PIPELINE_DEFAULTS = {
+    'ffmpeg': 'ffmpeg',
+    'bitrates': (64, 128, 192),  # kbit/s, lowest first
+    'hls_segment_seconds': 6,
+    'waveform_points': 200,
+    'waveform_sample_rate': 8000,
+    'workers': 2,
+    'timeout': 600,  # seconds per ffmpeg call
+    'stale_after': 3600,  # seconds one song may stay 'processing' before a new run reclaims it
+}
+
+
+def get_pipeline_config():
+    pipeline_config = dict(PIPELINE_DEFAULTS)
+    pipeline_config.update(getattr(settings, 'MEDIA_PIPELINE', {}))
+    return pipeline_config
+
+
+def _run(args, timeout, **kwargs):
+    result = subprocess.run(args, capture_output=True, timeout=timeout, check=False, **kwargs)
+    if result.returncode != 0:
+        raise RuntimeError(f"{args[0]} exited with {result.returncode}: {result.stderr[-500:].decode(errors='replace')}")
+    return result.stdout
+
+
+def transcode(source, out_dir, pipeline_config):
+    """
+    Transcode source into one MP3 and one HLS (AAC) stream per bitrate, in a
+    single ffmpeg run, then write the HLS master playlist.
+
+    Returns ({'64k': 'out_dir/64k.mp3', ...}, 'out_dir/master.m3u8').
+    """
+    args = [pipeline_config['ffmpeg'], '-hide_banner', '-loglevel', 'error', '-y', '-i', source]
+    progressive = {}
+    for bitrate in pipeline_config['bitrates']:
+        label = f'{bitrate}k'
+        progressive[label] = os.path.join(out_dir, f'{label}.mp3')
+        args += ['-map', '0:a:0', '-vn', '-c:a', 'libmp3lame', '-b:a', label, progressive[label]]
+        args += [
+            '-map', '0:a:0', '-vn', '-c:a', 'aac', '-b:a', label,
+            '-f', 'hls',
+            '-hls_time', str(pipeline_config['hls_segment_seconds']),
+            '-hls_playlist_type', 'vod',
+            '-hls_segment_filename', os.path.join(out_dir, f'{label}_%03d.ts'),
+            os.path.join(out_dir, f'{label}.m3u8'),
+        ]
+    _run(args, pipeline_config['timeout'])
+
+    master = os.path.join(out_dir, 'master.m3u8')
+    with open(master, 'w') as f:
+        f.write('#EXTM3U\n#EXT-X-VERSION:3\n')
+        for bitrate in pipeline_config['bitrates']:
+            f.write(f'#EXT-X-STREAM-INF:BANDWIDTH={bitrate * 1000},CODECS="mp4a.40.2"\n{bitrate}k.m3u8\n')
+    return progressive, master
+
+
+def waveform(source, pipeline_config):
+    """
+    Decode source to mono PCM and return (peaks, duration).
+
+    peaks holds waveform_points values between 0 and 1, each the loudest
+    sample of its slice of the track.
+    """
+    sample_rate = pipeline_config['waveform_sample_rate']
+    pcm = _run([
+        pipeline_config['ffmpeg'], '-hide_banner', '-loglevel', 'error', '-i', source,
+        '-vn', '-ac', '1', '-ar', str(sample_rate), '-f', 's16le', '-',
+    ], pipeline_config['timeout'])
+
+    samples = array('h')
+    samples.frombytes(pcm[:len(pcm) - len(pcm) % 2])
+    duration = timedelta(seconds=len(samples) / sample_rate)
+    if not samples:
+        return [], duration
+
+    points = pipeline_config['waveform_points']
+    step = max(len(samples) // points, 1)
+    peaks = [
+        max(abs(sample) for sample in samples[start:start + step]) / 32768
+        for start in range(0, len(samples), step)
+    ][:points]
+    return [round(peak, 3) for peak in peaks], duration
+
+
+def _local_copy(field_file, work_dir):
+    """
+    Return a local path for a stored file, downloading it if the storage has
+    no filesystem path.
+    """
+    try:
+        return field_file.path
+    except NotImplementedError:
+        local = os.path.join(work_dir, 'source' + os.path.splitext(field_file.name)[1])
+        with field_file.open('rb') as src, open(local, 'wb') as dst:
+            shutil.copyfileobj(src, dst)
+        return local
+
+
+def init_worker():
+    """
+    Pool initializer: make Django usable in the worker and drop any database
+    connection inherited from the parent process.
+    """
+    import django
+    from django.db import connections
+
+    django.setup()
+    connections.close_all()
+
+
+def process_song_data(song_data_id):
+    """
+    Build the renditions, HLS stream, waveform and duration of one
+    GeneratedSongsData and store them. Runs inside a pool worker process.
+    """
+    from .models import GeneratedSongsData
+
+    pipeline_config = get_pipeline_config()
+    # Restart the stale clock: rows can wait in the pool behind other songs
+    GeneratedSongsData.objects.filter(pk=song_data_id, media_status='processing').update(updated_at=timezone.now())
+    song_data = GeneratedSongsData.objects.get(pk=song_data_id)
+    storage_dir = f'generated_songs/renditions/{song_data.pk}'
+
+    work_dir = tempfile.mkdtemp(prefix='song-media-')
+    try:
+        source = _local_copy(song_data.audio_file, work_dir)
+        out_dir = os.path.join(work_dir, 'out')
+        os.makedirs(out_dir)
+
+        peaks, duration = waveform(source, pipeline_config)
+        progressive, master = transcode(source, out_dir, pipeline_config)
+
+        # Upload everything; playlists reference segments by relative name
+        stored = {}
+        for name in sorted(os.listdir(out_dir)):
+            target = f'{storage_dir}/{name}'
+            if default_storage.exists(target):
+                default_storage.delete(target)
+            with open(os.path.join(out_dir, name), 'rb') as f:
+                stored[name] = default_storage.save(target, File(f))
+
+        song_data.renditions = {label: stored[os.path.basename(path)] for label, path in progressive.items()}
+        song_data.hls_playlist.name = stored[os.path.basename(master)]
+        song_data.waveform = peaks
+        song_data.duration = song_data.duration or duration
+        song_data.media_status = 'ready'
+        song_data.media_error = None
+        song_data.save(update_fields=[
+            'renditions', 'hls_playlist', 'waveform', 'duration', 'media_status', 'media_error', 'updated_at'
+        ])
+        return song_data_id
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
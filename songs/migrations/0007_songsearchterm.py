@@ -0,0 +1,76 @@
+# Generated by Django 5.2.6 on 2026-10-18 22:11
+
+import re
+import unicodedata
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Frozen copy of songs.search as of this migration, so later changes to the
+# tokenizer or weights never change what this migration does
+FIELD_WEIGHTS = (
+    ('title', 8),
+    ('artist', 4),
+    ('album', 2),
+    ('lyrics', 1),
+)
+MAX_TERM_LENGTH = 64
+MAX_LYRICS_TERMS = 300
+STOPWORDS = frozenset([
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'but', 'by', 'for', 'i', 'in',
+    'is', 'it', 'me', 'my', 'of', 'on', 'or', 'so', 'the', 'to', 'we', 'you',
+])
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(text):
+    if not text:
+        return []
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(char for char in text if not unicodedata.combining(char)).lower()
+    return [token[:MAX_TERM_LENGTH] for token in TOKEN_RE.findall(text)]
+
+
+def song_terms(song):
+    terms = {}
+    for field, weight in FIELD_WEIGHTS:
+        tokens = tokenize(getattr(song, field, None))
+        if field == 'lyrics':
+            tokens = [token for token in dict.fromkeys(tokens) if token not in STOPWORDS][:MAX_LYRICS_TERMS]
+        for token in tokens:
+            if terms.get(token, 0) < weight:
+                terms[token] = weight
+    return terms
+
+
+def build_song_search_index(apps, schema_editor):
+    Song = apps.get_model('songs', 'Song')
+    SongSearchTerm = apps.get_model('songs', 'SongSearchTerm')
+    for song in Song.objects.iterator():
+        SongSearchTerm.objects.bulk_create([
+            SongSearchTerm(song_id=song.pk, term=term, weight=weight)
+            for term, weight in song_terms(song).items()
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('songs', '0006_alter_generatedvideo_status_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SongSearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('weight', models.PositiveSmallIntegerField(default=1)),
+                ('song', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='songs.song')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['term', 'song'], name='songs_songs_term_2979a8_idx')],
+            },
+        ),
+        migrations.RunPython(build_song_search_index, migrations.RunPython.noop),
+    ]
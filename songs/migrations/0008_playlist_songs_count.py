@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-18 22:14
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_songs_count(apps, schema_editor):
+    Playlist = apps.get_model('songs', 'Playlist')
+    PlaylistSong = apps.get_model('songs', 'PlaylistSong')
+    counts = (
+        PlaylistSong.objects.filter(playlist=OuterRef('pk'))
+        .values('playlist')
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    Playlist.objects.update(songs_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('songs', '0007_songsearchterm'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='playlist',
+            name='songs_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_songs_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-18 22:17
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_webhookendpoint'),
+        ('songs', '0008_playlist_songs_count'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='favorite',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='songs_favor_user_id_915d7c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='generatedsongs',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='songs_gener_user_id_e42727_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='song',
+            index=models.Index(fields=['title', 'id'], name='songs_song_title_30fcbf_idx'),
+        ),
+    ]
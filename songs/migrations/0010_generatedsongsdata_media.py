@@ -0,0 +1,38 @@
+# Generated by Django 5.2.6 on 2026-10-18 22:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('songs', '0009_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='generatedsongsdata',
+            name='hls_playlist',
+            field=models.FileField(blank=True, max_length=300, null=True, upload_to='generated_songs/renditions/'),
+        ),
+        migrations.AddField(
+            model_name='generatedsongsdata',
+            name='media_error',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='generatedsongsdata',
+            name='media_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('ready', 'Ready'), ('failed', 'Failed')], default='pending', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='generatedsongsdata',
+            name='renditions',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='generatedsongsdata',
+            name='waveform',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
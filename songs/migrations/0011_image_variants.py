@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 22:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('songs', '0010_generatedsongsdata_media'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='playlist',
+            name='cover_image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
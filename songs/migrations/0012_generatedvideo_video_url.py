@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 23:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('songs', '0011_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='generatedvideo',
+            name='video_url',
+            field=models.URLField(blank=True, max_length=1000, null=True),
+        ),
+    ]
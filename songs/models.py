@@ -52,10 +52,27 @@ class Song(BaseModel):
     
     class Meta:
         ordering = ['title']
+        indexes = [
+            models.Index(fields=['title', 'id']),
+        ]
     
     def __str__(self):
         return f"{self.title} - {self.artist}"
 
+class SongSearchTerm(models.Model):
+    """Weighted search index terms for songs, kept in sync on Song save"""
+    song = models.ForeignKey(Song, on_delete=models.CASCADE, related_name='search_terms')
+    term = models.CharField(max_length=64)
+    weight = models.PositiveSmallIntegerField(default=1)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['term', 'song']),
+        ]
+
+    def __str__(self):
+        return f"{self.term} ({self.weight}) - {self.song_id}"
+
 class Playlist(BaseModel):
     """User-created playlists"""
     name = models.CharField(max_length=200)
@@ -64,16 +81,20 @@ class Playlist(BaseModel):
     songs = models.ManyToManyField(Song, through='PlaylistSong', related_name='playlists')
     is_public = models.BooleanField(default=False)
     cover_image = models.ImageField(upload_to='playlists/', blank=True, null=True)
+    cover_image_variants = models.JSONField(default=dict, blank=True, editable=False)  # Resized copies, see core.images
+    songs_count = models.PositiveIntegerField(default=0, editable=False)  # Kept in sync by songs.signals
     
     class Meta:
         ordering = ['-created_at']
     
     def __str__(self):
         return f"{self.name} - {self.user.get_full_name() or self.user.username}"
-    
-    @property
-    def songs_count(self):
-        return self.songs.count()
+
+    def refresh_songs_count(self):
+        """Recount songs, for bulk changes that bypass the PlaylistSong signals"""
+        self.songs_count = self.playlistsong_set.count()
+        Playlist.objects.filter(pk=self.pk).update(songs_count=self.songs_count)
+        return self.songs_count
 
 class PlaylistSong(BaseModel):
     """Through model for playlist songs with ordering"""
@@ -113,6 +134,9 @@ class Favorite(BaseModel):
     class Meta:
         ordering = ['-created_at']
         unique_together = ['user', 'song']
+        indexes = [
+            models.Index(fields=['user', 'created_at', 'id']),
+        ]
     
     def __str__(self):
         return f"{self.user.get_full_name() or self.user.username} - {self.song.title}"
@@ -134,6 +158,9 @@ class GeneratedSongs(BaseModel):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'created_at', 'id']),
+        ]
     
     def __str__(self):
         return f"Generated: {self.title} - {self.user.get_full_name() or self.user.username}"
@@ -147,6 +174,17 @@ class GeneratedSongsData(BaseModel):
     audio_file = models.FileField(upload_to='generated_songs/audio/', blank=True, null=True)
     data_id = models.CharField(max_length=100, blank=True, null=True)
     duration = models.DurationField(blank=True, null=True)
+    # Filled by songs.media_pipeline (process_song_media command)
+    media_status = models.CharField(max_length=20, choices=(
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('ready', 'Ready'),
+        ('failed', 'Failed')), default='pending')
+    renditions = models.JSONField(default=dict, blank=True)  # {"64k": storage name, ...}
+    hls_playlist = models.FileField(upload_to='generated_songs/renditions/', max_length=300, blank=True, null=True)
+    waveform = models.JSONField(default=list, blank=True)
+    media_error = models.TextField(blank=True, null=True)
+
     class Meta:
         ordering = ['-created_at']
     
@@ -180,6 +218,8 @@ class GeneratedVideo(BaseModel):
         ('failed', 'Failed'),
         ('queued', 'Queued')), default='processing')
     video_id = models.CharField(max_length=100, blank=True, null=True)
+    # Rendered video reported by the HeyGen webhook; process_task downloads it
+    video_url = models.URLField(max_length=1000, blank=True, null=True)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='generated_videos')
     error_message = models.TextField(blank=True, null=True)
     
@@ -0,0 +1,115 @@
+import contextvars
+from contextlib import contextmanager
+
+from django.db.models import Max
+
+from .models import PlaylistSong, Song
+
+# Songs are ordered with gaps so a move can take the midpoint of its new
+# neighbours and update a single row; the playlist is only renumbered when a
+# gap runs out.
+ORDER_STEP = 1024
+MAX_BATCH_SIZE = 1000
+
+_songs_count_suspended = contextvars.ContextVar('songs_count_suspended', default=False)
+
+
+def songs_count_suspended():
+    return _songs_count_suspended.get()
+
+
+@contextmanager
+def suspend_songs_count():
+    """
+    Stop the PlaylistSong signals from updating Playlist.songs_count row by
+    row; callers recount once with Playlist.refresh_songs_count().
+    """
+    token = _songs_count_suspended.set(True)
+    try:
+        yield
+    finally:
+        _songs_count_suspended.reset(token)
+
+
+def next_order(playlist):
+    """
+    Return the order value that places a song at the end of the playlist.
+    """
+    max_order = PlaylistSong.objects.filter(playlist=playlist).aggregate(max_order=Max('order'))['max_order']
+    return ORDER_STEP if max_order is None else max_order + ORDER_STEP
+
+
+def renumber(playlist):
+    """
+    Spread the playlist's songs out again, ORDER_STEP apart.
+    """
+    entries = list(PlaylistSong.objects.filter(playlist=playlist).order_by('order', 'created_at'))
+    for position, entry in enumerate(entries, start=1):
+        entry.order = position * ORDER_STEP
+    PlaylistSong.objects.bulk_update(entries, ['order'], batch_size=500)
+
+
+def add_songs(playlist, song_ids):
+    """
+    Append songs to the end of a playlist, in the given order.
+
+    Unknown, inactive and already present songs are skipped. Returns the ids
+    of the songs added.
+    """
+    song_ids = list(dict.fromkeys(song_ids))
+    active = set(Song.objects.filter(id__in=song_ids, is_active=True).values_list('id', flat=True))
+    present = set(
+        PlaylistSong.objects.filter(playlist=playlist, song_id__in=active).values_list('song_id', flat=True)
+    )
+    added = [song_id for song_id in song_ids if song_id in active and song_id not in present]
+    if not added:
+        return []
+
+    start = next_order(playlist)
+    PlaylistSong.objects.bulk_create([
+        PlaylistSong(playlist=playlist, song_id=song_id, order=start + position * ORDER_STEP)
+        for position, song_id in enumerate(added)
+    ], batch_size=500)
+    return added
+
+
+def remove_songs(playlist, song_ids):
+    """
+    Remove songs from a playlist. Returns the number removed.
+    """
+    removed, _ = PlaylistSong.objects.filter(playlist=playlist, song_id__in=song_ids).delete()
+    return removed
+
+
+def move_song(playlist, song_id, after=None):
+    """
+    Move a song to just after another one, or to the top when after is None.
+
+    Raises:
+        PlaylistSong.DoesNotExist: if either song is not in the playlist
+    """
+    entries = PlaylistSong.objects.filter(playlist=playlist)
+    entry = entries.get(song_id=song_id)
+    if after == song_id:
+        return entry
+
+    for _ in range(2):
+        low = -1 if after is None else entries.get(song_id=after).order
+        high = (
+            entries.exclude(pk=entry.pk)
+            .filter(order__gt=low)
+            .order_by('order')
+            .values_list('order', flat=True)
+            .first()
+        )
+        if high is None:
+            entry.order = max(low, 0) + ORDER_STEP
+            break
+        if high - low >= 2:
+            entry.order = (low + high) // 2
+            break
+        # No room between the neighbours, spread the playlist out and retry
+        renumber(playlist)
+
+    PlaylistSong.objects.filter(pk=entry.pk).update(order=entry.order)
+    return entry
@@ -0,0 +1,143 @@
+import re
+import unicodedata
+
+from django.db.models import Case, F, IntegerField, Q, Sum, When
+
+# Field weights: a hit in the title counts more than one in the lyrics
+FIELD_WEIGHTS = (
+    ('title', 8),
+    ('artist', 4),
+    ('album', 2),
+    ('lyrics', 1),
+)
+MAX_TERM_LENGTH = 64
+MAX_LYRICS_TERMS = 300
+# Tokens shorter than this only match whole terms, except the last token of
+# the query which is treated as a typeahead prefix
+MIN_PREFIX_LENGTH = 3
+STOPWORDS = frozenset([
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'but', 'by', 'for', 'i', 'in',
+    'is', 'it', 'me', 'my', 'of', 'on', 'or', 'so', 'the', 'to', 'we', 'you',
+])
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(text):
+    """
+    Lowercase, strip accents and split text into search terms.
+    """
+    if not text:
+        return []
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(char for char in text if not unicodedata.combining(char)).lower()
+    return [token[:MAX_TERM_LENGTH] for token in _TOKEN_RE.findall(text)]
+
+
+def song_terms(song):
+    """
+    Return {term: weight} for a song, keeping the best weight per term.
+    """
+    terms = {}
+    for field, weight in FIELD_WEIGHTS:
+        tokens = tokenize(getattr(song, field, None))
+        if field == 'lyrics':
+            tokens = [token for token in dict.fromkeys(tokens) if token not in STOPWORDS][:MAX_LYRICS_TERMS]
+        for token in tokens:
+            if terms.get(token, 0) < weight:
+                terms[token] = weight
+    return terms
+
+
+def index_song(song):
+    """
+    Replace the search terms stored for a song.
+    """
+    from .models import SongSearchTerm
+
+    SongSearchTerm.objects.filter(song_id=song.pk).delete()
+    SongSearchTerm.objects.bulk_create([
+        SongSearchTerm(song_id=song.pk, term=term, weight=weight)
+        for term, weight in song_terms(song).items()
+    ])
+
+
+def edit_distance(a, b, limit):
+    """
+    Levenshtein distance between a and b, giving up once it exceeds limit.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, start=1):
+        current = [i]
+        for j, char_b in enumerate(b, start=1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b),
+            ))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+def _typo_candidates(term_model, token):
+    """
+    Return indexed title/artist/album terms within one or two edits of token.
+    """
+    limit = 1 if len(token) < 8 else 2
+    vocabulary = (
+        term_model.objects
+        .filter(term__startswith=token[0], weight__gte=2)
+        .values_list('term', flat=True)
+        .distinct()[:5000]
+    )
+    return [term for term in vocabulary if edit_distance(token, term, limit) <= limit]
+
+
+def search_song_ids(query, limit=50):
+    """
+    Return active song ids matching query, best match first.
+
+    Every token matches whole terms, tokens long enough (and always the last
+    one, for typeahead) also match as prefixes, and tokens that match nothing
+    are retried against near-miss spellings. Songs are ranked by the summed
+    field weight of their matching terms, with whole-term hits counting double.
+    """
+    from .models import SongSearchTerm
+
+    tokens = [token for token in tokenize(query) if token not in STOPWORDS] or tokenize(query)
+    if not tokens:
+        return []
+
+    exact_terms = set()
+    condition = Q()
+    for position, token in enumerate(tokens):
+        is_last = position == len(tokens) - 1
+        if len(token) >= MIN_PREFIX_LENGTH or is_last:
+            token_condition = Q(term__startswith=token)
+        else:
+            token_condition = Q(term=token)
+
+        if len(token) >= 4 and not SongSearchTerm.objects.filter(token_condition).exists():
+            corrections = _typo_candidates(SongSearchTerm, token)
+            if corrections:
+                token_condition = Q(term__in=corrections)
+
+        exact_terms.add(token)
+        condition |= token_condition
+
+    rows = (
+        SongSearchTerm.objects
+        .filter(condition, song__is_active=True)
+        .values('song_id')
+        .annotate(score=Sum(Case(
+            When(term__in=exact_terms, then=F('weight') * 2),
+            default=F('weight'),
+            output_field=IntegerField(),
+        )))
+        .order_by('-score', 'song_id')[:limit]
+    )
+    return [row['song_id'] for row in rows]
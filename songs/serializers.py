@@ -1,5 +1,11 @@
+from django.core.files.storage import default_storage
 from rest_framework import serializers
+from core.images import variant_urls
 from .models import Song, Playlist, PlaylistSong, Favorite, Video, GeneratedSongs, GeneratedSongsData, GeneratedVideo
+from .favorites import get_favorite_ids
+from .playlists import MAX_BATCH_SIZE
+
+PLAYLIST_PREVIEW_SIZE = 4
 
 # class ArtistSerializer(serializers.ModelSerializer):
 #     songs_count = serializers.IntegerField(source='songs.count', read_only=True)
@@ -18,14 +24,22 @@ from .models import Song, Playlist, PlaylistSong, Favorite, Video, GeneratedSong
 #         read_only_fields = ['created_at']
 
 class SongSerializer(serializers.ModelSerializer):
-    artist_name = serializers.CharField(source='artist.name', read_only=True)
-    album_title = serializers.CharField(source='album.title', read_only=True)
+    artist_name = serializers.CharField(source='artist', read_only=True)
+    album_title = serializers.CharField(source='album', read_only=True)
+    is_favorited = serializers.SerializerMethodField()
 
     class Meta:
         model = Song
-        fields = ['id', 'title', 'artist', 'artist_name', 'album', 'album_title', 'key_signature', 'bpm', 'category', 'is_active']
+        fields = ['id', 'title', 'artist', 'artist_name', 'album', 'album_title', 'key_signature', 'bpm', 'category', 'is_active', 'is_favorited']
         read_only_fields = ['created_at']
 
+    def get_is_favorited(self, obj):
+        # Looked up once per response; list items share the root's context
+        if 'favorite_ids' not in self.context:
+            request = self.context.get('request')
+            self.context['favorite_ids'] = get_favorite_ids(getattr(request, 'user', None))
+        return str(obj.pk) in self.context['favorite_ids']
+
 class SongDetailSerializer(SongSerializer):
     lyrics = serializers.CharField()
     duration = serializers.DurationField()
@@ -37,13 +51,35 @@ class SongDetailSerializer(SongSerializer):
         fields = SongSerializer.Meta.fields + ['lyrics', 'duration', 'audio_file', 'sheet_music', 'tags']
 
 
+class PlaylistPreviewSongSerializer(serializers.ModelSerializer):
+    id = serializers.UUIDField(source='song.id', read_only=True)
+    title = serializers.CharField(source='song.title', read_only=True)
+    artist = serializers.CharField(source='song.artist', read_only=True)
+
+    class Meta:
+        model = PlaylistSong
+        fields = ['id', 'title', 'artist', 'order']
+
+
 class PlaylistSerializer(serializers.ModelSerializer):
-    songs_count = serializers.IntegerField(source='songs.count', read_only=True)
+    cover_image_variants = serializers.SerializerMethodField()
+    preview = serializers.SerializerMethodField()
 
     class Meta:
         model = Playlist
-        fields = ['id', 'name', 'user', 'is_public', 'songs_count']
-        read_only_fields = ['created_at', 'user']
+        fields = ['id', 'name', 'user', 'is_public', 'cover_image', 'cover_image_variants', 'songs_count', 'preview']
+        read_only_fields = ['created_at', 'user', 'songs_count']
+
+    def get_cover_image_variants(self, obj):
+        # Empty until the image pipeline has processed the upload
+        return variant_urls(obj.cover_image_variants)
+
+    def get_preview(self, obj):
+        # Filled by the views' Prefetch(to_attr='preview_songs')
+        entries = getattr(obj, 'preview_songs', None)
+        if entries is None:
+            entries = obj.playlistsong_set.select_related('song')[:PLAYLIST_PREVIEW_SIZE]
+        return PlaylistPreviewSongSerializer(entries, many=True).data
 
 
 class AddSongToPlaylistSerializer(serializers.ModelSerializer):
@@ -52,6 +88,27 @@ class AddSongToPlaylistSerializer(serializers.ModelSerializer):
         fields = ['song', 'order']
         read_only_fields = ['created_at', 'playlist']
 
+class PlaylistMoveSerializer(serializers.Serializer):
+    song = serializers.UUIDField()
+    after = serializers.UUIDField(allow_null=True, required=False, default=None)
+
+
+class PlaylistBulkSerializer(serializers.Serializer):
+    """Batch of playlist changes, applied in order: remove, add, move"""
+    add = serializers.ListField(child=serializers.UUIDField(), required=False, default=list, max_length=MAX_BATCH_SIZE)
+    remove = serializers.ListField(child=serializers.UUIDField(), required=False, default=list, max_length=MAX_BATCH_SIZE)
+    move = PlaylistMoveSerializer(many=True, required=False, default=list)
+
+    def validate_move(self, value):
+        if len(value) > MAX_BATCH_SIZE:
+            raise serializers.ValidationError(f"At most {MAX_BATCH_SIZE} moves per request.")
+        return value
+
+    def validate(self, attrs):
+        if not (attrs['add'] or attrs['remove'] or attrs['move']):
+            raise serializers.ValidationError("Provide at least one of add, remove or move.")
+        return attrs
+
 # class SongRequestSerializer(serializers.ModelSerializer):
 #     user_email = serializers.EmailField(source='user.email', read_only=True)
 
@@ -80,10 +137,15 @@ class GeneratedSongsSerializer(serializers.ModelSerializer):
 
 
 class GeneratedSongsDataSerializer(serializers.ModelSerializer):
+    rendition_urls = serializers.SerializerMethodField()
+
     class Meta:
         model = GeneratedSongsData
         fields = "__all__"
         read_only_fields = ['created_at']
+
+    def get_rendition_urls(self, obj):
+        return {label: default_storage.url(name) for label, name in (obj.renditions or {}).items()}
         
 
 class GeneratedVideoSerializer(serializers.ModelSerializer):
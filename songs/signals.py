@@ -0,0 +1,30 @@
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.images import register_image_field
+
+from .models import Playlist, PlaylistSong, Song
+from .playlists import songs_count_suspended
+from .search import index_song
+
+register_image_field(Playlist, 'cover_image')
+
+
+@receiver(post_save, sender=Song)
+def update_song_search_index(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index_song(instance)
+
+
+@receiver(post_save, sender=PlaylistSong)
+def increment_playlist_songs_count(sender, instance, created, raw=False, **kwargs):
+    if created and not raw and not songs_count_suspended():
+        Playlist.objects.filter(pk=instance.playlist_id).update(songs_count=F('songs_count') + 1)
+
+
+@receiver(post_delete, sender=PlaylistSong)
+def decrement_playlist_songs_count(sender, instance, **kwargs):
+    if songs_count_suspended():
+        return
+    Playlist.objects.filter(pk=instance.playlist_id, songs_count__gt=0).update(songs_count=F('songs_count') - 1)
@@ -1,3 +1,125 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from users.authentication import tokens_for_user
+from users.models import User
+
+from . import favorites
+from .views import download_generated_video
+from .models import Favorite, GeneratedSongs, GeneratedSongsData, GeneratedVideo, Song
+
+
+class FavoriteToggleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email='ann@example.com', username='ann', password='password-1')
+        self.song = Song.objects.create(title='Amazing Grace')
+
+    def toggle(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return favorites.toggle_favorite(self.user, self.song.pk)
+
+    def test_toggle_drops_the_cached_set(self):
+        self.assertEqual(favorites.get_favorite_ids(self.user), frozenset())
+
+        self.assertTrue(self.toggle())
+        self.assertEqual(favorites.get_favorite_ids(self.user), {str(self.song.pk)})
+
+        self.assertFalse(self.toggle())
+        self.assertEqual(favorites.get_favorite_ids(self.user), frozenset())
+
+    def test_stale_cached_set_is_not_written_back(self):
+        favorites.get_favorite_ids(self.user)  # caches the empty set
+        Favorite.objects.create(user=self.user, song=self.song)
+        other = Song.objects.create(title='Be Thou My Vision')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(favorites.toggle_favorite(self.user, other.pk))
+
+        self.assertEqual(favorites.get_favorite_ids(self.user), {str(self.song.pk), str(other.pk)})
+
+
+@override_settings(GENERATION_QUOTAS={'free': {'video': {'rate': '10/min', 'daily': 1}}})
+class VideoQuotaTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        user = User.objects.create_user(email='ann@example.com', username='ann', password='password-1')
+        self.headers = {'HTTP_AUTHORIZATION': f'Bearer {tokens_for_user(user).access_token}'}
+
+    def generate(self, data):
+        return self.client.post('/api/v1/songs/generate-video/', data, content_type='application/json', **self.headers)
+
+    def test_rejected_request_gives_the_quota_back(self):
+        self.assertEqual(self.generate({'title': 'No verse'}).status_code, 400)
+
+        self.assertEqual(self.generate({'bible_verse': 'John 3:16'}).status_code, 202)
+        self.assertEqual(self.generate({'bible_verse': 'John 3:16'}).status_code, 429)
+        self.assertEqual(GeneratedVideo.objects.filter(status='queued').count(), 1)
+
+
+class VideoCallbackTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        user = User.objects.create_user(email='ann@example.com', username='ann', password='password-1')
+        self.video = GeneratedVideo.objects.create(user=user, bible_verse='John 3:16', title='So Loved', video_id='v1')
+
+    def test_callback_records_the_url_without_downloading(self):
+        with mock.patch('songs.views.get_session') as get_session, \
+                mock.patch('songs.views.get_async_client') as get_async_client:
+            response = self.client.post('/api/v1/songs/generated-videos-callback/', {
+                'event_type': 'avatar_video.success',
+                'event_data': {'video_id': 'v1', 'url': 'https://files.heygen.example/v1.mp4'},
+            }, content_type='application/json')
+
+        self.assertEqual(response.status_code, 200)
+        get_session.assert_not_called()
+        get_async_client.assert_not_called()
+        self.video.refresh_from_db()
+        self.assertEqual(self.video.video_url, 'https://files.heygen.example/v1.mp4')
+        self.assertEqual(self.video.status, 'processing')
+
+    def test_download_streams_into_storage(self):
+        upstream = mock.MagicMock()
+        upstream.__enter__.return_value = upstream
+        upstream.iter_content.return_value = iter([b'a' * 10, b'b' * 5])
+
+        with mock.patch('songs.views.get_session') as get_session:
+            get_session.return_value.get.return_value = upstream
+            download_generated_video(self.video, 'https://files.heygen.example/v1.mp4', 'v1.mp4')
+
+        get_session.return_value.get.assert_called_once_with('https://files.heygen.example/v1.mp4', stream=True)
+        self.video.refresh_from_db()
+        self.assertEqual(self.video.status, 'completed')
+        with self.video.video_file.open('rb') as stored:
+            self.assertEqual(stored.read(), b'a' * 10 + b'b' * 5)
+
+
+class ProcessSongMediaTests(TestCase):
+    def test_stale_processing_rows_are_reclaimed(self):
+        user = User.objects.create_user(email='ann@example.com', username='ann', password='password-1')
+        song = GeneratedSongs.objects.create(
+            user=user, bible_verse='John 3:16', title='So Loved', lyrics='...', genre='gospel', mood='joyful',
+        )
+        stale = GeneratedSongsData.objects.create(generated_song=song, media_status='processing')
+        running = GeneratedSongsData.objects.create(generated_song=song, media_status='processing')
+        GeneratedSongsData.objects.filter(pk=stale.pk).update(updated_at=timezone.now() - timedelta(hours=2))
+
+        out = StringIO()
+        call_command('process_song_media', stdout=out)
+
+        self.assertIn('Reclaimed 1 songs', out.getvalue())
+        stale.refresh_from_db()
+        running.refresh_from_db()
+        self.assertEqual((stale.media_status, running.media_status), ('pending', 'processing'))
@@ -9,10 +9,12 @@ urlpatterns = [
     path('songs/', views.SongListView.as_view(), name='songs'),
     path('songs/<uuid:pk>/', views.SongDetailView.as_view(), name='song_detail'),
     path('search/', views.search_songs, name='search_songs'),
+    path('media/<slug:kind>/<uuid:pk>/', views.stream_media, name='stream_media'),
     path('playlists/', views.PlaylistListCreateView.as_view(), name='playlists'),
     path('playlists/<uuid:pk>/', views.PlaylistDetailView.as_view(), name='playlist_detail'),
     path('playlists/<uuid:playlist_id>/add-song/', views.add_song_to_playlist, name='add_song_to_playlist'),
     path('playlists/<uuid:playlist_id>/remove-song/<uuid:song_id>/', views.remove_song_from_playlist, name='remove_song_from_playlist'),
+    path('playlists/<uuid:playlist_id>/songs/bulk/', views.bulk_update_playlist, name='bulk_update_playlist'),
     # path('requests/', views.SongRequestListCreateView.as_view(), name='song_requests'),
     # path('requests/<uuid:pk>/', views.SongRequestDetailView.as_view(), name='song_request_detail'),
     path('favorites/', views.FavoriteListCreateView.as_view(), name='favorites'),
@@ -1,33 +1,47 @@
 import json
 import re
-import requests
 import logging
+import tempfile
 import threading
+from asgiref.sync import sync_to_async
 from django.shortcuts import render
 
 # Create your views here.
 from rest_framework import generics, permissions, status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.views import APIView
+from adrf.decorators import api_view as async_api_view
+from adrf.views import APIView as AsyncAPIView
 from rest_framework.exceptions import NotFound
 from rest_framework.response import Response
 from django.db.models import Q, Count
 from django.db.models import Prefetch
+from django.db import transaction
 from django.views.decorators.csrf import csrf_exempt
-from django.core.files.base import ContentFile
-from core.generation_utility import generate_song, model_generator, generate_video, get_video_status
-from core.heygen import HeyGenVideoCreator, select_voice_for_scene, select_avatar_for_scene
-from .models import  Song, Playlist, PlaylistSong, Favorite, GeneratedSongs, GeneratedSongsData, GeneratedVideo
+from django.core.files.base import ContentFile, File
+from core.generation_utility import generate_song, model_generator, generate_video, get_video_status, agenerate_song, amodel_generator
+from core.heygen import HeyGenVideoCreator, HeyGenCatalog
+from core.http_client import get_async_client, get_session, with_async_clients
+from core.llm_parsing import extract_json, parse_scenes
+from core.media import serve_file
+from core.pagination import KeysetPagination
+from users.throttling import SongGenerationThrottle, VideoGenerationThrottle, reconcile_quota
+from . import favorites
+from .playlists import add_songs, move_song, next_order, remove_songs, suspend_songs_count
+from .search import search_song_ids
+from .models import  Song, Playlist, PlaylistSong, Favorite, GeneratedSongs, GeneratedSongsData, GeneratedVideo, Video
 from .serializers import (
     SongSerializer, SongDetailSerializer,
-    PlaylistSerializer, AddSongToPlaylistSerializer, FavoriteSerializer, 
+    PlaylistSerializer, AddSongToPlaylistSerializer, PlaylistBulkSerializer, FavoriteSerializer, 
     GeneratedSongsSerializer, GeneratedSongsDataSerializer,
-    GeneratedVideoSerializer, VideoSerializer, VideoDetailSerializer, GeneratedVideoDetailSerializer
+    GeneratedVideoSerializer, VideoSerializer, VideoDetailSerializer, GeneratedVideoDetailSerializer,
+    PLAYLIST_PREVIEW_SIZE,
 )
 from decouple import config
 
 logger = logging.getLogger(__name__)
 client = HeyGenVideoCreator(config("HeyGen_API_KEY"))
+catalog = HeyGenCatalog(client, ttl=config("HEYGEN_CATALOG_TTL", default=6 * 60 * 60, cast=int))
 
 
 # class ArtistListView(generics.ListAPIView):
@@ -59,6 +73,8 @@ client = HeyGenVideoCreator(config("HeyGen_API_KEY"))
 class SongListView(generics.ListAPIView):
     serializer_class = SongSerializer
     permission_classes = [permissions.AllowAny]
+    pagination_class = KeysetPagination
+    keyset_ordering = ('title', 'id')
     
     def get_queryset(self):
         # queryset = Song.objects.filter(is_active=True).select_related('artist', 'album', 'category')
@@ -101,12 +117,9 @@ def search_songs(request):
     if not query:
         return Response({'error': 'Search query is required'}, status=status.HTTP_400_BAD_REQUEST)
     
-    songs = Song.objects.filter(
-        Q(title__icontains=query) |
-        Q(artist__icontains=query) |
-        Q(lyrics__icontains=query) |
-        Q(album__icontains=query)
-    ).filter(is_active=True).select_related('category').distinct()[:50]
+    song_ids = search_song_ids(query, limit=50)
+    songs_by_id = Song.objects.select_related('category').in_bulk(song_ids)
+    songs = [songs_by_id[song_id] for song_id in song_ids if song_id in songs_by_id]
     # songs = Song.objects.filter(
     #     Q(title__icontains=query) |
     #     Q(artist__name__icontains=query) |
@@ -121,6 +134,59 @@ def search_songs(request):
         'count': len(serializer.data)
     })
 
+# kind: (model, file field, owner lookup or None for public media)
+MEDIA_SOURCES = {
+    'song-audio': (Song, 'audio_file', None),
+    'video': (Video, 'video_file', None),
+    'generated-audio': (GeneratedSongsData, 'audio_file', 'generated_song__user'),
+    'generated-video': (GeneratedVideo, 'video_file', 'user'),
+}
+
+@api_view(['GET', 'HEAD'])
+@permission_classes([permissions.AllowAny])
+def stream_media(request, kind, pk):
+    """
+    Stream song audio or video with Range (206), ETag/conditional GET and
+    X-Accel-Redirect / X-Sendfile offload, so seeking does not re-download.
+    """
+    if kind not in MEDIA_SOURCES:
+        return Response({'error': 'Unknown media type'}, status=status.HTTP_404_NOT_FOUND)
+    model, field, owner = MEDIA_SOURCES[kind]
+
+    queryset = model.objects.only('id', field)
+    if owner is None:
+        queryset = queryset.filter(is_active=True)
+    elif request.user.is_authenticated:
+        queryset = queryset.filter(**{owner: request.user})
+    else:
+        return Response({'error': 'Authentication required'}, status=status.HTTP_401_UNAUTHORIZED)
+
+    obj = queryset.filter(pk=pk).first()
+    field_file = getattr(obj, field, None)
+    if not field_file:
+        return Response({'error': 'Media not found'}, status=status.HTTP_404_NOT_FOUND)
+
+    try:
+        return serve_file(request, field_file)
+    except FileNotFoundError:
+        logger.error(f"[MEDIA] {kind} {pk} points to missing file {field_file.name}")
+        return Response({'error': 'Media not found'}, status=status.HTTP_404_NOT_FOUND)
+
+def playlist_queryset():
+    """
+    Playlists with their first songs prefetched for the preview.
+
+    songs_count is a stored counter, and the sliced Prefetch loads only the
+    first PLAYLIST_PREVIEW_SIZE entries per playlist in one extra query.
+    """
+    return Playlist.objects.select_related('user').prefetch_related(
+        Prefetch(
+            'playlistsong_set',
+            queryset=PlaylistSong.objects.select_related('song').order_by('order', 'created_at')[:PLAYLIST_PREVIEW_SIZE],
+            to_attr='preview_songs',
+        )
+    )
+
 class PlaylistListCreateView(generics.ListCreateAPIView):
     serializer_class = PlaylistSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -128,14 +194,7 @@ class PlaylistListCreateView(generics.ListCreateAPIView):
     def get_queryset(self):
         user = self.request.user
         # Show user's own playlists and public playlists
-        return Playlist.objects.filter(
-            Q(user=user) | Q(is_public=True)
-        ).select_related('user').prefetch_related(
-            Prefetch(
-                'playlistsong_set',
-                queryset=PlaylistSong.objects.select_related('song')
-            )
-        )
+        return playlist_queryset().filter(Q(user=user) | Q(is_public=True))
         
     def perform_create(self, serializer):
         # Automatically attach the logged-in user
@@ -148,20 +207,12 @@ class PlaylistDetailView(generics.RetrieveUpdateDestroyAPIView):
     
     def get_queryset(self):
         user = self.request.user
-        return Playlist.objects.filter(
-            Q(user=user) | Q(is_public=True)
-        ).select_related('user').prefetch_related(
-            Prefetch(
-                'playlistsong_set',
-                queryset=PlaylistSong.objects.select_related('song')
-            )
-        )
+        return playlist_queryset().filter(Q(user=user) | Q(is_public=True))
 
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def add_song_to_playlist(request, playlist_id):
     """Add a song to a playlist"""
-    from django.db import models
     try:
         playlist = Playlist.objects.get(id=playlist_id, user=request.user)
     except Playlist.DoesNotExist:
@@ -182,10 +233,7 @@ def add_song_to_playlist(request, playlist_id):
         
         # If no order specified, add to end
         if order is None:
-            max_order = PlaylistSong.objects.filter(playlist=playlist).aggregate(
-                max_order=models.Max('order')
-            )['max_order'] or 0
-            order = max_order + 1
+            order = next_order(playlist)
         
         PlaylistSong.objects.create(playlist=playlist, song=song, order=order)
         
@@ -205,6 +253,44 @@ def remove_song_from_playlist(request, playlist_id, song_id):
     except (Playlist.DoesNotExist, PlaylistSong.DoesNotExist):
         return Response({'error': 'Playlist or song not found'}, status=status.HTTP_404_NOT_FOUND)
 
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def bulk_update_playlist(request, playlist_id):
+    """
+    Add, remove and move many songs in one transaction.
+
+    Body: {"remove": [song_id, ...], "add": [song_id, ...],
+           "move": [{"song": song_id, "after": song_id or null}, ...]}
+    Added songs are appended in the given order; a move with "after": null
+    puts the song at the top.
+    """
+    serializer = PlaylistBulkSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    data = serializer.validated_data
+
+    try:
+        with transaction.atomic(), suspend_songs_count():
+            # Row lock serializes concurrent batches on the same playlist
+            playlist = Playlist.objects.select_for_update().get(id=playlist_id, user=request.user)
+            removed = remove_songs(playlist, data['remove']) if data['remove'] else 0
+            added = add_songs(playlist, data['add']) if data['add'] else []
+            for move in data['move']:
+                move_song(playlist, move['song'], after=move['after'])
+            songs_count = playlist.refresh_songs_count()
+    except Playlist.DoesNotExist:
+        return Response({'error': 'Playlist not found'}, status=status.HTTP_404_NOT_FOUND)
+    except PlaylistSong.DoesNotExist:
+        return Response({'error': 'Moved song is not in the playlist'}, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response({
+        'added': len(added),
+        'skipped': len(set(data['add'])) - len(added),
+        'removed': removed,
+        'moved': len(data['move']),
+        'songs_count': songs_count,
+    })
+
 # class SongRequestListCreateView(generics.ListCreateAPIView):
 #     serializer_class = SongRequestSerializer
 #     permission_classes = [permissions.IsAuthenticated]
@@ -222,27 +308,26 @@ def remove_song_from_playlist(request, playlist_id, song_id):
 class FavoriteListCreateView(generics.ListCreateAPIView):
     serializer_class = FavoriteSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-created_at', '-id')
     
     def get_queryset(self):
         return Favorite.objects.filter(user=self.request.user).select_related('song')
     
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
-        return super().perform_create(serializer)
+        favorites.forget_favorites(self.request.user)
 
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def toggle_favorite(request, song_id):
     """Toggle favorite status for a song"""
     try:
-        song = Song.objects.get(id=song_id, is_active=True)
+        is_favorited = favorites.toggle_favorite(request.user, song_id)
     except Song.DoesNotExist:
         return Response({'error': 'Song not found'}, status=status.HTTP_404_NOT_FOUND)
     
-    favorite, created = Favorite.objects.get_or_create(user=request.user, song=song)
-    
-    if not created:
-        favorite.delete()
+    if not is_favorited:
         return Response({'message': 'Song removed from favorites', 'is_favorited': False})
     else:
         return Response({'message': 'Song added to favorites', 'is_favorited': True})
@@ -254,13 +339,22 @@ class FavoriteDetailView(generics.RetrieveUpdateDestroyAPIView):
     def get_queryset(self):
         return Favorite.objects.filter(user=self.request.user)
 
+    def perform_update(self, serializer):
+        serializer.save()
+        favorites.forget_favorites(self.request.user)
+
+    def perform_destroy(self, instance):
+        instance.delete()
+        favorites.forget_favorites(self.request.user)
+
 class GeneratedSongsListView(generics.ListAPIView):
     serializer_class = GeneratedSongsSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-created_at', '-id')
     
     def get_queryset(self):
-        generated_song = GeneratedSongs.objects.filter(user=self.request.user)
-        return generated_song.order_by('-created_at')
+        return GeneratedSongs.objects.filter(user=self.request.user)
 
 class GeneratedSongsDetailView(APIView):
     serializer_class = GeneratedSongsDataSerializer
@@ -291,11 +385,13 @@ class GeneratedSongsDetailView(APIView):
     
 
 
-class GeneratedSongsCreateView(generics.CreateAPIView):
+class GeneratedSongsCreateView(AsyncAPIView):
     serializer_class = GeneratedSongsSerializer
     permission_classes = [permissions.IsAuthenticated]
+    throttle_classes = [SongGenerationThrottle]
 
-    def create(self, request, *args, **kwargs):
+    @with_async_clients
+    async def post(self, request, *args, **kwargs):
         title = request.data.get('title', None)
         lyrics = request.data.get('lyrics', '')
         bible_verse = request.data.get('bible_verse', '')
@@ -306,33 +402,34 @@ class GeneratedSongsCreateView(generics.CreateAPIView):
             # Call external music generation utility
             prompt = f"Generate a short song title for: {bible_verse}"
             if title is None:
-                res = model_generator(prompt)
+                res = await amodel_generator(prompt)
                 # Split by number followed by a dot and space
                 parts = re.findall(r'"(.*?)"', res)
                 if len(parts) >= 2:
                     title = parts[1]
                 else:
                     title = parts[0]
-            response = generate_song(title=title, bible_verse=bible_verse, genre=genre, mood=mood)
+            response = await agenerate_song(title=title, bible_verse=bible_verse, genre=genre, mood=mood)
             if response.get('code') != 200:
                 raise Exception(f"[SUNO] Music generation failed with code {response.get('code')}: {response.get('msg')}")
           
             task_id = response.get('data').get('taskId')
-            serializer = self.get_serializer(data=request.data)
+            serializer = self.serializer_class(data=request.data)
             serializer.is_valid(raise_exception=True)
             # Pass user and other fields into serializer.save()
-            serializer.save(
+            await sync_to_async(serializer.save)(
                 user=request.user,
                 title=title,
                 status='processing',
                 task_id=task_id
             )
 
-            headers = self.get_success_headers(serializer.data)
-            return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
 
         except Exception as e:
             logger.error(f"Error generating song: {e}")
+            # Nothing was generated; give the request its daily quota back
+            await sync_to_async(reconcile_quota)(request, 'song')
             return Response(
                 {'error': f'Failed to initiate music generation {e}'},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -373,10 +470,11 @@ def update_generated_song_status(task_id, status, data_id=None, duration=None, p
 
 
 @csrf_exempt
-@api_view(["POST"])
+@async_api_view(["POST"])
 @permission_classes([permissions.AllowAny])
-def handle_callback(request):
-    from django.core.files.base import ContentFile
+@with_async_clients
+async def handle_callback(request):
+    from django.core.files.base import ContentFile, File
     from datetime import timedelta
     try:
         data = request.data
@@ -417,7 +515,7 @@ def handle_callback(request):
                 if audio_url:
                     try:
                         # Download the audio file
-                        resp = requests.get(audio_url, timeout=30)
+                        resp = await get_async_client('suno').get(audio_url, timeout=30)
                         resp.raise_for_status()
 
                         # Sanitize filename
@@ -427,7 +525,7 @@ def handle_callback(request):
                         logger.info(f"Audio saved: {filename}")
 
                         # Update DB
-                        update_generated_song_status(
+                        await sync_to_async(update_generated_song_status)(
                             task_id=task_id,
                             status="completed",
                             data_id=data_id,
@@ -442,7 +540,7 @@ def handle_callback(request):
         # ---- FAILURE -------------------------------------------------------
         else:
             logger.warning(f"Suno generation failed: code={code}, msg={msg}")
-            update_generated_song_status(task_id, status="failed")
+            await sync_to_async(update_generated_song_status)(task_id, status="failed")
 
         return Response({"message": "Callback processed successfully"})
 
@@ -455,70 +553,86 @@ def extract_json_from_response(response_text):
     """
     Extract JSON from LLM response that might contain markdown or extra text.
     """
-    if not response_text:
-        raise ValueError("Empty response text")
-    
-    # Remove all whitespace at beginning/end
-    response_text = response_text.strip()
-    
-    # Remove markdown code blocks and language specifiers
-    response_text = re.sub(r'```(?:json)?\s*', '', response_text)
-    response_text = re.sub(r'```\s*', '', response_text)
-    
-    # Try multiple strategies to extract JSON
-    
-    # Strategy 1: Find JSON object/array patterns
-    json_patterns = [
-        r'\{[\s\S]*\}',  # JSON object
-        r'\[[\s\S]*\]',  # JSON array
-    ]
-    
-    for pattern in json_patterns:
-        json_match = re.search(pattern, response_text, re.DOTALL)
-        if json_match:
-            json_str = json_match.group(0)
-            try:
-                # Clean up common issues
-                json_str = json_str.strip()
-                # Remove trailing commas before closing braces/brackets
-                json_str = re.sub(r',\s*([}\]])', r'\1', json_str)
-                return json.loads(json_str)
-            except json.JSONDecodeError as e:
-                print(f"JSON decode error with pattern {pattern}: {e}")
-                print(f"Problematic JSON string: {json_str[:200]}...")
-                continue
-    
-    # Strategy 2: Try parsing the entire response
+    return extract_json(response_text)
+
+
+def generate_video_scenes(script_prompt, bible_verse):
+    """
+    Generate the video script scenes, re-prompting once with a shorter,
+    tightly constrained request if the first response cannot be parsed.
+    """
+    script_raw = model_generator(script_prompt, max_tokens=500)
     try:
-        return json.loads(response_text)
-    except json.JSONDecodeError as e:
-        print(f"Could not parse as JSON: {e}")
-        print(f"Full response text: {response_text}")
-        raise ValueError(f"Could not extract valid JSON from response: {str(e)}")
+        return parse_scenes(script_raw)
+    except ValueError as e:
+        logger.warning(f"Video script parse failed, re-prompting: {e}")
+
+    retry_prompt = (
+        f'Return ONLY this JSON with 4 scenes for the Bible verse "{bible_verse}", '
+        'one short sentence per scene, speaker_type one of presenter, male, female, god, angel:\n'
+        '{"scenes":[{"speaker_type":"presenter","text":"...","duration_seconds":4}]}'
+    )
+    return parse_scenes(model_generator(retry_prompt, max_tokens=300, temperature=0.3))
+
+
+def update_generated_video(video_id, status, video_url=None, error_message=None):
+    video = GeneratedVideo.objects.filter(video_id=video_id).first()
+    if not video:
+        logger.error(f"GeneratedVideo with video_id {video_id} does not exist")
+        return
+
+    video.status = status
+    if video_url:
+        video.video_url = video_url
+    if error_message:
+        video.error_message = error_message
+    video.save()
+
+
+def download_generated_video(video, video_url, filename):
+    """
+    Stream a rendered video into video_file and mark it completed. The body
+    goes through a temporary file in chunks, never whole into memory.
+    """
+    with get_session('heygen').get(video_url, stream=True) as response:
+        response.raise_for_status()
+        with tempfile.TemporaryFile() as buffer:
+            for chunk in response.iter_content(chunk_size=1024 * 1024):
+                buffer.write(chunk)
+            buffer.seek(0)
+            video.video_file.save(filename, File(buffer), save=False)
+    video.video_url = video_url
+    video.status = 'completed'
+    video.save()
 
 
 @csrf_exempt
-@api_view(["POST"])
+@async_api_view(["POST"])
 @permission_classes([permissions.AllowAny])
-def handle_video_callback(request):
+@with_async_clients
+async def handle_video_callback(request):
     try:
-        data = request.json()
+        data = request.data
     
         event_type = data.get("event_type")
         video_data = data.get("event_data", {})
+        video_id = video_data.get("video_id")
         
-        if event_type == "video.completed":
-            video_url = video_data.get("video_url")
-            video_id = video_data.get("video_id")
-            print(f"✨ Video {video_id} is ready! URL: {video_url}")
-            response = requests.get(video_url, stream=True)
-            filename = f"video_{video_id}.mp4"
-            video = GeneratedVideo.objects.get(video_id=video_id)
-            video.video_file = ContentFile(response.iter_content(chunk_size=8192), filename)
-            video.save()
+        if event_type in ("avatar_video.success", "video.completed"):
+            video_url = video_data.get("url") or video_data.get("video_url")
+            logger.info(f"[HEYGEN CALLBACK] video {video_id} is ready: {video_url}")
+            # Answer the webhook right away; process_task downloads the file
+            await sync_to_async(update_generated_video)(video_id, "processing", video_url=video_url)
+
+        elif event_type == "avatar_video.fail":
+            logger.warning(f"[HEYGEN CALLBACK] video {video_id} failed: {video_data.get('msg')}")
+            await sync_to_async(update_generated_video)(video_id, "failed", error_message=video_data.get("msg"))
+
+        return Response({"message": "Callback processed successfully"})
 
     except Exception as e:
         logger.error(f"Video callback error: {e}")
+        return Response({"error": "Internal server error"}, status=500)
 
 def generate_video_task(video_id, title, bible_verse, video_style, length_seconds):
     try:
@@ -560,19 +674,10 @@ def generate_video_task(video_id, title, bible_verse, video_style, length_second
             {{"scenes":[{{"speaker_type":"presenter","text":"Welcome to our inspirational message.","duration_seconds":4}}]}}
             """
 
-        script_raw = model_generator(script_prompt, max_tokens=500)
-        script = extract_json_from_response(script_raw)
-        scenes = script["scenes"]
+        scenes = generate_video_scenes(script_prompt, bible_verse)
 
-        voices = client.get_voices_list()
-        avatars = client.get_avatars_list()
+        catalog.assign_scenes(scenes)
 
-        for scene in scenes:
-            speaker_type = scene.get("speaker_type", "presenter")
-            scene["voice_id"] = select_voice_for_scene(speaker_type, voices)
-            scene["avatar_id"] = select_avatar_for_scene(speaker_type, avatars)
-            
-        client.api_callback_register()
         response = client.create_multi_scene_video(
             title=title,
             scenes=scenes
@@ -590,11 +695,13 @@ def generate_video_task(video_id, title, bible_verse, video_style, length_second
         logger.error(f"Video background error: {e}")
         GeneratedVideo.objects.filter(id=video_id).update(status="failed")
 
-class GeneratedVideoCreateView(generics.CreateAPIView):
+class GeneratedVideoCreateView(AsyncAPIView):
     serializer_class = GeneratedVideoSerializer
     permission_classes = [permissions.IsAuthenticated]
+    throttle_classes = [VideoGenerationThrottle]
 
-    def create(self, request, *args, **kwargs):
+    @with_async_clients
+    async def post(self, request, *args, **kwargs):
         title = request.data.get('title')
         bible_verse = request.data.get('bible_verse', '')
         video_style = request.data.get('video_style', 'inspirational')
@@ -602,14 +709,25 @@ class GeneratedVideoCreateView(generics.CreateAPIView):
 
         length_seconds = min(int(length) * 60, 180) if str(length).isdigit() else 180
 
-        serializer = self.get_serializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
+        serializer = self.serializer_class(data=request.data)
+        if not serializer.is_valid():
+            # Nothing will be generated; give the request its daily quota back
+            await sync_to_async(reconcile_quota)(request, 'video')
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-        video = serializer.save(
-            user=request.user,
-            title=title,
-            status="queued"
-        )
+        try:
+            video = await sync_to_async(serializer.save)(
+                user=request.user,
+                title=title,
+                status="queued"
+            )
+        except Exception as e:
+            logger.error(f"Error queueing video: {e}")
+            await sync_to_async(reconcile_quota)(request, 'video')
+            return Response(
+                {'error': 'Failed to queue video generation'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
 
         return Response(
             {
@@ -638,13 +756,14 @@ class GeneratedVideoDetailView(generics.RetrieveAPIView):
 
 
 
-@api_view(['GET'])
-def get_video_status_view(request):
+@async_api_view(['GET'])
+@with_async_clients
+async def get_video_status_view(request):
     try:
         video_id = request.GET.get('video_id')
         if not video_id:
             return Response({'error': 'video_id parameter is required'}, status=status.HTTP_400_BAD_REQUEST)
-        video_status = client.get_video_status(video_id)
+        video_status = await client.aget_video_status(video_id)
         return Response(video_status, status=status.HTTP_200_OK)
     except Exception as e:
         logger.error(f"Error fetching video status: {e}")
@@ -25,7 +25,7 @@ class UserAdmin(BaseUserAdmin):
 
 @admin.register(OTP)
 class OTPAdmin(admin.ModelAdmin):
-    list_display = ('user', 'otp_code', 'otp_type', 'is_used', 'created_at', 'expires_at')
+    list_display = ('user', 'otp_code', 'otp_type', 'is_used', 'attempts', 'created_at', 'expires_at')
     list_filter = ('otp_type', 'is_used', 'created_at')
     search_fields = ('user__email', 'otp_code')
     readonly_fields = ('created_at', 'expires_at')
@@ -0,0 +1,78 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import F
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from core.caching import TieredCache
+from .tokens import TOKEN_VERSION_CLAIM, RefreshToken
+
+user_cache = TieredCache('auth_users', local_ttl=settings.AUTH_USER_LOCAL_CACHE_SECONDS)
+
+
+def _cache_key(user_id, version):
+    return f'{user_id}:{version}'
+
+
+def tokens_for_user(user):
+    """
+    Issue a refresh/access pair carrying the user's current token version.
+    """
+    refresh = RefreshToken.for_user(user)
+    refresh[TOKEN_VERSION_CLAIM] = user.token_version
+    return refresh
+
+
+def forget_user(user):
+    """
+    Drop the cached copy of a user, e.g. after a profile change.
+    """
+    user_cache.delete(_cache_key(user.pk, user.token_version))
+
+
+def revoke_tokens(user):
+    """
+    Bump the user's token version so every token issued before is rejected.
+    """
+    # Bump first, then drop the previous version's entry: a request racing in
+    # between can only re-cache that entry from a row that already rejects it
+    get_user_model().objects.filter(pk=user.pk).update(token_version=F('token_version') + 1)
+    user.refresh_from_db(fields=['token_version'])
+    user_cache.delete(_cache_key(user.pk, user.token_version - 1))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that resolves the user from cache instead of the database.
+
+    Users are cached per process for a few seconds and in the shared cache for
+    AUTH_USER_CACHE_SECONDS, keyed by id and token version. Saving the user
+    drops the cached copy; password changes bump the version, which revokes
+    older tokens. A database query is only made on a cache miss.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+        version = validated_token.get(TOKEN_VERSION_CLAIM, 0)
+        return user_cache.get_or_set(
+            _cache_key(user_id, version),
+            lambda: self._load_user(user_id, version),
+            settings.AUTH_USER_CACHE_SECONDS,
+        )
+
+    def _load_user(self, user_id, version):
+        try:
+            user = self.user_model.objects.get(**{api_settings.USER_ID_FIELD: user_id})
+        except self.user_model.DoesNotExist:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if user.token_version != version:
+            raise AuthenticationFailed(_("Token has been revoked"), code="token_revoked")
+        return user
@@ -1,10 +1,9 @@
 from django.core.management.base import BaseCommand
-from django.core.files.base import ContentFile
 from django.utils import timezone
 from songs.models import GeneratedVideo
-from songs.views import generate_video_task, client
+from songs.views import download_generated_video, generate_video_task, client
+from core.webhooks import ensure_heygen_webhook
 import traceback
-import requests
 import re
 import os
 
@@ -32,6 +31,14 @@ class Command(BaseCommand):
             return
 
         for video in  videos:
+            safe_title = re.sub(r'[^a-zA-Z0-9_\- ]', "", video.title or "")
+            filename = f"heygen_{video.video_id}_{safe_title}.mp4"
+
+            # The webhook already recorded where the rendered video is
+            if video.video_url:
+                self.download(video, video.video_url, filename)
+                continue
+
             if video.video_id:
                 video_status = client.get_video_status(video.video_id)
                 
@@ -40,23 +47,28 @@ class Command(BaseCommand):
                 
                 # Video statuses: pending, processing, completed, failed
                 if status == "completed":
-                    safe_title = re.sub(r'[^a-zA-Z0-9_\- ]', "", video.title)
-                    filename = f"heygen_{video.video_id}_{safe_title}.mp4"
-                    video_url = data.get("video_url")
-                    response = requests.get(video_url, stream=True)
-                    video.video_file = ContentFile(response.iter_content(chunk_size=8192), filename)
-                    video.status = status
-                    video.save()
+                    self.download(video, data.get("video_url"), filename)
                 
                 if status == "failed":
                     video.status = status 
                     video.save()
-            
-                    
+
+    def download(self, video, video_url, filename):
+        try:
+            download_generated_video(video, video_url, filename)
+            self.log(f"✅ Downloaded video ID={video.id}")
+        except Exception as e:
+            # Left in processing, so the next run retries
+            self.log(f"❌ Download failed for video ID={video.id}: {str(e)}")
                 
     def handle(self, *args, **kwargs):
         self.log("🔥 CRON STARTED")
 
+        try:
+            ensure_heygen_webhook(client)
+        except Exception as e:
+            self.log(f"⚠️ HeyGen webhook check failed: {str(e)}")
+
         videos = GeneratedVideo.objects.filter(status="queued")[:5]
 
         if not videos:
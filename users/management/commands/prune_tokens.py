@@ -0,0 +1,21 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from users.tokens import build_blacklist_filter, prune_expired_tokens
+
+
+class Command(BaseCommand):
+    help = 'Delete expired refresh tokens and rebuild the blacklist filter; run periodically from cron'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep-hours', type=int, default=0, help='Keep tokens that expired less than this many hours ago')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Tokens deleted per query')
+
+    def handle(self, *args, **options):
+        deleted = prune_expired_tokens(
+            older_than=timedelta(hours=options['keep_hours']),
+            batch_size=options['batch_size'],
+        )
+        blacklisted = build_blacklist_filter()
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} expired tokens; {blacklisted} tokens in the blacklist filter'))
@@ -0,0 +1,16 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from users.otp import purge_expired
+
+
+class Command(BaseCommand):
+    help = 'Delete used and expired OTPs (database OTP backend); run periodically from cron'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep-hours', type=int, default=0, help='Keep rows newer than this many hours for auditing')
+
+    def handle(self, *args, **options):
+        deleted = purge_expired(older_than=timedelta(hours=options['keep_hours']))
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} OTPs'))
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 from django.utils import timezone
@@ -12,17 +13,30 @@ class User(AbstractUser):
     last_name = models.CharField(max_length=150)
     phone_number = models.CharField(max_length=20, blank=True, null=True)
     profile_picture = models.ImageField(upload_to='profile_pics/', blank=True, null=True)
+    profile_picture_variants = models.JSONField(default=dict, blank=True, editable=False)  # Resized copies, see core.images
     is_email_verified = models.BooleanField(default=True)
     date_of_birth = models.DateField(blank=True, null=True)
+    token_version = models.PositiveIntegerField(default=0, editable=False)  # Bumped to revoke issued JWTs
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'first_name', 'last_name']
+    # Only written with queryset updates (revoke_tokens, core.images), so saving
+    # a stale copy such as the cached request.user never reverts them
+    UPDATE_MANAGED_FIELDS = ('token_version', 'profile_picture_variants')
 
     def __str__(self):
         return self.email
 
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.UPDATE_MANAGED_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
     @property
     def full_name(self):
         return f"{self.first_name} {self.last_name}"
@@ -38,6 +52,7 @@ class OTP(models.Model):
     otp_code = models.CharField(max_length=6)
     otp_type = models.CharField(max_length=20, choices=OTP_TYPES)
     is_used = models.BooleanField(default=False)
+    attempts = models.PositiveSmallIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     expires_at = models.DateTimeField()
 
@@ -48,7 +63,7 @@ class OTP(models.Model):
         if not self.otp_code:
             self.otp_code = self.generate_otp()
         if not self.expires_at:
-            self.expires_at = timezone.now() + timezone.timedelta(minutes=10)
+            self.expires_at = timezone.now() + timezone.timedelta(minutes=settings.OTP_EXPIRY_MINUTES)
         super().save(*args, **kwargs)
 
     @staticmethod
@@ -60,6 +75,10 @@ class OTP(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'otp_type', 'is_used', 'created_at']),
+            models.Index(fields=['expires_at']),
+        ]
         
 
 
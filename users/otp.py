@@ -0,0 +1,138 @@
+import secrets
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare, salted_hmac
+
+# verify() results
+VERIFIED = 'verified'
+INVALID = 'invalid'
+EXPIRED = 'expired'
+LOCKED = 'locked'
+
+OTP_LENGTH = 6
+
+
+def generate_code():
+    return ''.join(secrets.choice('0123456789') for _ in range(OTP_LENGTH))
+
+
+def _expiry():
+    return timedelta(minutes=settings.OTP_EXPIRY_MINUTES)
+
+
+class CacheOTPBackend:
+    """
+    OTPs kept in the cache: one key per (user, type) holding a hash of the
+    code, expired by the cache's own TTL, plus an atomic attempt counter.
+    Issuing a new code simply overwrites the old one.
+    """
+
+    def _key(self, user, otp_type):
+        return f'otp:{otp_type}:{user.pk}'
+
+    def _hash(self, user, otp_type, code):
+        return salted_hmac('users.otp', f'{user.pk}:{otp_type}:{code}').hexdigest()
+
+    def issue(self, user, otp_type):
+        code = generate_code()
+        key = self._key(user, otp_type)
+        timeout = int(_expiry().total_seconds())
+        cache.set_many({key: self._hash(user, otp_type, code), f'{key}:attempts': 0}, timeout)
+        return code
+
+    def verify(self, user, otp_type, code):
+        key = self._key(user, otp_type)
+        expected = cache.get(key)
+        if expected is None:
+            return EXPIRED
+
+        if constant_time_compare(expected, self._hash(user, otp_type, code)):
+            cache.delete_many([key, f'{key}:attempts'])
+            return VERIFIED
+
+        try:
+            attempts = cache.incr(f'{key}:attempts')
+        except ValueError:
+            attempts = settings.OTP_MAX_ATTEMPTS
+        if attempts >= settings.OTP_MAX_ATTEMPTS:
+            cache.delete_many([key, f'{key}:attempts'])
+            return LOCKED
+        return INVALID
+
+
+class DatabaseOTPBackend:
+    """
+    OTPs stored as users.OTP rows. Lookups use the (user, otp_type, is_used,
+    created_at) index and only the latest unused code is checked; old rows
+    are removed by the purge_otps command.
+    """
+
+    def issue(self, user, otp_type):
+        from .models import OTP
+
+        OTP.objects.filter(user=user, otp_type=otp_type, is_used=False).update(is_used=True)
+        otp = OTP.objects.create(user=user, otp_type=otp_type, expires_at=timezone.now() + _expiry())
+        return otp.otp_code
+
+    def verify(self, user, otp_type, code):
+        from .models import OTP
+
+        otp = (
+            OTP.objects
+            .filter(user=user, otp_type=otp_type, is_used=False)
+            .order_by('-created_at')
+            .first()
+        )
+        if otp is None or not otp.is_valid():
+            return EXPIRED
+
+        if constant_time_compare(otp.otp_code, code):
+            OTP.objects.filter(pk=otp.pk).update(is_used=True)
+            return VERIFIED
+
+        otp.attempts += 1
+        if otp.attempts >= settings.OTP_MAX_ATTEMPTS:
+            OTP.objects.filter(pk=otp.pk).update(attempts=F('attempts') + 1, is_used=True)
+            return LOCKED
+        OTP.objects.filter(pk=otp.pk).update(attempts=F('attempts') + 1)
+        return INVALID
+
+
+_backends = {
+    'cache': CacheOTPBackend(),
+    'db': DatabaseOTPBackend(),
+}
+
+
+def get_backend():
+    return _backends[settings.OTP_BACKEND]
+
+
+def issue_otp(user, otp_type):
+    """
+    Create a new code for the user, replacing any earlier one of that type.
+    """
+    return get_backend().issue(user, otp_type)
+
+
+def verify_otp(user, otp_type, code):
+    """
+    Check and consume a code. Returns VERIFIED, INVALID, EXPIRED or LOCKED
+    (too many wrong attempts, a new code must be requested).
+    """
+    return get_backend().verify(user, otp_type, code)
+
+
+def purge_expired(older_than=None):
+    """
+    Delete used and expired OTP rows. Returns the number deleted.
+    """
+    from .models import OTP
+
+    cutoff = timezone.now() - (older_than or timedelta())
+    deleted, _ = OTP.objects.filter(Q(expires_at__lt=cutoff) | Q(is_used=True, created_at__lt=cutoff)).delete()
+    return deleted
@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from django.contrib.auth import authenticate
 from django.contrib.auth.password_validation import validate_password
+from core.images import variant_urls
 from .models import User, OTP
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
@@ -69,14 +70,19 @@ class ResetPasswordSerializer(serializers.Serializer):
 
 class UserProfileSerializer(serializers.ModelSerializer):
     full_name = serializers.ReadOnlyField()
+    profile_picture_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = User
         fields = ('id', 'email', 'username', 'first_name', 'last_name', 'full_name', 
-                 'phone_number', 'profile_picture', 'date_of_birth', 'is_email_verified',
-                 'created_at', 'updated_at')
+                 'phone_number', 'profile_picture', 'profile_picture_variants', 'date_of_birth',
+                 'is_email_verified', 'created_at', 'updated_at')
         read_only_fields = ('id', 'email', 'is_email_verified', 'created_at', 'updated_at')
 
+    def get_profile_picture_variants(self, obj):
+        # Empty until the image pipeline has processed the upload
+        return variant_urls(obj.profile_picture_variants)
+
 
 class ChangePasswordSerializer(serializers.Serializer):
     old_password = serializers.CharField(write_only=True)
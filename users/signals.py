@@ -0,0 +1,21 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.images import register_image_field
+
+from .authentication import forget_user
+from .models import User, UserPlan
+from .throttling import forget_plan
+
+# Cached users must pick up the new variants
+register_image_field(User, 'profile_picture', on_processed=forget_user)
+
+
+@receiver([post_save, post_delete], sender=User)
+def clear_cached_user(sender, instance, **kwargs):
+    forget_user(instance)
+
+
+@receiver([post_save, post_delete], sender=UserPlan)
+def clear_cached_plan(sender, instance, **kwargs):
+    forget_plan(instance.user_id)
@@ -1,3 +1,228 @@
-from django.test import TestCase
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
 
-# Create your tests here.
+from . import otp, tokens
+from .authentication import revoke_tokens, tokens_for_user
+from .models import User
+from .throttling import SermonGenerationThrottle, reconcile_quota
+
+
+class UserTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email='ann@example.com', username='ann', password='old-password-1', first_name='Ann', last_name='Lee',
+        )
+
+    def auth(self, user=None):
+        return {'HTTP_AUTHORIZATION': f'Bearer {tokens_for_user(user or self.user).access_token}'}
+
+
+class StaleUserSaveTests(UserTestCase):
+    def test_save_keeps_update_managed_fields(self):
+        stale = User.objects.get(pk=self.user.pk)
+        revoke_tokens(self.user)
+        User.objects.filter(pk=self.user.pk).update(profile_picture_variants={'source': 'x.jpg'})
+
+        stale.first_name = 'Anne'
+        stale.save()
+
+        fresh = User.objects.get(pk=self.user.pk)
+        self.assertEqual(fresh.first_name, 'Anne')
+        self.assertEqual(fresh.token_version, 1)
+        self.assertEqual(fresh.profile_picture_variants, {'source': 'x.jpg'})
+
+    def test_profile_update_starts_from_current_row(self):
+        headers = self.auth()
+        self.client.get('/api/v1/users/profile/', **headers)  # caches the user
+        User.objects.filter(pk=self.user.pk).update(last_name='Changed')
+
+        response = self.client.patch('/api/v1/users/profile/', {'first_name': 'Anne'},
+                                     content_type='application/json', **headers)
+
+        self.assertEqual(response.status_code, 200)
+        fresh = User.objects.get(pk=self.user.pk)
+        self.assertEqual((fresh.first_name, fresh.last_name), ('Anne', 'Changed'))
+
+    def test_revoke_racing_a_request_leaves_no_usable_cache_entry(self):
+        headers = self.auth()
+        raced = []
+
+        def request_during_update(execute, sql, params, many, context):
+            # Another request authenticates right before the version is bumped
+            if sql.startswith('UPDATE') and 'token_version' in sql and not raced:
+                raced.append(self.client.get('/api/v1/users/profile/', **headers).status_code)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(request_during_update):
+            revoke_tokens(self.user)
+
+        self.assertEqual(raced, [200])
+        self.assertEqual(self.client.get('/api/v1/users/profile/', **headers).status_code, 401)
+
+    def test_change_password_does_not_revert_other_columns(self):
+        headers = self.auth()
+        self.client.get('/api/v1/users/profile/', **headers)
+        User.objects.filter(pk=self.user.pk).update(last_name='Changed')
+
+        response = self.client.post('/api/v1/users/change-password/', {
+            'old_password': 'old-password-1', 'new_password': 'new-password-2', 'confirm_password': 'new-password-2',
+        }, content_type='application/json', **headers)
+
+        self.assertEqual(response.status_code, 200, response.content)
+        fresh = User.objects.get(pk=self.user.pk)
+        self.assertTrue(fresh.check_password('new-password-2'))
+        self.assertEqual(fresh.last_name, 'Changed')
+        self.assertEqual(fresh.token_version, 1)
+
+
+class BlacklistTests(UserTestCase):
+    def setUp(self):
+        super().setUp()
+        tokens._state.update({'filter': None, 'version': None, 'position': None, 'checked_at': 0.0})
+
+    def blacklist(self, refresh=None):
+        refresh = refresh or tokens_for_user(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            tokens.blacklist_token(refresh)
+        return refresh['jti']
+
+    def test_bloom_filter_has_no_false_negatives(self):
+        bloom = tokens.BloomFilter(100)
+        values = [f'jti-{i}' for i in range(100)]
+        for value in values:
+            bloom.add(value)
+
+        self.assertTrue(all(value in bloom for value in values))
+        copy = tokens.BloomFilter(1, bits=bytes(bloom.bits), hashes=bloom.hashes)
+        self.assertTrue(all(value in copy for value in values))
+        self.assertLess(sum(f'other-{i}' in bloom for i in range(1000)), 20)
+
+    def test_unseen_token_skips_database_before_and_after_rotations(self):
+        self.blacklist()
+        tokens.build_blacklist_filter()
+        jti = tokens_for_user(self.user)['jti']
+
+        with self.assertNumQueries(0):
+            self.assertFalse(tokens.is_blacklisted(jti))
+        self.blacklist()
+        self.blacklist()
+        with self.assertNumQueries(0):
+            self.assertFalse(tokens.is_blacklisted(jti))
+
+    def test_token_blacklisted_after_the_build_is_seen_by_other_workers(self):
+        tokens.build_blacklist_filter()
+        jti = self.blacklist()
+        tokens._state['filter'] = tokens.BloomFilter(1)  # another worker's copy
+
+        with self.assertNumQueries(0):
+            self.assertTrue(tokens.is_blacklisted(jti))
+
+    def test_evicted_log_falls_back_to_the_database(self):
+        tokens.build_blacklist_filter()
+        jti = self.blacklist()
+        tokens._state['filter'] = tokens.BloomFilter(1)
+        tokens._delta['version'] = None
+        cache.delete(tokens._log_key(cache.get(tokens.LOG_COUNT_CACHE_KEY)))
+
+        self.assertTrue(tokens.is_blacklisted(jti))
+        cache.delete(tokens.LOG_COUNT_CACHE_KEY)
+        self.assertTrue(tokens.is_blacklisted(jti))
+
+    def test_refresh_rotates_and_rejects_the_old_token(self):
+        refresh = str(tokens_for_user(self.user))
+
+        first = self.client.post('/api/v1/users/token/refresh/', {'refresh': refresh}, content_type='application/json')
+        second = self.client.post('/api/v1/users/token/refresh/', {'refresh': refresh}, content_type='application/json')
+
+        self.assertEqual(first.status_code, 200)
+        self.assertIn('refresh', first.json())
+        self.assertEqual(second.status_code, 401)
+
+    def test_refresh_rejects_stale_token_version(self):
+        refresh = str(tokens_for_user(self.user))
+        revoke_tokens(self.user)
+
+        response = self.client.post('/api/v1/users/token/refresh/', {'refresh': refresh}, content_type='application/json')
+
+        self.assertEqual(response.status_code, 401)
+
+
+@override_settings(GENERATION_QUOTAS={'free': {'sermon': {'rate': '10/min', 'daily': 1}}})
+class GenerationThrottleTests(UserTestCase):
+    def request(self):
+        request = Request(APIRequestFactory().post('/api/v1/bible/sermons/'))
+        request.user = self.user
+        return request
+
+    def allow(self, request=None):
+        return SermonGenerationThrottle().allow_request(request or self.request(), None)
+
+    @override_settings(GENERATION_QUOTAS={'free': {'sermon': {'rate': '2/min', 'daily': 1}}})
+    def test_daily_rejection_does_not_use_up_the_rate_window(self):
+        self.assertTrue(self.allow())
+        throttle = SermonGenerationThrottle()
+        self.assertFalse(throttle.allow_request(self.request(), None))
+        self.assertIsNotNone(throttle.wait())
+
+        with override_settings(GENERATION_QUOTAS={'free': {'sermon': {'rate': '2/min', 'daily': 5}}}):
+            self.assertTrue(self.allow())
+            self.assertFalse(self.allow())
+
+    def test_reconcile_gives_back_only_the_requests_own_quota(self):
+        request = self.request()
+        self.assertTrue(self.allow(request))
+        self.assertFalse(self.allow())
+
+        reconcile_quota(request, 'sermon')
+        reconcile_quota(request, 'sermon')
+
+        self.assertTrue(self.allow())
+        self.assertFalse(self.allow())
+
+
+class OTPBackendTests(UserTestCase):
+    def check_attempts(self):
+        code = otp.issue_otp(self.user, 'password_reset')
+        wrong = '000000' if code != '000000' else '111111'
+
+        for _ in range(4):
+            self.assertEqual(otp.verify_otp(self.user, 'password_reset', wrong), otp.INVALID)
+        self.assertEqual(otp.verify_otp(self.user, 'password_reset', wrong), otp.LOCKED)
+        self.assertEqual(otp.verify_otp(self.user, 'password_reset', code), otp.EXPIRED)
+
+    def check_single_use(self):
+        old = otp.issue_otp(self.user, 'email_verification')
+        code = otp.issue_otp(self.user, 'email_verification')
+
+        if old != code:
+            self.assertEqual(otp.verify_otp(self.user, 'email_verification', old), otp.INVALID)
+        self.assertEqual(otp.verify_otp(self.user, 'email_verification', code), otp.VERIFIED)
+        self.assertEqual(otp.verify_otp(self.user, 'email_verification', code), otp.EXPIRED)
+
+    @override_settings(OTP_BACKEND='cache', OTP_MAX_ATTEMPTS=5)
+    def test_cache_backend_stores_only_a_hash(self):
+        code = otp.issue_otp(self.user, 'email_verification')
+
+        stored = cache.get(f'otp:email_verification:{self.user.pk}')
+        self.assertNotIn(code, stored)
+        self.assertEqual(otp.verify_otp(self.user, 'email_verification', code), otp.VERIFIED)
+
+    @override_settings(OTP_BACKEND='cache', OTP_MAX_ATTEMPTS=5)
+    def test_cache_backend_locks_after_max_attempts(self):
+        self.check_attempts()
+
+    @override_settings(OTP_BACKEND='cache')
+    def test_cache_backend_codes_are_single_use(self):
+        self.check_single_use()
+
+    @override_settings(OTP_BACKEND='db', OTP_MAX_ATTEMPTS=5)
+    def test_db_backend_locks_after_max_attempts(self):
+        self.check_attempts()
+
+    @override_settings(OTP_BACKEND='db')
+    def test_db_backend_codes_are_single_use(self):
+        self.check_single_use()
@@ -0,0 +1,207 @@
+import time
+from datetime import datetime, timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework.throttling import BaseThrottle
+
+from core.caching import TieredCache
+
+DEFAULT_PLAN = 'free'
+# Plan used for requests without a logged-in user
+ANONYMOUS_PLAN = 'anonymous'
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+# Where each scope's generations are stored, used to rebuild daily counters
+QUOTA_SOURCES = {
+    'song': ('songs.GeneratedSongs', 'user'),
+    'video': ('songs.GeneratedVideo', 'user'),
+    'sermon': ('bible.Sermon', 'author'),
+}
+
+
+def parse_rate(rate):
+    """
+    '5/min' -> (5, 60)
+    """
+    count, period = rate.split('/')
+    return int(count), PERIODS[period[0]]
+
+
+plan_cache = TieredCache('user_plans')
+
+
+def _load_plan_name(user_id):
+    from .models import UserPlan
+
+    user_plan = UserPlan.objects.filter(user_id=user_id).values('plan_type__name', 'end_date').first()
+    if not user_plan or not user_plan['plan_type__name']:
+        return DEFAULT_PLAN
+    if user_plan['end_date'] is not None and user_plan['end_date'] <= timezone.now():
+        return DEFAULT_PLAN
+    return user_plan['plan_type__name']
+
+
+def get_plan_name(user):
+    """
+    Name of the user's active plan, cached for USER_PLAN_CACHE_SECONDS.
+    Users without a plan, or whose plan ended, are on the free plan.
+    """
+    if not user or not user.is_authenticated:
+        return ANONYMOUS_PLAN
+
+    return plan_cache.get_or_set(str(user.pk), lambda: _load_plan_name(user.pk), settings.USER_PLAN_CACHE_SECONDS)
+
+
+def forget_plan(user_id):
+    plan_cache.delete(str(user_id))
+
+
+def get_limits(plan, scope):
+    quotas = settings.GENERATION_QUOTAS
+    return quotas.get(plan, quotas[DEFAULT_PLAN]).get(scope) or {}
+
+
+def _counter(key, ttl):
+    """
+    Atomically increment a cache counter, creating it first if needed.
+    """
+    cache.add(key, 0, ttl)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Expired between add() and incr()
+        cache.add(key, 1, ttl)
+        return 1
+
+
+def _uncount(key):
+    """
+    Undo one _counter() increment; a counter that expired meanwhile is left alone.
+    """
+    try:
+        cache.decr(key)
+    except ValueError:
+        pass
+
+
+def _day_start(now):
+    return datetime(now.year, now.month, now.day, tzinfo=now.tzinfo)
+
+
+def daily_key(scope, ident, day_start):
+    return f'quota:{scope}:{ident}:day:{day_start:%Y%m%d}'
+
+
+def _generated_today(user, scope, day_start):
+    source = QUOTA_SOURCES.get(scope)
+    if source is None or not user or not user.is_authenticated:
+        return 0
+    model_label, user_field = source
+    model = apps.get_model(model_label)
+    return model.objects.filter(**{user_field: user.pk, 'created_at__gte': day_start}).count()
+
+
+class GenerationThrottle(BaseThrottle):
+    """
+    Per-plan limits on generation endpoints, checked before any upstream call.
+
+    Each scope has an optional sliding-window rate ('rate': '2/min') and a
+    daily cap ('daily': 10), configured per plan in GENERATION_QUOTAS. Both are
+    cache counters updated with atomic increments; a request over either limit
+    is undone (in every counter it was added to) and rejected. Daily counters
+    missing from the cache are rebuilt from the rows generated today, so
+    evictions never reset a quota.
+    Only methods in throttled_methods count.
+    """
+    scope = None
+    throttled_methods = ('POST',)
+
+    def get_ident_key(self, request):
+        if request.user and request.user.is_authenticated:
+            return f'user:{request.user.pk}'
+        return f'ip:{self.get_ident(request)}'
+
+    def allow_request(self, request, view):
+        self.wait_seconds = None
+        self.rate_key = None
+        if request.method not in self.throttled_methods:
+            return True
+
+        limits = get_limits(get_plan_name(request.user), self.scope)
+        ident = self.get_ident_key(request)
+        if limits.get('rate') and not self.allow_rate(ident, limits['rate']):
+            return False
+        if limits.get('daily') is not None and not self.allow_daily(request, ident, limits['daily']):
+            # A rejected request must not use up the rate window either
+            if self.rate_key:
+                _uncount(self.rate_key)
+            return False
+        return True
+
+    def allow_rate(self, ident, rate):
+        """
+        Sliding window approximated from the current and previous fixed
+        windows, the previous one weighted by how much of it still overlaps.
+        """
+        limit, period = parse_rate(rate)
+        now = time.time()
+        window = int(now // period)
+        elapsed = (now % period) / period
+        key = f'quota:{self.scope}:{ident}:{period}:{window}'
+
+        current = _counter(key, period * 2)
+        previous = cache.get(f'quota:{self.scope}:{ident}:{period}:{window - 1}', 0)
+        if previous * (1 - elapsed) + current <= limit:
+            self.rate_key = key
+            return True
+
+        _uncount(key)
+        self.wait_seconds = period * (1 - elapsed)
+        return False
+
+    def allow_daily(self, request, ident, limit):
+        now = timezone.now()
+        day_start = _day_start(now)
+        key = daily_key(self.scope, ident, day_start)
+
+        if cache.get(key) is None:
+            cache.add(key, _generated_today(request.user, self.scope, day_start), 86400 * 2)
+        if _counter(key, 86400 * 2) <= limit:
+            # Remembered so reconcile_quota() can take this request back
+            if not hasattr(request, '_quota_keys'):
+                request._quota_keys = {}
+            request._quota_keys[self.scope] = key
+            return True
+
+        _uncount(key)
+        self.wait_seconds = (day_start + timedelta(days=1) - now).total_seconds()
+        return False
+
+    def wait(self):
+        return self.wait_seconds
+
+
+def reconcile_quota(request, scope):
+    """
+    Take back the daily quota the request used for scope, e.g. after a failed
+    generation. Only this request's increment is undone, so concurrent
+    requests keep theirs.
+    """
+    key = getattr(request, '_quota_keys', {}).pop(scope, None)
+    if key is not None:
+        _uncount(key)
+
+
+class SongGenerationThrottle(GenerationThrottle):
+    scope = 'song'
+
+
+class VideoGenerationThrottle(GenerationThrottle):
+    scope = 'video'
+
+
+class SermonGenerationThrottle(GenerationThrottle):
+    scope = 'sermon'
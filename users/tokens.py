@@ -0,0 +1,291 @@
+import hashlib
+import logging
+import math
+import threading
+import time
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt import tokens
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer as BaseTokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+
+logger = logging.getLogger(__name__)
+
+FILTER_CACHE_KEY = 'token_blacklist:filter'
+FILTER_VERSION_CACHE_KEY = 'token_blacklist:filter_version'
+FILTER_BUILD_LOCK_KEY = 'token_blacklist:building'
+# Jtis blacklisted since the filter was built: an append-only log of cache
+# entries numbered by an atomic counter
+LOG_COUNT_CACHE_KEY = 'token_blacklist:log:count'
+# Rebuild the filter instead of reading a log longer than this
+LOG_MAX_ENTRIES = 50000
+# A log entry still missing after this long was evicted: rebuild the filter
+LOG_GAP_SECONDS = 60
+TOKEN_VERSION_CLAIM = 'tv'
+FILTER_ERROR_RATE = 0.001
+FILTER_MIN_CAPACITY = 1024
+PRUNE_BATCH_SIZE = 1000
+
+
+def _log_key(number):
+    return f'token_blacklist:log:{number}'
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over strings. Membership tests can return false
+    positives (at roughly error_rate for capacity items) but never false
+    negatives.
+    """
+
+    def __init__(self, capacity, error_rate=FILTER_ERROR_RATE, bits=None, hashes=None):
+        capacity = max(capacity, 1)
+        size = max(int(-capacity * math.log(error_rate) / math.log(2) ** 2), 8)
+        self.hashes = hashes or max(round(size / capacity * math.log(2)), 1)
+        self.bits = bytearray(bits) if bits is not None else bytearray((size + 7) // 8)
+        self.size = len(self.bits) * 8
+
+    def _positions(self, value):
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], 'big'), int.from_bytes(digest[8:], 'big') | 1
+        return ((first + i * second) % self.size for i in range(self.hashes))
+
+    def add(self, value):
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, value):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+
+_state = {'filter': None, 'version': None, 'position': None, 'checked_at': 0.0}
+_state_lock = threading.Lock()
+# This worker's copy of the log past the filter's position
+_delta = {'version': None, 'read': 0, 'missing': set(), 'jtis': set(), 'gap_since': None}
+_delta_lock = threading.Lock()
+
+
+def build_blacklist_filter():
+    """
+    Build a filter of every unexpired blacklisted jti and publish it in the
+    shared cache. Returns the number of jtis in the filter.
+    """
+    from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+    # Read before the query: entries logged during the scan stay in the delta
+    cache.add(LOG_COUNT_CACHE_KEY, 0, None)
+    position = cache.get(LOG_COUNT_CACHE_KEY)
+    jtis = BlacklistedToken.objects.filter(token__expires_at__gt=timezone.now()).values_list('token__jti', flat=True)
+    count = jtis.count()
+    bloom = BloomFilter(max(count * 2, FILTER_MIN_CAPACITY))
+    for jti in jtis.iterator(chunk_size=10000):
+        bloom.add(jti)
+
+    version = uuid.uuid4().hex
+    cache.set(FILTER_CACHE_KEY, {
+        'version': version, 'bits': bytes(bloom.bits), 'hashes': bloom.hashes, 'position': position,
+    }, None)
+    cache.set(FILTER_VERSION_CACHE_KEY, version, None)
+    with _state_lock:
+        _state.update({'filter': bloom, 'version': version, 'position': position, 'checked_at': time.monotonic()})
+    logger.info(f"[TOKENS] Built blacklist filter with {count} tokens ({len(bloom.bits)} bytes)")
+    return count
+
+
+def _rebuild_shared_filter():
+    """
+    Rebuild the shared filter unless another worker is already doing it.
+    """
+    if cache.add(FILTER_BUILD_LOCK_KEY, True, 300):
+        try:
+            build_blacklist_filter()
+        finally:
+            cache.delete(FILTER_BUILD_LOCK_KEY)
+
+
+def get_blacklist_filter():
+    """
+    Return this worker's copy of the shared filter, reloading it when a new one
+    was published, or None while no filter exists yet.
+    """
+    now = time.monotonic()
+    if _state['filter'] is not None and now - _state['checked_at'] < settings.TOKEN_BLACKLIST_FILTER_CHECK_SECONDS:
+        return _state['filter']
+
+    version = cache.get(FILTER_VERSION_CACHE_KEY)
+    if version is None or version != _state['version']:
+        stored = cache.get(FILTER_CACHE_KEY) if version else None
+        if stored is None or stored['version'] != version:
+            # Missing or evicted: one worker rebuilds it, the others keep
+            # their current copy (or the database) meanwhile
+            _rebuild_shared_filter()
+            return _state['filter']
+        with _state_lock:
+            _state['filter'] = BloomFilter(1, bits=stored['bits'], hashes=stored['hashes'])
+            _state['version'] = version
+            _state['position'] = stored.get('position')
+    _state['checked_at'] = now
+    return _state['filter']
+
+
+def blacklisted_since_filter():
+    """
+    Return (jtis, complete): the jtis logged by blacklist_token() since the
+    current filter was built, and whether the log could be read in full.
+
+    Only new entries are fetched, with one get_many. An entry can be missing
+    for a moment between the counter increment and its write; one missing for
+    LOG_GAP_SECONDS, a reset counter or an overlong log mean the log can no
+    longer be trusted, so the filter is rebuilt.
+    """
+    version, position = _state['version'], _state['position']
+    count = cache.get(LOG_COUNT_CACHE_KEY)
+    if position is None or count is None or count < position or count - position > LOG_MAX_ENTRIES:
+        _rebuild_shared_filter()
+        return set(), False
+
+    with _delta_lock:
+        if _delta['version'] != version:
+            _delta.update({'version': version, 'read': position, 'missing': set(), 'jtis': set(), 'gap_since': None})
+        if count < _delta['read']:
+            return _delta['jtis'], False
+
+        wanted = sorted(_delta['missing']) + list(range(_delta['read'] + 1, count + 1))
+        if wanted:
+            found = cache.get_many([_log_key(number) for number in wanted])
+            for number in wanted:
+                jti = found.get(_log_key(number))
+                if jti is None:
+                    _delta['missing'].add(number)
+                else:
+                    _delta['missing'].discard(number)
+                    _delta['jtis'].add(jti)
+            _delta['read'] = count
+
+        if not _delta['missing']:
+            _delta['gap_since'] = None
+            return _delta['jtis'], True
+        now = time.monotonic()
+        if _delta['gap_since'] is None:
+            _delta['gap_since'] = now
+        gap_age = now - _delta['gap_since']
+        jtis = _delta['jtis']
+
+    if gap_age > LOG_GAP_SECONDS:
+        _rebuild_shared_filter()
+    return jtis, False
+
+
+def is_blacklisted(jti):
+    """
+    Check a refresh token's jti against the blacklist.
+
+    A jti missing from both the filter and the log of tokens blacklisted
+    since it was built is not blacklisted, with no database query. Possible
+    filter members, and every token while the filter or the log is
+    unavailable, are looked up in the database.
+    """
+    from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+    bloom = get_blacklist_filter()
+    if bloom is not None and jti not in bloom:
+        recent, complete = blacklisted_since_filter()
+        if jti in recent:
+            return True
+        if complete:
+            return False
+    return BlacklistedToken.objects.filter(token__jti=jti).exists()
+
+
+def blacklist_token(token):
+    """
+    Blacklist a refresh token and make it visible to every worker's check.
+
+    The jti is appended to the shared log once the blacklist row is
+    committed, so a filter built from the database never misses it.
+    """
+    token.blacklist()
+    jti = token[api_settings.JTI_CLAIM]
+    remaining = int(token['exp'] - time.time())
+    if _state['filter'] is not None:
+        _state['filter'].add(jti)
+    if remaining <= 0:
+        return
+
+    def log():
+        cache.add(LOG_COUNT_CACHE_KEY, 0, None)
+        try:
+            number = cache.incr(LOG_COUNT_CACHE_KEY)
+        except ValueError:
+            # Counter evicted meanwhile; readers fall back to the database
+            return
+        cache.set(_log_key(number), jti, remaining)
+
+    transaction.on_commit(log)
+
+
+class RefreshToken(tokens.RefreshToken):
+    """
+    RefreshToken whose blacklist check goes through the shared filter.
+    """
+
+    def check_blacklist(self):
+        if is_blacklisted(self[api_settings.JTI_CLAIM]):
+            raise TokenError(_("Token is blacklisted"))
+
+
+class TokenRefreshSerializer(BaseTokenRefreshSerializer):
+    token_class = RefreshToken
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        self.check_token_version(refresh)
+        data = {'access': str(refresh.access_token)}
+
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION:
+                blacklist_token(refresh)
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            data['refresh'] = str(refresh)
+        return data
+
+    @staticmethod
+    def check_token_version(refresh):
+        """
+        Reject refresh tokens issued before the user's token version was bumped
+        (password change or reset), like CachedJWTAuthentication does for
+        access tokens.
+        """
+        from django.contrib.auth import get_user_model
+
+        current = get_user_model().objects.filter(
+            **{api_settings.USER_ID_FIELD: refresh.get(api_settings.USER_ID_CLAIM)}
+        ).values_list('token_version', flat=True).first()
+        if current is None or current != refresh.get(TOKEN_VERSION_CLAIM, 0):
+            raise TokenError(_("Token has been revoked"))
+
+
+def prune_expired_tokens(older_than=None, batch_size=PRUNE_BATCH_SIZE):
+    """
+    Delete outstanding (and blacklisted) tokens that expired, in batches so a
+    large backlog never holds long locks. Returns the number of tokens deleted.
+    """
+    from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+    cutoff = timezone.now() - (older_than or timedelta())
+    deleted = 0
+    while True:
+        ids = list(OutstandingToken.objects.filter(expires_at__lt=cutoff).values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        BlacklistedToken.objects.filter(token_id__in=ids).delete()
+        deleted += OutstandingToken.objects.filter(pk__in=ids).delete()[0]
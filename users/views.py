@@ -1,24 +1,38 @@
-from asgiref.sync import async_to_sync
 from rest_framework import status, generics, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
-from rest_framework.permissions import AllowAny, IsAuthenticated
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework.permissions import SAFE_METHODS, AllowAny, IsAuthenticated
+from rest_framework_simplejwt.exceptions import TokenError
 from django.shortcuts import redirect, render
 from django.contrib.auth import get_user_model
 from django.contrib import messages
 from django.utils import timezone
 from django.conf import settings
-from .models import User, OTP, Plan, UserPlan
+from .models import User, Plan, UserPlan
 from .serializers import (
     UserRegistrationSerializer, UserLoginSerializer, OTPVerificationSerializer,
     ResendOTPSerializer, ForgotPasswordSerializer, ResetPasswordSerializer,
     UserProfileSerializer, ChangePasswordSerializer
 )
-from .utils import send_otp_email, send_otp_email_task
+from . import otp as otp_store
+from .authentication import forget_user, revoke_tokens, tokens_for_user
+from .tokens import RefreshToken, TokenRefreshSerializer, blacklist_token
+from .utils import send_otp_email
 
 User = get_user_model()
 
+OTP_ERRORS = {
+    otp_store.INVALID: ('Invalid OTP', status.HTTP_400_BAD_REQUEST),
+    otp_store.EXPIRED: ('OTP has expired', status.HTTP_400_BAD_REQUEST),
+    otp_store.LOCKED: ('Too many failed attempts, please request a new OTP', status.HTTP_429_TOO_MANY_REQUESTS),
+}
+
+
+def otp_error_response(result):
+    message, status_code = OTP_ERRORS[result]
+    return Response({'error': message}, status=status_code)
+
+
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def register(request):
@@ -43,11 +57,8 @@ def register(request):
             user = serializer.save()
             try:
                 # Create and send OTP for email verification
-                otp = OTP.objects.create(
-                    user=user,
-                    otp_type='email_verification'
-                )
-                # send_otp_email(user.email, otp.otp_code, 'email_verification')
+                otp_code = otp_store.issue_otp(user, 'email_verification')
+                # send_otp_email(user.email, otp_code, 'email_verification')
             except Exception as e:
                 print(f"Error creating/sending OTP: {str(e)}")
                 
@@ -73,27 +84,14 @@ def verify_otp(request):
         
         try:
             user = User.objects.get(email=email)
-            otp = OTP.objects.filter(
-                user=user,
-                otp_code=otp_code,
-                otp_type=otp_type,
-                is_used=False
-            ).first()
-            
-            if not otp:
-                return Response({'error': 'Invalid OTP'}, status=status.HTTP_400_BAD_REQUEST)
-            
-            if not otp.is_valid():
-                return Response({'error': 'OTP has expired'}, status=status.HTTP_400_BAD_REQUEST)
-            
-            # Mark OTP as used
-            otp.is_used = True
-            otp.save()
+            result = otp_store.verify_otp(user, otp_type, otp_code)
+            if result != otp_store.VERIFIED:
+                return otp_error_response(result)
             
             # If email verification, mark user as verified
             if otp_type == 'email_verification':
                 user.is_email_verified = True
-                user.save()
+                user.save(update_fields=['is_email_verified', 'updated_at'])
             
             return Response({'message': 'OTP verified successfully'}, status=status.HTTP_200_OK)
             
@@ -114,12 +112,9 @@ def resend_otp(request):
         try:
             user = User.objects.get(email=email)
             
-            # Invalidate previous OTPs
-            OTP.objects.filter(user=user, otp_type=otp_type, is_used=False).update(is_used=True)
-            
-            # Create new OTP
-            otp = OTP.objects.create(user=user, otp_type=otp_type)
-            send_otp_email(user.email, otp.otp_code, otp_type)
+            # Replaces any previous OTP of this type
+            otp_code = otp_store.issue_otp(user, otp_type)
+            send_otp_email(user.email, otp_code, otp_type)
             
             return Response({'message': 'OTP sent successfully'}, status=status.HTTP_200_OK)
             
@@ -135,7 +130,7 @@ def login(request):
     serializer = UserLoginSerializer(data=request.data)
     if serializer.is_valid():
         user = serializer.validated_data['user']
-        refresh = RefreshToken.for_user(user)
+        refresh = tokens_for_user(user)
         
         return Response({
             'refresh': str(refresh),
@@ -146,6 +141,18 @@ def login(request):
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def token_refresh(request):
+    serializer = TokenRefreshSerializer(data=request.data)
+    try:
+        serializer.is_valid(raise_exception=True)
+    except TokenError:
+        return Response({'error': 'Invalid or expired refresh token'}, status=status.HTTP_401_UNAUTHORIZED)
+    
+    return Response(serializer.validated_data, status=status.HTTP_200_OK)
+
+
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def forgot_password(request):
@@ -156,19 +163,9 @@ def forgot_password(request):
         try:
             user = User.objects.get(email=email)
             
-            # Invalidate previous password reset OTPs
-            OTP.objects.filter(user=user, otp_type='password_reset', is_used=False).update(is_used=True)
-            
-            # Create new OTP
-            otp = OTP.objects.create(user=user, otp_type='password_reset')
-            # send_otp_email(user.email, otp.otp_code, 'password_reset')
-            # async_to_sync(send_otp_email_task(user.email, otp.otp_code, 'password_reset'))
-            async_to_sync(send_otp_email_task)(
-                user.email,
-                otp.otp_code,
-                'password_reset'
-            )
-
+            # Replaces any previous password reset OTP
+            otp_code = otp_store.issue_otp(user, 'password_reset')
+            send_otp_email(user.email, otp_code, 'password_reset')
             
             return Response({'message': 'Password reset OTP sent to your email'}, status=status.HTTP_200_OK)
             
@@ -189,24 +186,14 @@ def reset_password(request):
         
         try:
             user = User.objects.get(email=email)
-            otp = OTP.objects.filter(
-                user=user,
-                otp_code=otp_code,
-                otp_type='password_reset',
-                is_used=False
-            ).first()
-            
-            if not otp:
-                return Response({'error': 'Invalid OTP'}, status=status.HTTP_400_BAD_REQUEST)
+            result = otp_store.verify_otp(user, 'password_reset', otp_code)
+            if result != otp_store.VERIFIED:
+                return otp_error_response(result)
             
-            if not otp.is_valid():
-                return Response({'error': 'OTP has expired'}, status=status.HTTP_400_BAD_REQUEST)
-            
-            # Update password and mark OTP as used
+            # Update password (the OTP was consumed by the check)
             user.set_password(new_password)
-            user.save()
-            otp.is_used = True
-            otp.save()
+            user.save(update_fields=['password', 'updated_at'])
+            revoke_tokens(user)
             
             return Response({'message': 'Password reset successfully'}, status=status.HTTP_200_OK)
             
@@ -238,7 +225,7 @@ def web_register(request, plan):
                 password=password
             )
             user.is_email_verified = False
-            user.save()
+            user.save(update_fields=['is_email_verified', 'updated_at'])
             messages.success(request, 'Registration successful! You can now login on the app.') 
             # # Create and send OTP for email verification
             # otp = OTP.objects.create(
@@ -284,7 +271,10 @@ class UserProfileView(generics.RetrieveUpdateAPIView):
     permission_classes = [IsAuthenticated]
 
     def get_object(self):
-        return self.request.user
+        # request.user comes from the auth cache; updates start from the current row
+        if self.request.method in SAFE_METHODS:
+            return self.request.user
+        return User.objects.get(pk=self.request.user.pk)
 
 
 @api_view(['POST'])
@@ -292,11 +282,19 @@ class UserProfileView(generics.RetrieveUpdateAPIView):
 def change_password(request):
     serializer = ChangePasswordSerializer(data=request.data, context={'request': request})
     if serializer.is_valid():
+        # request.user may be a cached copy; write only the password
         user = request.user
         user.set_password(serializer.validated_data['new_password'])
-        user.save()
+        user.save(update_fields=['password', 'updated_at'])
+        # Sign out other sessions; this client continues with the new tokens
+        revoke_tokens(user)
+        refresh = tokens_for_user(user)
         
-        return Response({'message': 'Password changed successfully'}, status=status.HTTP_200_OK)
+        return Response({
+            'message': 'Password changed successfully',
+            'refresh': str(refresh),
+            'access': str(refresh.access_token),
+        }, status=status.HTTP_200_OK)
     
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -304,10 +302,11 @@ def change_password(request):
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def logout(request):
+    forget_user(request.user)
     try:
         refresh_token = request.data["refresh"]
         token = RefreshToken(refresh_token)
-        token.blacklist()
+        blacklist_token(token)
         return Response({'message': 'Logged out successfully'}, status=status.HTTP_200_OK)
     except Exception as e:
         return Response({'error': 'Invalid token'}, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file